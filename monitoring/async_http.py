@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import hashlib
+import socket
+import ssl as ssl_module
+import threading
+import time
+import urllib.parse
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .common import (
+	_CHUNK_SIZE, _HEAD_REFUSED, REDIRECT_STATUSES, ChunkCallback, HttpResponse, add_redirect_hop, apply_validators, cfg,
+	_phase_timings, _resource_size, circuit_breaker, circuit_host, dns_cache, host_latency, http_pool, redirect_target,
+	run_redirects, validator_store,
+)
+from .dns_cache import with_port
+from .http_pool import PoolKey
+
+# Same contract as common.http_request, on asyncio streams: one event loop thread holds thousands of
+# requests, each costing a coroutine and a 64 KiB read buffer instead of a thread.
+
+
+class _Connection:
+	def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, timings: Dict[str, float]) -> None:
+		self.reader = reader
+		self.writer = writer
+		self.timings: Optional[Dict[str, float]] = timings  # connect timings, consumed by the first request
+
+	def close(self) -> None:
+		self.writer.close()
+
+
+class _StaleConnection(Exception):
+	pass
+
+
+async def _connect(key: PoolKey, timeout: float, context: ssl_module.SSLContext) -> _Connection:
+	scheme, host, port = key
+	loop = asyncio.get_running_loop()
+	start = time.perf_counter()
+	infos = with_port(await asyncio.wait_for(asyncio.wrap_future(dns_cache.submit(host)), timeout), port)
+	resolved = time.perf_counter()
+	sock: Optional[socket.socket] = None
+	error: Optional[OSError] = None
+	for family, socktype, proto, _, address in infos:
+		sock = socket.socket(family, socktype, proto)
+		sock.setblocking(False)
+		try:
+			await asyncio.wait_for(loop.sock_connect(sock, address), timeout)
+			break
+		except OSError as e:
+			sock.close()
+			sock, error = None, e
+	if sock is None:
+		raise error or OSError("getaddrinfo returned no addresses")
+	sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+	connected = time.perf_counter()
+	tls = scheme == "https"
+	reader, writer = await asyncio.wait_for(
+		asyncio.open_connection(sock=sock, ssl=context if tls else None, server_hostname=host if tls else None), timeout
+	)
+	if tls:
+		http_pool.certificates.capture(host, port, writer.get_extra_info("ssl_object"))
+	return _Connection(reader, writer, {
+		"dns_ms": (resolved - start) * 1000.0,
+		"connect_ms": (connected - resolved) * 1000.0,
+		"tls_ms": (time.perf_counter() - connected) * 1000.0 if tls else 0.0,
+	})
+
+
+class AsyncConnectionPool:
+	"""Keep-alive stream pairs per (scheme, host, port), capped per host. Only used on its event loop."""
+
+	def __init__(self, max_per_host: int, idle_timeout: float, context: Optional[ssl_module.SSLContext] = None) -> None:
+		self.max_per_host = max(1, max_per_host)
+		self.idle_timeout = idle_timeout
+		self.context = context or ssl_module.create_default_context()
+		self._idle: Dict[PoolKey, List[Tuple[_Connection, float]]] = {}
+		# Semaphores are created on the loop, as Python < 3.10 binds them to the loop at construction
+		self._slots: Dict[PoolKey, asyncio.Semaphore] = {}
+
+	async def acquire(self, key: PoolKey, timeout: float) -> Tuple[_Connection, bool]:
+		slots = self._slots.get(key)
+		if slots is None:
+			slots = self._slots[key] = asyncio.Semaphore(self.max_per_host)
+		await slots.acquire()
+		cutoff = time.monotonic() - self.idle_timeout
+		idle = self._idle.get(key, [])
+		while idle:
+			conn, since = idle.pop()
+			if since >= cutoff and not conn.reader.at_eof():
+				return conn, True
+			conn.close()
+		try:
+			return await _connect(key, timeout, self.context), False
+		except BaseException:
+			slots.release()
+			raise
+
+	def release(self, key: PoolKey, conn: _Connection, reusable: bool) -> None:
+		if reusable:
+			self._idle.setdefault(key, []).append((conn, time.monotonic()))
+		else:
+			conn.close()
+		self._slots[key].release()
+
+	def close_all(self) -> None:
+		for idle in self._idle.values():
+			for conn, _ in idle:
+				conn.close()
+		self._idle.clear()
+
+
+@dataclasses.dataclass
+class _Head:
+	status: int
+	headers: Dict[str, str]
+	will_close: bool
+
+
+async def _read_head(reader: asyncio.StreamReader, timeout: float) -> _Head:
+	line = await asyncio.wait_for(reader.readline(), timeout)
+	if not line:
+		raise _StaleConnection()
+	version, _, rest = line.decode("latin-1").strip().partition(" ")
+	status_text = rest.split(" ", 1)[0]
+	if not version.startswith("HTTP/") or not status_text.isdigit():
+		raise ValueError(f"Bad status line: {line[:100]!r}")
+	headers: Dict[str, str] = {}
+	while True:
+		line = await asyncio.wait_for(reader.readline(), timeout)
+		if line in (b"\r\n", b"\n", b""):
+			break
+		name, _, value = line.decode("latin-1").partition(":")
+		headers[name.strip().lower()] = value.strip()
+	connection = headers.get("connection", "").lower()
+	will_close = connection == "close" or (version == "HTTP/1.0" and connection != "keep-alive")
+	return _Head(int(status_text), headers, will_close)
+
+
+class _BodyReader:
+	# Iterates the body in chunks according to its framing (chunked, Content-Length or until EOF)
+	def __init__(self, reader: asyncio.StreamReader, head: _Head, method: str, timeout: float) -> None:
+		self.reader = reader
+		self.timeout = timeout
+		self.chunked = "chunked" in head.headers.get("transfer-encoding", "").lower()
+		self._chunk_left = 0
+		length = head.headers.get("content-length", "")
+		self.remaining: Optional[int] = None
+		if method == "HEAD" or head.status in (204, 304) or 100 <= head.status < 200:
+			self.remaining = 0
+		elif not self.chunked and length.isdigit():
+			self.remaining = int(length)
+		# Without framing the body ends when the server closes, so the connection can't be reused
+		self.until_eof = self.remaining is None and not self.chunked
+		self.complete = self.remaining == 0
+
+	async def read(self, want: int) -> bytes:
+		if self.complete:
+			return b""
+		if self.chunked:
+			return await self._read_chunked(want)
+		n = want if self.remaining is None else min(want, self.remaining)
+		data = await asyncio.wait_for(self.reader.read(n), self.timeout)
+		if self.remaining is not None:
+			if not data:
+				raise ConnectionError("Connection closed before the end of the body")
+			self.remaining -= len(data)
+			self.complete = self.remaining == 0
+		elif not data:
+			self.complete = True
+		return data
+
+	async def _read_chunked(self, want: int) -> bytes:
+		if self._chunk_left == 0:
+			line = await asyncio.wait_for(self.reader.readline(), self.timeout)
+			size = int(line.split(b";", 1)[0].strip() or b"0", 16)
+			if size == 0:
+				# Trailers end with an empty line
+				while (await asyncio.wait_for(self.reader.readline(), self.timeout)) not in (b"\r\n", b"\n", b""):
+					pass
+				self.complete = True
+				return b""
+			self._chunk_left = size
+		data = await asyncio.wait_for(self.reader.read(min(want, self._chunk_left)), self.timeout)
+		if not data:
+			raise ConnectionError("Connection closed inside a chunk")
+		self._chunk_left -= len(data)
+		if self._chunk_left == 0:
+			await asyncio.wait_for(self.reader.readexactly(2), self.timeout)  # CRLF after the chunk
+		return data
+
+
+class AsyncHttpClient:
+	"""asyncio backend for HttpResponse requests, running its own event loop on a background thread.
+
+	request() is a coroutine for that loop; submit() schedules one from any thread and returns a
+	concurrent.futures.Future, so thread-based callers (the crawler) can drive it.
+	"""
+
+	def __init__(self, *, max_in_flight: Optional[int] = None, max_per_host: Optional[int] = None) -> None:
+		self.max_in_flight = max_in_flight or cfg.ASYNC_MAX_IN_FLIGHT
+		self.pool = AsyncConnectionPool(max_per_host or cfg.ASYNC_MAX_CONNECTIONS_PER_HOST, cfg.POOL_IDLE_TIMEOUT_SECONDS)
+		self.loop = asyncio.new_event_loop()
+		self._thread = threading.Thread(target=self.loop.run_forever, name="async-http", daemon=True)
+		self._thread.start()
+		self._in_flight: Optional[asyncio.Semaphore] = None
+
+	def __enter__(self) -> "AsyncHttpClient":
+		return self
+
+	def __exit__(self, *exc: Any) -> None:
+		self.close()
+
+	def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+		return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+	def close(self) -> None:
+		if self.loop.is_closed():
+			return
+		self.loop.call_soon_threadsafe(self.pool.close_all)
+		self.loop.call_soon_threadsafe(self.loop.stop)
+		self._thread.join()
+		self.loop.close()
+
+	async def request(self, url: str, *, method: str = "GET", timeout: Optional[float] = None, headers: Optional[Dict[str, str]] = None, conditional: Optional[str] = None, probe: bool = False, probe_bytes: int = 0, max_body_bytes: Optional[int] = None, on_chunk: Optional[ChunkCallback] = None, keep_body: bool = True, follow_redirects: bool = True) -> HttpResponse:
+		# Same options as common.http_request, except that the run cache is not consulted
+		if conditional and cfg.CONDITIONAL_REQUESTS:
+			headers = {**validator_store().headers_for(conditional, url), **(headers or {})}
+		if probe:
+			hop: Callable[[str], Awaitable[HttpResponse]] = lambda u: self._probe(u, timeout, headers, probe_bytes)
+		else:
+			hop = lambda u: self._fetch(u, method, timeout, headers, max_body_bytes, on_chunk, keep_body)
+		if self._in_flight is None:
+			self._in_flight = asyncio.Semaphore(self.max_in_flight)
+		async with self._in_flight:
+			if not follow_redirects:
+				return await hop(url)
+			return await self._follow_redirects(url, hop)
+
+	async def fetch_validated(self, url: str, extract: Callable[[HttpResponse], Any], *, namespace: str, **options: Any) -> Tuple[HttpResponse, Any, bool]:
+		# Async counterpart of common.fetch_validated
+		resp = await self.request(url, conditional=namespace, **options)
+		data, reused = apply_validators(namespace, url, resp, extract)
+		return resp, data, reused
+
+	async def _follow_redirects(self, url: str, hop: Callable[[str], Awaitable[HttpResponse]]) -> HttpResponse:
+		redirects = run_redirects()
+		chain: List[Dict[str, Any]] = []
+		current = url
+		while True:
+			cached = redirects.get(current) if redirects is not None else None
+			if cached is not None:
+				status, target = cached
+			else:
+				resp = await hop(current)
+				found = redirect_target(resp, current)
+				if found is None:
+					if chain:
+						resp = dataclasses.replace(resp, final_url=current, redirect_chain=chain)
+					return resp
+				status, target = resp.status, found
+				if redirects is not None:
+					redirects.put(current, status, target)
+			current = add_redirect_hop(chain, url, current, status, target)
+
+	async def _probe(self, url: str, timeout: Optional[float], headers: Optional[Dict[str, str]], probe_bytes: int) -> HttpResponse:
+		if probe_bytes <= 0:
+			resp = await self._fetch(url, "HEAD", timeout, dict(headers or {}), None, None, True)
+			if resp.status not in _HEAD_REFUSED:
+				return resp
+		limit = max(probe_bytes, 1)
+		ranged = {**(headers or {}), "Range": f"bytes=0-{limit - 1}"}
+		resp = await self._fetch(url, "GET", timeout, ranged, limit, None, True)
+		if resp.status in (206, 416):
+			resp = dataclasses.replace(resp, status=200, truncated=False)
+		return resp
+
+	async def _fetch(self, url: str, method: str, timeout: Optional[float], headers: Optional[Dict[str, str]], max_body_bytes: Optional[int], on_chunk: Optional[ChunkCallback], keep_body: bool) -> HttpResponse:
+		parsed = urllib.parse.urlparse(url)
+		if parsed.scheme not in ("http", "https"):
+			raise ValueError("Unsupported scheme")
+		port = parsed.port or (443 if parsed.scheme == "https" else 80)
+		path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+		timeout = timeout or cfg.REQUEST_TIMEOUT_SECONDS
+		key = (parsed.scheme, parsed.hostname or "", port)
+		lines = [f"{method} {path} HTTP/1.1", f"Host: {parsed.netloc}", f"User-Agent: {cfg.USER_AGENT}", "Accept-Encoding: identity"]
+		lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+		request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+		# Circuits are shared with the threaded client, so a host found dead by one module fails fast in all
+		host = circuit_host(url)
+		circuit_breaker.before(host)
+		while True:
+			try:
+				conn, reused = await self.pool.acquire(key, timeout)
+			except (OSError, asyncio.TimeoutError):
+				circuit_breaker.failure(host)
+				raise
+			try:
+				start = time.perf_counter()
+				conn.writer.write(request)
+				await conn.writer.drain()
+				head = await _read_head(conn.reader, timeout)
+				circuit_breaker.success(host)
+				break
+			except (_StaleConnection, ConnectionResetError, BrokenPipeError):
+				self.pool.release(key, conn, reusable=False)
+				if reused:
+					continue  # idle connection went stale; try the next one
+				circuit_breaker.failure(host)
+				raise ConnectionError("Server closed the connection without a response")
+			except (OSError, asyncio.TimeoutError):
+				self.pool.release(key, conn, reusable=False)
+				circuit_breaker.failure(host)
+				raise
+			except BaseException:
+				self.pool.release(key, conn, reusable=False)
+				raise
+
+		setup, conn.timings = conn.timings, None
+		first_byte_ms = (time.perf_counter() - start) * 1000.0
+		body = _BodyReader(conn.reader, head, method, timeout)
+		limit = max_body_bytes if max_body_bytes is not None else cfg.MAX_BODY_BYTES
+		if head.status in REDIRECT_STATUSES and head.headers.get("location"):
+			on_chunk = None  # a redirect's own body is never what a streaming consumer asked for
+		digest = hashlib.sha256()
+		parts: List[bytes] = []
+		read = 0
+		try:
+			while not body.complete:
+				want = _CHUNK_SIZE if limit is None else min(_CHUNK_SIZE, limit - read)
+				if want <= 0:
+					break
+				chunk = await body.read(want)
+				if not chunk:
+					continue
+				read += len(chunk)
+				digest.update(chunk)
+				if keep_body:
+					parts.append(chunk)
+				if on_chunk is not None and on_chunk(chunk) is False:
+					break
+		except BaseException:
+			self.pool.release(key, conn, reusable=False)
+			raise
+		elapsed_ms = (time.perf_counter() - start) * 1000.0
+		truncated = not body.complete
+		self.pool.release(key, conn, reusable=not truncated and not head.will_close and not body.until_eof)
+		host_latency.add(host, elapsed_ms)
+		timings = _phase_timings(setup, first_byte_ms)
+		timings["download_ms"] = elapsed_ms - first_byte_ms
+		return HttpResponse(
+			status=head.status, headers=head.headers, body=b"".join(parts), elapsed_ms=elapsed_ms, final_url=url,
+			total_size=_resource_size(head.headers, read, method, not truncated),
+			truncated=truncated, body_sha256=digest.hexdigest(), timings=timings, connection_reused=setup is None,
+		)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from .sketch import QuantileSketch
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(ConnectionError):
+	"""Raised instead of connecting to a host whose circuit is open."""
+
+
+class _Circuit:
+	__slots__ = ("failures", "opened_at", "probing", "trips", "rejected")
+
+	def __init__(self) -> None:
+		self.failures = 0
+		self.opened_at: Optional[float] = None  # None = closed
+		self.probing = False
+		self.trips = 0
+		self.rejected = 0
+
+
+class CircuitBreaker:
+	"""Per-host circuit: after `failure_threshold` consecutive failures calls fail fast for `reset_timeout` seconds.
+
+	Once that has passed the circuit is half-open: a single call goes through as a probe, and its outcome
+	closes the circuit again or keeps it open for another `reset_timeout`. A threshold of 0 disables it.
+	"""
+
+	def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock: Callable[[], float] = time.monotonic) -> None:
+		self.failure_threshold = failure_threshold
+		self.reset_timeout = reset_timeout
+		self._clock = clock
+		self._lock = threading.Lock()
+		self._circuits: Dict[str, _Circuit] = {}
+
+	def before(self, host: str) -> None:
+		# Call before connecting; raises CircuitOpenError while the host's circuit is open
+		if self.failure_threshold <= 0:
+			return
+		with self._lock:
+			circuit = self._circuits.get(host)
+			if circuit is None or circuit.opened_at is None:
+				return
+			now = self._clock()
+			retry_in = circuit.opened_at + self.reset_timeout - now
+			if retry_in <= 0:
+				# Half-open: this call is the probe. Restarting the clock keeps other calls out while it
+				# runs, and lets a new probe through if this one never reports back
+				circuit.opened_at = now
+				circuit.probing = True
+				return
+			circuit.rejected += 1
+		raise CircuitOpenError(f"Circuit open for {host} after {circuit.failures} consecutive failures (retry in {max(0.0, retry_in):.0f}s)")
+
+	def success(self, host: str) -> None:
+		with self._lock:
+			circuit = self._circuits.get(host)
+			if circuit is not None:
+				circuit.failures = 0
+				circuit.opened_at = None
+				circuit.probing = False
+
+	def failure(self, host: str) -> None:
+		if self.failure_threshold <= 0:
+			return
+		with self._lock:
+			circuit = self._circuits.setdefault(host, _Circuit())
+			circuit.failures += 1
+			if circuit.probing or (circuit.opened_at is None and circuit.failures >= self.failure_threshold):
+				if circuit.opened_at is None:
+					circuit.trips += 1
+				circuit.opened_at = self._clock()
+				circuit.probing = False
+
+	def state(self, host: str) -> str:
+		with self._lock:
+			circuit = self._circuits.get(host)
+			if circuit is None or circuit.opened_at is None:
+				return "closed"
+			if circuit.probing or circuit.opened_at + self.reset_timeout <= self._clock():
+				return "half_open"
+			return "open"
+
+	def reset(self) -> None:
+		with self._lock:
+			self._circuits.clear()
+
+	def stats(self) -> Dict[str, object]:
+		with self._lock:
+			return {
+				"open": sorted(host for host, c in self._circuits.items() if c.opened_at is not None),
+				"trips": sum(c.trips for c in self._circuits.values()),
+				"rejected": sum(c.rejected for c in self._circuits.values()),
+			}
+
+
+class LatencyTracker:
+	"""Response times per host, as quantile sketches."""
+
+	def __init__(self, min_samples: int = 20) -> None:
+		self.min_samples = min_samples
+		self._lock = threading.Lock()
+		self._sketches: Dict[str, QuantileSketch] = {}
+
+	def add(self, host: str, elapsed_ms: float) -> None:
+		with self._lock:
+			sketch = self._sketches.get(host)
+			if sketch is None:
+				sketch = self._sketches[host] = QuantileSketch()
+			sketch.add(elapsed_ms)
+
+	def quantile(self, host: str, q: float) -> Optional[float]:
+		# None until the host has min_samples responses: too few to tell a slow call from a normal one
+		with self._lock:
+			sketch = self._sketches.get(host)
+			if sketch is None or sketch.count < self.min_samples:
+				return None
+			return sketch.quantile(q)
+
+
+class Hedger:
+	"""Runs a call and, if it has not finished after `delay` seconds, a duplicate; the first success wins.
+
+	Only for idempotent calls: the slower one keeps running in the background and its result is dropped.
+	"""
+
+	def __init__(self, workers: int = 32) -> None:
+		self._workers = max(2, workers)
+		self._executor: Optional[ThreadPoolExecutor] = None
+		self._pid = os.getpid()
+		self._lock = threading.Lock()
+		self.hedged = 0
+		self.hedge_wins = 0
+
+	def _pool(self) -> ThreadPoolExecutor:
+		with self._lock:
+			if self._executor is None or self._pid != os.getpid():
+				# A forked worker does not inherit the parent's threads
+				self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="hedge")
+				self._pid = os.getpid()
+			return self._executor
+
+	def call(self, fn: Callable[[], T], delay: float) -> T:
+		pool = self._pool()
+		first = pool.submit(fn)
+		done, _ = wait([first], delay)
+		if done:
+			return first.result()
+		with self._lock:
+			self.hedged += 1
+		pending: List[Future] = [first, pool.submit(fn)]
+		error: Optional[BaseException] = None
+		while pending:
+			done, _ = wait(pending, return_when=FIRST_COMPLETED)
+			for future in done:
+				pending.remove(future)
+				if future.exception() is None:
+					if future is not first:
+						with self._lock:
+							self.hedge_wins += 1
+					return future.result()
+				if future is first or error is None:
+					error = future.exception()
+		assert error is not None
+		raise error  # both failed: the original call's error
+
+	def stats(self) -> Dict[str, int]:
+		with self._lock:
+			return {"hedged": self.hedged, "hedge_wins": self.hedge_wins}
@@ -1,19 +1,30 @@
 from __future__ import annotations
 
+import contextlib
 import dataclasses
-import json
+import hashlib
+import heapq
 import os
-import re
-import ssl as ssl_module
 import sys
+import threading
 import time
 import urllib.parse
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import http.client
 
+from .circuit import CircuitBreaker, Hedger, LatencyTracker
+from .dns_cache import DnsCache
+from .fetch_cache import FetchCache, RedirectCache
+from .html_scan import scan_html
+from .report_sink import ReportSink, write_json
+from .http_pool import ConnectionPool, PoolKey, _connect_any
+from .timeseries import TimeSeriesStore
+from .tls_certs import certificate_info
+from .validators import ValidatorStore
+
 
 class _Defaults:
 	SITE_URL = "https://neculaifantanaru.com"
@@ -22,8 +33,43 @@ class _Defaults:
 	ALLOWED_HOSTS = ["neculaifantanaru.com", "www.neculaifantanaru.com"]
 	USER_AGENT = "SiteMonitor/1.0 (+https://github.com/me-suzy/Proiect-action-GitHub)"
 	REPORT_DIR = ".reports"
+	REPORT_TOP_N = 1000  # items (broken links, SEO issues...) listed in the JSON reports; the counts cover all
+	REPORT_FORMAT = "pretty"  # JSON reports: "pretty", "compact" (one line) or "ndjson" (all in results.ndjson)
 	TTFB_WARNING_MS = 800
 	SSL_EXPIRY_WARN_DAYS = 15
+	POOL_MAX_CONNECTIONS_PER_HOST = 6
+	POOL_IDLE_TIMEOUT_SECONDS = 30
+	FETCH_CACHE_MAX_BYTES = 64 * 1024 * 1024
+	MAX_CRAWL_DEPTH = None  # None = unlimited
+	CRAWL_WORKERS = 4
+	CONDITIONAL_REQUESTS = True
+	IMAGE_PROBE_BYTES = 32 * 1024
+	MAX_BODY_BYTES = 10 * 1024 * 1024
+	MAX_REDIRECTS = 5
+	RUN_ALL_WORKERS = 8
+	MODULE_TIMEOUT_SECONDS = 600
+	HTTP_BACKEND = "threads"  # crawler backend: "threads" or "asyncio"
+	ASYNC_MAX_IN_FLIGHT = 1000
+	ASYNC_MAX_CONNECTIONS_PER_HOST = 32
+	FLEET_PROCESSES = None  # None = CPU count
+	TIMESERIES_DB = "history.sqlite"  # in REPORT_DIR; None disables the history
+	INCREMENTAL_CRAWL = False
+	CRAWL_TTL_HOURS = 24 * 7  # incremental crawl: refetch pages older than this
+	SITEMAP_MAX_FILES = 500
+	SITEMAP_MAX_URLS = 5_000_000
+	SITEMAP_MAX_FILE_BYTES = 64 * 1024 * 1024  # the protocol allows 50 MB uncompressed per file
+	URL_INDEX_BLOOM_BITS = 0  # Bloom prefilter in front of the crawler's URL index, bits per URL; 0 = off
+	DNS_CACHE_TTL_SECONDS = 300
+	DNS_NEGATIVE_TTL_SECONDS = 30  # how long a failed lookup is remembered
+	DNS_WORKERS = 16  # concurrent lookups
+	CERT_CHECK_WORKERS = 32  # concurrent TLS handshakes for hosts without a captured certificate
+	CERT_CACHE_FILE = "certificates.json"  # in REPORT_DIR unless absolute; results are kept for the day
+	URL_INDEX_FILE = "url_index.bin"  # in REPORT_DIR; fingerprints of every URL incremental crawls have discovered, for urls_first_seen
+	CIRCUIT_FAILURE_THRESHOLD = 5  # consecutive connection failures before a host fails fast; 0 = off
+	CIRCUIT_RESET_SECONDS = 30  # how long a host fails fast before one probe request is let through
+	HEDGE_REQUESTS = False  # GET/HEAD slower than the host's HEDGE_QUANTILE latency are sent a second time
+	HEDGE_QUANTILE = 0.95
+	HEDGE_MIN_SAMPLES = 20  # responses from a host before its requests are hedged
 
 
 # Build a config object that overlays user config over defaults
@@ -53,6 +99,56 @@ class HttpResponse:
 	body: bytes
 	elapsed_ms: float
 	final_url: str
+	total_size: Optional[int] = None  # whole resource size when known, even if body holds only part of it
+	truncated: bool = False  # body cut short by max_body_bytes or an early abort
+	body_sha256: Optional[str] = None  # digest of every byte read, including those not kept in body
+	# Per-phase breakdown: dns_ms, connect_ms, tls_ms (all 0 on a reused connection), ttfb_ms, download_ms
+	timings: Dict[str, float] = dataclasses.field(default_factory=dict)
+	connection_reused: bool = False
+	# Hops followed before final_url, oldest first: {"url", "status", "location"}
+	redirect_chain: List[Dict[str, Any]] = dataclasses.field(default_factory=list)
+
+	@property
+	def ttfb_ms(self) -> float:
+		return self.timings.get("ttfb_ms", self.elapsed_ms)
+
+
+PHASES = ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "download_ms")
+
+
+class TimingSummary:
+	"""Running per-phase averages/maxima over many responses, plus the N slowest URLs by TTFB."""
+
+	def __init__(self, slowest: int = 10) -> None:
+		self.count = 0
+		self.totals = {phase: 0.0 for phase in PHASES}
+		self.maxima = {phase: 0.0 for phase in PHASES}
+		self._slowest_n = slowest
+		self._slowest: List[Tuple[float, str]] = []
+
+	def add(self, url: str, resp: HttpResponse) -> None:
+		if not resp.timings:
+			return
+		self.count += 1
+		for phase in PHASES:
+			value = resp.timings.get(phase, 0.0)
+			self.totals[phase] += value
+			self.maxima[phase] = max(self.maxima[phase], value)
+		heapq.heappush(self._slowest, (resp.ttfb_ms, url))
+		if len(self._slowest) > self._slowest_n:
+			heapq.heappop(self._slowest)
+
+	def summary(self) -> Dict[str, Any]:
+		return {
+			"samples": self.count,
+			"avg": {phase: round(total / self.count, 2) if self.count else None for phase, total in self.totals.items()},
+			"max": {phase: round(value, 2) for phase, value in self.maxima.items()},
+			"slowest_ttfb": [{"url": url, "ttfb_ms": round(ttfb, 2)} for ttfb, url in sorted(self._slowest, reverse=True)],
+		}
+
+
+def round_timings(resp: HttpResponse) -> Dict[str, float]:
+	return {phase: round(value, 2) for phase, value in resp.timings.items()}
 
 
 def ensure_report_dir() -> Path:
@@ -63,13 +159,53 @@ def ensure_report_dir() -> Path:
 
 def save_json(name: str, data: Dict[str, Any]) -> Path:
 	dir_path = ensure_report_dir()
-	path = dir_path / f"{name}.json"
-	path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
-	return path
+	if _report_sink is not None:
+		return _report_sink.add_json(dir_path, name, data)
+	return write_json(dir_path, name, data, cfg.REPORT_FORMAT)
+
+
+# Active only inside report_sink(); buffers every report of the run until it ends
+_report_sink: Optional[ReportSink] = None
+
+
+@contextlib.contextmanager
+def report_sink(fmt: Optional[str] = None) -> Iterator[ReportSink]:
+	# Reports written inside are kept in memory and written once at the end, each file atomically.
+	# Nested calls share the outer sink.
+	global _report_sink
+	if _report_sink is not None:
+		yield _report_sink
+		return
+	_report_sink = ReportSink(fmt or cfg.REPORT_FORMAT)
+	try:
+		yield _report_sink
+	finally:
+		sink, _report_sink = _report_sink, None
+		sink.flush()
+
+
+_markdown_capture = threading.local()
+
+
+@contextlib.contextmanager
+def capture_markdown(lines: List[Tuple[str, str]]) -> Iterator[List[Tuple[str, str]]]:
+	# Collects this thread's append_markdown calls as (name, content) instead of writing them
+	previous = getattr(_markdown_capture, "lines", None)
+	_markdown_capture.lines = lines
+	try:
+		yield lines
+	finally:
+		_markdown_capture.lines = previous
 
 
 def append_markdown(name: str, content: str) -> Path:
 	dir_path = ensure_report_dir()
+	captured = getattr(_markdown_capture, "lines", None)
+	if captured is not None:
+		captured.append((name, content))
+		return dir_path / f"{name}.md"
+	if _report_sink is not None:
+		return _report_sink.add_markdown(dir_path, name, content)
 	path = dir_path / f"{name}.md"
 	with open(path, "a", encoding="utf-8") as f:
 		f.write(content)
@@ -82,12 +218,254 @@ def normalize_headers(headers: Iterable[Tuple[str, str]]) -> Dict[str, str]:
 	return {k.lower(): v for k, v in headers}
 
 
-def http_request(url: str, *, method: str = "GET", timeout: Optional[int] = None, headers: Optional[Dict[str, str]] = None) -> HttpResponse:
+# Shared by every module in the process: each host is resolved once per TTL, crawls reuse keep-alive
+# connections and TLS sessions
+dns_cache = DnsCache(ttl=cfg.DNS_CACHE_TTL_SECONDS, negative_ttl=cfg.DNS_NEGATIVE_TTL_SECONDS, workers=cfg.DNS_WORKERS)
+http_pool = ConnectionPool(max_per_host=cfg.POOL_MAX_CONNECTIONS_PER_HOST, idle_timeout=cfg.POOL_IDLE_TIMEOUT_SECONDS, resolver=dns_cache.resolve)
+# A dead host fails fast instead of costing every request on it the full timeout
+circuit_breaker = CircuitBreaker(failure_threshold=cfg.CIRCUIT_FAILURE_THRESHOLD, reset_timeout=cfg.CIRCUIT_RESET_SECONDS)
+host_latency = LatencyTracker(min_samples=cfg.HEDGE_MIN_SAMPLES)
+hedger = Hedger()
+
+
+def site_hosts() -> List[str]:
+	host = urllib.parse.urlsplit(cfg.SITE_URL).hostname
+	return list(dict.fromkeys(([host] if host else []) + list(cfg.ALLOWED_HOSTS)))
+
+
+def resolve_hosts(hosts: Optional[Iterable[str]] = None) -> Dict[str, Optional[str]]:
+	# Resolves the site's hosts (or the given ones) concurrently into dns_cache; host -> error or None
+	return dns_cache.prefetch(site_hosts() if hosts is None else hosts, timeout=cfg.REQUEST_TIMEOUT_SECONDS)
+
+# Errors raised when a pooled keep-alive connection was closed by the server while idle
+_STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, ConnectionResetError, BrokenPipeError)
+
+
+# Active only inside run_cache(); lets modules of one run share downloads and resolved redirects
+_run_cache: Optional[FetchCache] = None
+_run_redirects: Optional[RedirectCache] = None
+
+
+@contextlib.contextmanager
+def run_cache(max_bytes: Optional[int] = None) -> Iterator[FetchCache]:
+	global _run_cache, _run_redirects
+	previous = _run_cache, _run_redirects
+	_run_cache = FetchCache(max_bytes or cfg.FETCH_CACHE_MAX_BYTES)
+	_run_redirects = RedirectCache()
+	try:
+		yield _run_cache
+	finally:
+		_run_cache, _run_redirects = previous
+
+
+def run_cache_stats() -> Dict[str, int]:
+	stats: Dict[str, int] = {}
+	if _run_cache is not None:
+		stats.update(_run_cache.stats())
+	if _run_redirects is not None:
+		stats.update(_run_redirects.stats())
+	return stats
+
+
+def _response_size(resp: HttpResponse) -> int:
+	return len(resp.body) + len(resp.final_url) + sum(len(k) + len(v) for k, v in resp.headers.items())
+
+
+_validator_stores: Dict[Path, ValidatorStore] = {}
+_validator_lock = threading.Lock()
+
+
+def validator_store() -> ValidatorStore:
+	# One store per report directory, persisted across runs as validators.json
+	path = ensure_report_dir() / "validators.json"
+	with _validator_lock:
+		store = _validator_stores.get(path)
+		if store is None:
+			store = _validator_stores[path] = ValidatorStore(path)
+		return store
+
+
+_timeseries_stores: Dict[Path, TimeSeriesStore] = {}
+
+
+def timeseries_store() -> Optional[TimeSeriesStore]:
+	# Sample history of the checks, kept across runs next to the reports
+	if not cfg.TIMESERIES_DB:
+		return None
+	path = ensure_report_dir() / cfg.TIMESERIES_DB
+	with _validator_lock:
+		store = _timeseries_stores.get(path)
+		if store is None:
+			store = _timeseries_stores[path] = TimeSeriesStore(path)
+		return store
+
+
+# Called with each body chunk as it arrives; returning False stops the download
+ChunkCallback = Callable[[bytes], Optional[bool]]
+
+
+class RedirectError(Exception):
+	pass
+
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+
+
+def http_request(url: str, *, method: str = "GET", timeout: Optional[int] = None, headers: Optional[Dict[str, str]] = None, fresh: bool = False, conditional: Optional[str] = None, probe: bool = False, probe_bytes: int = 0, max_body_bytes: Optional[int] = None, on_chunk: Optional[ChunkCallback] = None, keep_body: bool = True, follow_redirects: bool = True) -> HttpResponse:
+	# Inside run_cache(), plain GET/HEAD requests are served from the run's cache; fresh=True forces a download.
+	# conditional="<namespace>" sends the ETag/Last-Modified stored under that validator namespace (see
+	# fetch_validated), so an unchanged URL answers 304 with no body.
+	# probe=True fetches metadata only (see _probe); probe_bytes > 0 also returns the first bytes of the body.
+	# The body is read in chunks, hashed on the fly and capped at max_body_bytes (default MAX_BODY_BYTES);
+	# on_chunk streams it to a consumer, and keep_body=False skips buffering it altogether.
+	# Redirects are followed up to MAX_REDIRECTS (see HttpResponse.redirect_chain); RedirectError on loops/overflow.
+	if conditional and cfg.CONDITIONAL_REQUESTS:
+		headers = {**validator_store().headers_for(conditional, url), **(headers or {})}
+	if probe:
+		key: Tuple[Any, ...] = ("PROBE", url, probe_bytes)
+		hop = lambda u: _probe(u, timeout=timeout, headers=headers, probe_bytes=probe_bytes)
+	else:
+		key = (method, url)
+		hop = lambda u: _fetch(u, method=method, timeout=timeout, headers=headers, max_body_bytes=max_body_bytes, on_chunk=on_chunk, keep_body=keep_body)
+	fetch = (lambda: _follow_redirects(url, hop)) if follow_redirects else (lambda: hop(url))
+	if not follow_redirects:
+		key += ("no-redirects",)
+	if cfg.HEDGE_REQUESTS and method in ("GET", "HEAD") and on_chunk is None:
+		fetch = _hedged(url, fetch)
+	cache = _run_cache
+	# Streamed or size-limited downloads are specific to their caller, so they bypass the shared cache
+	if cache is None or headers or method not in ("GET", "HEAD") or on_chunk is not None or not keep_body or max_body_bytes is not None:
+		return fetch()
+	return cache.get_or_fetch(key, fetch, _response_size, refresh=fresh)
+
+
+def _hedged(url: str, fetch: Callable[[], HttpResponse]) -> Callable[[], HttpResponse]:
+	# A request still running at the host's p95 gets a duplicate; only once the host has enough samples
+	delay_ms = host_latency.quantile(circuit_host(url), cfg.HEDGE_QUANTILE)
+	if delay_ms is None:
+		return fetch
+	return lambda: hedger.call(fetch, delay_ms / 1000.0)
+
+
+def circuit_host(url: str) -> str:
+	# Circuits and latencies are per host:port, so a dead port does not block the rest of the host
+	parsed = urllib.parse.urlsplit(url)
+	port = parsed.port or (443 if parsed.scheme == "https" else 80)
+	return f"{(parsed.hostname or '').lower()}:{port}"
+
+
+def _follow_redirects(url: str, hop: Callable[[str], HttpResponse]) -> HttpResponse:
+	# Hops already resolved during this run are skipped without a request
+	redirects = _run_redirects
+	chain: List[Dict[str, Any]] = []
+	current = url
+	while True:
+		cached = redirects.get(current) if redirects is not None else None
+		if cached is not None:
+			status, target = cached
+		else:
+			resp = hop(current)
+			target = redirect_target(resp, current)
+			if target is None:
+				if chain:
+					resp = dataclasses.replace(resp, final_url=current, redirect_chain=chain)
+				return resp
+			status = resp.status
+			if redirects is not None:
+				redirects.put(current, status, target)
+		current = add_redirect_hop(chain, url, current, status, target)
+
+
+def redirect_target(resp: HttpResponse, current: str) -> Optional[str]:
+	# Absolute URL a response redirects to, or None if it is not a redirect
+	location = resp.headers.get("location")
+	if resp.status not in REDIRECT_STATUSES or not location:
+		return None
+	return urllib.parse.urljoin(current, location)
+
+
+def add_redirect_hop(chain: List[Dict[str, Any]], url: str, current: str, status: int, target: str) -> str:
+	chain.append({"url": current, "status": status, "location": target})
+	if len(chain) > cfg.MAX_REDIRECTS:
+		raise RedirectError(f"Too many redirects ({len(chain)}) starting at {url}")
+	if any(h["url"] == target for h in chain):
+		raise RedirectError(f"Redirect loop at {target}")
+	return target
+
+
+def run_redirects() -> Optional[RedirectCache]:
+	return _run_redirects
+
+
+# HEAD answers that usually mean "HEAD not supported here" rather than a real error
+_HEAD_REFUSED = (403, 405, 501)
+
+
+def _probe(url: str, *, timeout: Optional[int] = None, headers: Optional[Dict[str, str]] = None, probe_bytes: int = 0) -> HttpResponse:
+	# HEAD when only metadata is needed; a ranged GET when the first bytes are needed too or HEAD is refused.
+	# The size comes from Content-Length / Content-Range (HttpResponse.total_size).
+	if probe_bytes <= 0:
+		resp = _fetch(url, method="HEAD", timeout=timeout, headers=dict(headers or {}))
+		if resp.status not in _HEAD_REFUSED:
+			return resp
+	limit = max(probe_bytes, 1)
+	ranged = {**(headers or {}), "Range": f"bytes=0-{limit - 1}"}
+	resp = _fetch(url, timeout=timeout, headers=ranged, max_body_bytes=limit)
+	if resp.status in (206, 416):
+		# Partial content (or an empty file) still means the resource exists
+		resp = dataclasses.replace(resp, status=200, truncated=False)
+	return resp
+
+
+def _resource_size(headers: Dict[str, str], bytes_read: int, method: str, complete: bool) -> Optional[int]:
+	content_range = headers.get("content-range", "")
+	if "/" in content_range:
+		total = content_range.rsplit("/", 1)[1].strip()
+		return int(total) if total.isdigit() else None
+	length = headers.get("content-length", "")
+	if length.isdigit():
+		return int(length)
+	return bytes_read if complete and method != "HEAD" else None
+
+
+def fetch_validated(url: str, extract: Callable[[HttpResponse], Any], *, namespace: str, **options: Any) -> Tuple[HttpResponse, Any, bool]:
+	# Returns (response, extracted data, reused). On 304 the data stored by the last full fetch is reused
+	# instead of calling extract(); extract() must return JSON-serializable data.
+	# Validators and data are stored per namespace: each extract() gets its own entry for a URL.
+	# options are passed on to http_request.
+	# A body another module already downloaded this run beats even a conditional request
+	cache = _run_cache
+	# Modules run concurrently, so a download of the same page in flight elsewhere is waited for
+	cached = cache.get(("GET", url), wait=True) if cache is not None and not options.get("probe") else None
+	resp = cached or http_request(url, conditional=namespace, **options)
+	data, reused = apply_validators(namespace, url, resp, extract)
+	return resp, data, reused
+
+
+def apply_validators(namespace: str, url: str, resp: HttpResponse, extract: Callable[[HttpResponse], Any]) -> Tuple[Any, bool]:
+	# Returns (data, reused): the stored data for a 304, else extract(resp), recorded when it came with a 200
+	store = validator_store()
+	if resp.status == 304:
+		entry = store.get(namespace, url)
+		if entry is not None:
+			store.touch(namespace, url)
+			return entry["data"], True
+	data = extract(resp)
+	if resp.status == 200:
+		store.record(namespace, url, resp.headers, data)
+	return data, False
+
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def _open(url: str, method: str, timeout: Optional[int], headers: Optional[Dict[str, str]]) -> Tuple[PoolKey, http.client.HTTPConnection, http.client.HTTPResponse, float, Optional[Dict[str, float]]]:
+	# Sends the request on a pooled connection and returns once the status line and headers are in.
+	# The last item holds the DNS/connect/TLS timings, or None if an open connection was reused.
 	parsed = urllib.parse.urlparse(url)
 	if parsed.scheme not in ("http", "https"):
 		raise ValueError("Unsupported scheme")
 
-	conn_cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
 	port = parsed.port or (443 if parsed.scheme == "https" else 80)
 	path = parsed.path or "/"
 	if parsed.query:
@@ -96,25 +474,126 @@ def http_request(url: str, *, method: str = "GET", timeout: Optional[int] = None
 	headers = headers or {}
 	headers.setdefault("User-Agent", cfg.USER_AGENT)
 
-	conn = conn_cls(parsed.hostname, port, timeout=timeout or cfg.REQUEST_TIMEOUT_SECONDS)
-	start = time.perf_counter()
-	conn.request(method, path, headers=headers)
-	resp = conn.getresponse()
+	key = (parsed.scheme, parsed.hostname or "", port)
+	host = circuit_host(url)
+	circuit_breaker.before(host)
+	while True:
+		try:
+			conn, reused = http_pool.acquire(key, timeout or cfg.REQUEST_TIMEOUT_SECONDS)
+		except (OSError, http.client.HTTPException):
+			circuit_breaker.failure(host)
+			raise
+		try:
+			start = time.perf_counter()
+			conn.request(method, path, headers=headers)
+			resp = conn.getresponse()
+			circuit_breaker.success(host)
+			return key, conn, resp, start, conn.take_phase_timings()
+		except _STALE_CONNECTION_ERRORS:
+			http_pool.discard(key, conn)
+			if reused:
+				continue  # idle connection went stale; try the next one
+			circuit_breaker.failure(host)
+			raise
+		except (OSError, http.client.HTTPException):
+			http_pool.discard(key, conn)
+			circuit_breaker.failure(host)
+			raise
+		except BaseException:
+			http_pool.discard(key, conn)
+			raise
+
+
+def _read_body(resp: http.client.HTTPResponse, max_body_bytes: Optional[int], on_chunk: Optional[ChunkCallback], keep_body: bool) -> Tuple[bytes, str, int, bool]:
+	# Returns (body, sha256 of the bytes read, bytes read, truncated); memory stays within max_body_bytes
+	digest = hashlib.sha256()
+	parts: List[bytes] = []
+	read = 0
+	while True:
+		want = _CHUNK_SIZE if max_body_bytes is None else min(_CHUNK_SIZE, max_body_bytes - read)
+		if want <= 0:
+			break
+		chunk = resp.read(want)
+		if not chunk:
+			break
+		read += len(chunk)
+		digest.update(chunk)
+		if keep_body:
+			parts.append(chunk)
+		if on_chunk is not None and on_chunk(chunk) is False:
+			break
+	return b"".join(parts), digest.hexdigest(), read, not resp.isclosed()
+
+
+def _fetch(url: str, *, method: str = "GET", timeout: Optional[int] = None, headers: Optional[Dict[str, str]] = None, max_body_bytes: Optional[int] = None, on_chunk: Optional[ChunkCallback] = None, keep_body: bool = True) -> HttpResponse:
+	key, conn, resp, start, setup = _open(url, method, timeout, headers)
+	try:
+		first_byte_ms = (time.perf_counter() - start) * 1000.0
+		limit = max_body_bytes if max_body_bytes is not None else cfg.MAX_BODY_BYTES
+		if resp.status in REDIRECT_STATUSES and resp.getheader("location"):
+			# A redirect's own body is never what a streaming consumer asked for
+			on_chunk = None
+		body, sha256, bytes_read, truncated = _read_body(resp, limit, on_chunk, keep_body)
+		elapsed_ms = (time.perf_counter() - start) * 1000.0
+	except BaseException:
+		http_pool.discard(key, conn)
+		raise
+	# A body left unread (size cap, early abort, server ignoring Range) makes the connection unusable
+	http_pool.release(key, conn, reusable=not truncated and not resp.will_close)
+	host_latency.add(circuit_host(url), elapsed_ms)
+	resp_headers = normalize_headers(resp.getheaders())
+	timings = _phase_timings(setup, first_byte_ms)
+	timings["download_ms"] = elapsed_ms - first_byte_ms
+	return HttpResponse(
+		status=resp.status, headers=resp_headers, body=body, elapsed_ms=elapsed_ms, final_url=url,
+		total_size=_resource_size(resp_headers, bytes_read, method, not truncated),
+		truncated=truncated, body_sha256=sha256, timings=timings, connection_reused=setup is None,
+	)
+
+
+def _phase_timings(setup: Optional[Dict[str, float]], first_byte_ms: float) -> Dict[str, float]:
+	# TTFB counts from the moment the request could be sent, i.e. after DNS/connect/TLS
+	timings = dict(setup or {"dns_ms": 0.0, "connect_ms": 0.0, "tls_ms": 0.0})
+	timings["ttfb_ms"] = max(0.0, first_byte_ms - sum(timings.values()))
+	return timings
+
+
+@contextlib.contextmanager
+def stream_request(url: str, *, method: str = "GET", timeout: Optional[int] = None, headers: Optional[Dict[str, str]] = None, chunk_size: int = _CHUNK_SIZE) -> Iterator[Tuple[HttpResponse, Iterator[bytes]]]:
+	# Generator interface: yields (response with empty body, chunk iterator). Stop iterating at any point;
+	# the connection goes back to the pool only if the body was read to the end.
+	key, conn, resp, start, setup = _open(url, method, timeout, headers)
 	first_byte_ms = (time.perf_counter() - start) * 1000.0
-	body = resp.read()
-	elapsed_ms = (time.perf_counter() - start) * 1000.0
-	final_url = url  # naive; without redirects handling via low-level HTTP
-	return HttpResponse(status=resp.status, headers=normalize_headers(resp.getheaders()), body=body, elapsed_ms=elapsed_ms, final_url=final_url)
+	head = HttpResponse(
+		status=resp.status, headers=normalize_headers(resp.getheaders()), body=b"",
+		elapsed_ms=first_byte_ms, final_url=url,
+		timings=_phase_timings(setup, first_byte_ms), connection_reused=setup is None,
+	)
+	head.total_size = _resource_size(head.headers, 0, method, False)
+
+	def chunks() -> Iterator[bytes]:
+		while True:
+			chunk = resp.read(chunk_size)
+			if not chunk:
+				return
+			yield chunk
+
+	try:
+		yield head, chunks()
+	except BaseException:
+		http_pool.discard(key, conn)
+		raise
+	http_pool.release(key, conn, reusable=resp.isclosed() and not resp.will_close)
 
 
 def extract_links(html: bytes, base_url: str) -> List[str]:
-	# Very basic href/src extraction; avoids heavy dependencies
-	text = html.decode("utf-8", errors="ignore")
-	urls: List[str] = []
-	for pattern in (r"href\s*=\s*\"([^\"]+)\"", r"href\s*=\s*'([^']+)'", r"src\s*=\s*\"([^\"]+)\"", r"src\s*=\s*'([^']+)'"):
-		for match in re.findall(pattern, text, flags=re.IGNORECASE):
-			urls.append(urllib.parse.urljoin(base_url, match))
-	return urls
+	# href/src of every tag; see html_scan for the single-pass tokenizer
+	return scan_html(html, base_url).links
+
+
+def is_html(resp: HttpResponse) -> bool:
+	content_type = resp.headers.get("content-type", "")
+	return not content_type or "html" in content_type
 
 
 def is_allowed_url(url: str) -> bool:
@@ -122,20 +601,22 @@ def is_allowed_url(url: str) -> bool:
 	return (parsed.scheme in ("http", "https")) and (parsed.hostname in cfg.ALLOWED_HOSTS)
 
 
+def fetch_certificate(hostname: str, port: int = 443) -> Dict[str, Any]:
+	# One TLS handshake just for the certificate; raises on connection or verification errors
+	infos = dns_cache.resolve(hostname, port, cfg.REQUEST_TIMEOUT_SECONDS)
+	with _connect_any(infos, cfg.REQUEST_TIMEOUT_SECONDS) as sock:
+		with http_pool.context.wrap_socket(sock, server_hostname=hostname) as ssock:
+			info = certificate_info(ssock)
+	if info is None or info["days_left"] is None:
+		raise ValueError("No notAfter in certificate")
+	return info
+
+
 def check_ssl_expiry(hostname: str) -> Tuple[Optional[int], Optional[str]]:
-	# Returns (days_left, error)
-	import socket
+	# Returns (days_left, error). A certificate already seen on a pooled connection saves the handshake.
 	try:
-		with socket.create_connection((hostname, 443), timeout=cfg.REQUEST_TIMEOUT_SECONDS) as sock:
-			with ssl_module.create_default_context().wrap_socket(sock, server_hostname=hostname) as ssock:
-				cert = ssock.getpeercert()
-			expires_str = cert.get("notAfter")
-			if not expires_str:
-				return None, "No notAfter in certificate"
-			# Format like 'Jun 20 12:00:00 2026 GMT'
-			expires = datetime.strptime(expires_str, "%b %d %H:%M:%S %Y %Z")
-			days = (expires - datetime.utcnow()).days
-			return days, None
+		info = http_pool.certificates.get(hostname) or fetch_certificate(hostname)
+		return info["days_left"], None
 	except Exception as e:
 		return None, str(e)
 
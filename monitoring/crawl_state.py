@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class CrawlState:
+	"""What the last incremental crawl saw: per-page results and fingerprints, plus the unvisited frontier."""
+
+	def __init__(self, path: Path) -> None:
+		self.path = path
+		self._lock = threading.Lock()
+		self.pages: Dict[str, Dict[str, Any]] = {}
+		self.frontier: List[Tuple[str, int]] = []
+		if path.exists():
+			try:
+				data = json.loads(path.read_text(encoding="utf-8"))
+				self.pages = data.get("pages", {})
+				self.frontier = [(url, depth) for url, depth in data.get("frontier", [])]
+			except (OSError, ValueError, TypeError):
+				pass  # unreadable state: next crawl is a full one
+
+	def get(self, url: str) -> Optional[Dict[str, Any]]:
+		with self._lock:
+			return self.pages.get(url)
+
+	def is_fresh(self, url: str, ttl_seconds: float, lastmod: Optional[str] = None) -> bool:
+		# Reusable without a request: seen before without error or HTTP error status, not past the TTL,
+		# and the sitemap does not announce a newer version
+		entry = self.get(url)
+		if entry is None or entry.get("error") is not None or entry.get("status", 0) >= 400:
+			return False
+		if time.time() - entry.get("fetched_at", 0) > ttl_seconds:
+			return False
+		return lastmod is None or lastmod == entry.get("lastmod")
+
+	def record(self, url: str, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+		# Returns the entry it replaces, if any
+		with self._lock:
+			previous = self.pages.get(url)
+			self.pages[url] = entry
+		return previous
+
+	def save(self, frontier: List[Tuple[str, int]]) -> None:
+		with self._lock:
+			self.frontier = list(frontier)
+			tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+			tmp.write_text(json.dumps({"pages": self.pages, "frontier": self.frontier}, ensure_ascii=False), encoding="utf-8")
+			os.replace(tmp, self.path)
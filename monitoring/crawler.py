@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import contextlib
+import dataclasses
+import posixpath
+import time
+import urllib.parse
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .async_http import AsyncHttpClient
+from .common import HttpResponse, cfg, ensure_report_dir, fetch_validated, is_allowed_url, is_html, validator_store
+from .crawl_state import CrawlState
+from .html_scan import HtmlScanner, ScanResult, scan_html
+from .url_index import UrlIndex
+from .validators import digest_of
+
+
+@dataclasses.dataclass
+class Page:
+	url: str
+	depth: int
+	response: Optional[HttpResponse] = None
+	error: Optional[str] = None
+	scan: Optional[ScanResult] = None  # parsed once here, shared by all visitors
+	not_modified: bool = False  # answered 304; response/scan rebuilt from the validator store
+	duplicate: bool = False  # redirected to a page this crawl already visited
+	replayed: bool = False  # not fetched: taken from the previous incremental crawl (see CrawlState)
+
+	@property
+	def links(self) -> List[str]:
+		return self.scan.links if self.scan is not None else []
+
+	@property
+	def final_url(self) -> str:
+		return self.response.final_url if self.response is not None else self.url
+
+
+class PageVisitor:
+	"""A check that inspects every crawled page. Subclasses override visit() and finish()."""
+
+	def start_urls(self) -> List[str]:
+		return [cfg.SITE_URL]
+
+	def visit(self, page: Page) -> None:
+		raise NotImplementedError
+
+	def finish(self) -> Dict[str, Any]:
+		raise NotImplementedError
+
+
+# Linked files that are only checked for existence: probed with HEAD instead of downloaded
+ASSET_EXTENSIONS = frozenset((
+	".pdf", ".js", ".css", ".zip", ".rar", ".7z", ".gz", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx",
+	".jpg", ".jpeg", ".png", ".gif", ".webp", ".avif", ".svg", ".ico", ".bmp",
+	".mp3", ".mp4", ".webm", ".avi", ".mov", ".woff", ".woff2", ".ttf", ".eot", ".otf",
+))
+
+
+def is_asset_url(url: str) -> bool:
+	path = urllib.parse.urlsplit(url).path
+	return posixpath.splitext(path)[1].lower() in ASSET_EXTENSIONS
+
+
+def _page_data(resp: HttpResponse, scanner: Optional[HtmlScanner] = None) -> Dict[str, Any]:
+	scan = None
+	if resp.status < 400 and is_html(resp):
+		# Streamed pages were scanned chunk by chunk; a response taken from the run cache still has its body.
+		# Relative links resolve against the URL the redirects ended at.
+		scan = scanner.close(resp.final_url) if scanner is not None and not resp.body else scan_html(resp.body, resp.final_url)
+	return {
+		"status": resp.status,
+		"content_type": resp.headers.get("content-type", ""),
+		"scan": dataclasses.asdict(scan) if scan is not None else None,
+	}
+
+
+def fetch_page(url: str, depth: int) -> Page:
+	try:
+		if is_asset_url(url):
+			resp, data, reused = fetch_validated(url, _page_data, namespace="crawl", probe=True)
+		else:
+			# The body is scanned as it streams in and never buffered, so memory per page stays bounded
+			scanner = HtmlScanner(url)
+			resp, data, reused = fetch_validated(url, lambda r: _page_data(r, scanner), namespace="crawl", on_chunk=scanner.feed, keep_body=False)
+		return _page(url, depth, resp, data, reused)
+	except Exception as e:
+		return Page(url=url, depth=depth, error=str(e))
+
+
+async def fetch_page_async(client: AsyncHttpClient, url: str, depth: int) -> Page:
+	# Same as fetch_page, on the asyncio backend
+	try:
+		if is_asset_url(url):
+			resp, data, reused = await client.fetch_validated(url, _page_data, namespace="crawl", probe=True)
+		else:
+			scanner = HtmlScanner(url)
+			resp, data, reused = await client.fetch_validated(url, lambda r: _page_data(r, scanner), namespace="crawl", on_chunk=scanner.feed, keep_body=False)
+		return _page(url, depth, resp, data, reused)
+	except Exception as e:
+		return Page(url=url, depth=depth, error=str(e) or type(e).__name__)
+
+
+def _page(url: str, depth: int, resp: HttpResponse, data: Dict[str, Any], reused: bool) -> Page:
+	if reused:
+		resp = dataclasses.replace(resp, status=data["status"], headers={**resp.headers, "content-type": data["content_type"]})
+	scan = ScanResult(**data["scan"]) if data["scan"] is not None else None
+	return Page(url=url, depth=depth, response=resp, scan=scan, not_modified=reused)
+
+
+def crawl_state() -> CrawlState:
+	return CrawlState(ensure_report_dir() / "crawl_state.json")
+
+
+def _fingerprint(page: Page, previous: Optional[Dict[str, Any]]) -> Optional[str]:
+	resp = page.response
+	if page.not_modified and previous is not None:
+		return previous.get("fingerprint")
+	if is_asset_url(page.url):
+		# Probed, not downloaded: the validators and size stand in for the content
+		headers = resp.headers
+		return digest_of([resp.status, headers.get("etag"), headers.get("last-modified"), resp.total_size])
+	return resp.body_sha256
+
+
+def _state_entry(page: Page, lastmod: Optional[str], fingerprint: Optional[str]) -> Dict[str, Any]:
+	if page.response is None:
+		return {"error": page.error, "fetched_at": time.time()}
+	resp = page.response
+	return {
+		"fetched_at": time.time(),
+		"lastmod": lastmod,
+		"fingerprint": fingerprint,
+		"status": resp.status,
+		"content_type": resp.headers.get("content-type", ""),
+		"final_url": resp.final_url,
+		"redirect_chain": resp.redirect_chain,
+		"scan": dataclasses.asdict(page.scan) if page.scan is not None else None,
+		"error": None,
+	}
+
+
+def _remember_urls(seen: UrlIndex) -> int:
+	# Adds this crawl's URLs to the index kept between runs; returns how many it had never seen.
+	# That count is all the saved index is for: a crawl still revisits known URLs (fetched or replayed),
+	# so deduplication within a crawl uses its own in-memory index, not this one.
+	path = ensure_report_dir() / cfg.URL_INDEX_FILE
+	known = UrlIndex.load(path, cfg.URL_INDEX_BLOOM_BITS)
+	first_seen = sum(known.add_fingerprint(fp) for fp in seen.fingerprints())
+	known.save(path)
+	return first_seen
+
+
+def _replay(url: str, depth: int, entry: Dict[str, Any]) -> Future:
+	resp = HttpResponse(
+		status=entry["status"], headers={"content-type": entry["content_type"]}, body=b"", elapsed_ms=0.0,
+		final_url=entry["final_url"], redirect_chain=entry["redirect_chain"],
+	)
+	scan = ScanResult(**entry["scan"]) if entry["scan"] is not None else None
+	future: Future = Future()
+	future.set_result(Page(url=url, depth=depth, response=resp, scan=scan, replayed=True))
+	return future
+
+
+class Crawler:
+	"""Breadth-first crawl of the allowed hosts, fetching each URL once and handing it to every visitor."""
+
+	def __init__(self, visitors: Sequence[PageVisitor], *, max_pages: Optional[int] = None, max_depth: Optional[int] = None, workers: Optional[int] = None, seeds: Sequence[str] = (), backend: Optional[str] = None, incremental: Optional[bool] = None, lastmod: Optional[Dict[str, str]] = None) -> None:
+		self.visitors = list(visitors)
+		self.seeds = list(seeds)  # extra depth-0 URLs, e.g. from the sitemap
+		self.lastmod = lastmod or {}  # url -> sitemap <lastmod>
+		# Incremental: only new, changed (per sitemap lastmod) or TTL-stale pages are fetched, and
+		# max_pages limits fetches; everything else is replayed from the previous crawl's results
+		self.incremental = cfg.INCREMENTAL_CRAWL if incremental is None else incremental
+		self.max_pages = max_pages if max_pages is not None else cfg.MAX_PAGES_CRAWL
+		self.max_depth = max_depth if max_depth is not None else cfg.MAX_CRAWL_DEPTH
+		self.workers = max(1, workers or cfg.CRAWL_WORKERS)
+		self.backend = backend or cfg.HTTP_BACKEND
+		if self.backend not in ("threads", "asyncio"):
+			raise ValueError(f"Unknown HTTP backend: {self.backend}")
+
+	@contextlib.contextmanager
+	def _fetcher(self) -> Iterator[Tuple[Callable[[str, int], Future], int]]:
+		# Yields (submit(url, depth) -> Future of a Page, number of pages to keep in flight)
+		if self.backend == "asyncio":
+			with AsyncHttpClient() as client:
+				yield (lambda url, depth: client.submit(fetch_page_async(client, url, depth))), client.max_in_flight
+		else:
+			with ThreadPoolExecutor(max_workers=self.workers) as pool:
+				yield (lambda url, depth: pool.submit(fetch_page, url, depth)), self.workers
+
+	def crawl(self) -> Dict[str, Any]:
+		seeds: Dict[str, None] = {}  # ordered set
+		for visitor in self.visitors:
+			for url in visitor.start_urls():
+				seeds[url] = None
+		for url in self.seeds:
+			if url not in seeds and is_allowed_url(url):
+				seeds[url] = None
+
+		queue: deque[Tuple[str, int]] = deque((url, 0) for url in seeds)
+		# Everything fetched or queued, so the queue never holds duplicates; fingerprints, not strings
+		seen = UrlIndex(len(seeds), cfg.URL_INDEX_BLOOM_BITS)
+		seen.update(seeds)
+		state = crawl_state() if self.incremental else None
+		if state is not None:
+			# Pages the previous run had no budget for come right after the seeds
+			for url, depth in state.frontier:
+				if url not in seen and is_allowed_url(url):
+					seen.add(url)
+					queue.append((url, depth))
+		ttl = cfg.CRAWL_TTL_HOURS * 3600.0
+		deferred: List[Tuple[str, int]] = []  # over the fetch budget
+		landed = UrlIndex(bloom_bits_per_url=cfg.URL_INDEX_BLOOM_BITS)  # final URLs of consumed pages, after redirects
+		fetched = 0
+		not_modified = 0
+		replayed = 0
+		new = 0
+		changed = 0
+		redirected = 0
+		deepest = 0
+
+		# Pages are fetched concurrently but consumed in submission order, so reports are deterministic
+		pending: deque[Tuple[int, Future]] = deque()
+		with self._fetcher() as (submit, in_flight):
+			while queue or pending:
+				while queue and len(pending) < in_flight:
+					url, depth = queue.popleft()
+					if state is not None and state.is_fresh(url, ttl, self.lastmod.get(url)):
+						replayed += 1
+						pending.append((depth, _replay(url, depth, state.get(url))))
+					elif fetched < self.max_pages:
+						fetched += 1
+						pending.append((depth, submit(url, depth)))
+					else:
+						deferred.append((url, depth))
+				if not pending:
+					break
+				depth, future = pending.popleft()
+				page: Page = future.result()
+				deepest = max(deepest, depth)
+				not_modified += page.not_modified
+				if state is not None and not page.replayed:
+					fingerprint = _fingerprint(page, state.get(page.url)) if page.response is not None else None
+					previous = state.record(page.url, _state_entry(page, self.lastmod.get(page.url), fingerprint))
+					if previous is None:
+						new += 1
+					elif fingerprint is not None and previous.get("fingerprint") != fingerprint:
+						changed += 1
+				final_url = page.final_url
+				if final_url != page.url:
+					redirected += 1
+					seen.add(final_url)
+				page.duplicate = final_url in landed
+				landed.add(final_url)
+				for visitor in self.visitors:
+					visitor.visit(page)
+				if page.duplicate or (self.max_depth is not None and depth >= self.max_depth):
+					continue
+				for link in page.links:
+					if link not in seen and is_allowed_url(link):
+						seen.add(link)
+						queue.append((link, depth + 1))
+
+		validator_store().save()
+		deferred.extend(queue)
+		stats: Dict[str, Any] = {
+			"pages_fetched": fetched,
+			"pages_not_modified": not_modified,
+			"pages_redirected": redirected,
+			"max_depth_reached": deepest,
+			"queued_not_fetched": len(deferred),
+			"urls_discovered": len(seen),
+			"url_index_bytes": seen.nbytes,
+		}
+		if state is not None:
+			state.save(deferred)
+			stats["urls_first_seen"] = _remember_urls(seen)
+			stats.update({"incremental": True, "pages_replayed": replayed, "pages_new": new, "pages_changed": changed, "pages_known": len(state.pages)})
+		return stats
+
+
+def crawl_site(visitors: Sequence[PageVisitor], seeds: Sequence[str] = (), lastmod: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+	return Crawler(visitors, seeds=seeds, lastmod=lastmod).crawl()
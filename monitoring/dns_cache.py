@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import os
+import socket
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+AddrInfo = Tuple[int, int, int, str, Tuple[Any, ...]]  # as returned by socket.getaddrinfo
+
+
+def _system_lookup(host: str) -> List[AddrInfo]:
+	return socket.getaddrinfo(host, None, 0, socket.SOCK_STREAM)
+
+
+def with_port(infos: List[AddrInfo], port: int) -> List[AddrInfo]:
+	# Entries are cached per host; the port goes into each socket address at use
+	return [(family, socktype, proto, canon, (address[0], port) + tuple(address[2:])) for family, socktype, proto, canon, address in infos]
+
+
+class DnsCache:
+	"""Process-wide host -> getaddrinfo() cache with expiry, negative caching and shared lookups.
+
+	The system resolver does not expose record TTLs, so answers are kept for `ttl` seconds (failures
+	for `negative_ttl`); a short ttl leaves the real TTLs to the OS resolver's own cache. Lookups run
+	on a small thread pool, so callers can wait with a timeout and several hosts resolve at once.
+	"""
+
+	def __init__(self, ttl: float = 300.0, negative_ttl: float = 30.0, workers: int = 8, lookup: Callable[[str], List[AddrInfo]] = _system_lookup) -> None:
+		self.ttl = ttl
+		self.negative_ttl = negative_ttl
+		self._lookup = lookup
+		self._workers = max(1, workers)
+		self._executor: Optional[ThreadPoolExecutor] = None
+		self._pid = os.getpid()
+		self._lock = threading.Lock()
+		# host -> (expires at, Future of infos); in-flight lookups are shared the same way
+		self._entries: Dict[str, Tuple[float, Future]] = {}
+		self.hits = 0
+		self.misses = 0
+
+	def submit(self, host: str) -> Future:
+		# Future of the host's address list, completed at once on a cache hit
+		host = host.lower()
+		now = time.monotonic()
+		with self._lock:
+			if self._pid != os.getpid():
+				self._after_fork()
+			entry = self._entries.get(host)
+			if entry is not None and (not entry[1].done() or entry[0] > now):
+				self.hits += 1
+				return entry[1]
+			self.misses += 1
+			if self._executor is None:
+				self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="dns")
+			future = self._executor.submit(self._lookup, host)
+			self._entries[host] = (now, future)
+		future.add_done_callback(lambda f: self._expire_at(host, f))
+		return future
+
+	def _expire_at(self, host: str, future: Future) -> None:
+		ttl = self.negative_ttl if future.exception() is not None else self.ttl
+		with self._lock:
+			if self._entries.get(host, (0, None))[1] is future:
+				self._entries[host] = (time.monotonic() + ttl, future)
+
+	def resolve(self, host: str, port: int, timeout: Optional[float] = None) -> List[AddrInfo]:
+		# Drop-in for socket.getaddrinfo(host, port, 0, SOCK_STREAM); a slow resolver raises socket.timeout
+		future = self.submit(host)
+		done, _ = wait([future], timeout)
+		if not done:
+			raise socket.timeout(f"DNS lookup for {host} timed out")
+		return with_port(future.result(), port)
+
+	def addresses(self, host: str, timeout: Optional[float] = None) -> List[str]:
+		# Unique IPs in resolver order
+		return list(dict.fromkeys(info[4][0] for info in self.resolve(host, 0, timeout)))
+
+	def prefetch(self, hosts: Iterable[str], timeout: Optional[float] = None) -> Dict[str, Optional[str]]:
+		# Resolves all hosts concurrently; host -> error message, or None when it resolved
+		futures = {host: self.submit(host) for host in dict.fromkeys(h for h in hosts if h)}
+		wait(list(futures.values()), timeout)
+		errors: Dict[str, Optional[str]] = {}
+		for host, future in futures.items():
+			if not future.done():
+				errors[host] = "timed out"
+			else:
+				error = future.exception()
+				errors[host] = str(error) if error is not None else None
+		return errors
+
+	def _after_fork(self) -> None:
+		# A forked worker inherits the answers but not the lookup threads, nor lookups still in flight
+		self._pid = os.getpid()
+		self._executor = None
+		self._entries = {host: entry for host, entry in self._entries.items() if entry[1].done()}
+
+	def clear(self) -> None:
+		with self._lock:
+			self._entries.clear()
+
+	def stats(self) -> Dict[str, int]:
+		with self._lock:
+			return {"hits": self.hits, "misses": self.misses, "hosts": len(self._entries)}
@@ -1,20 +1,20 @@
 from __future__ import annotations
 
 import socket
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, List
 from urllib.parse import urlparse
 
-from .common import append_markdown, now_iso, save_json, cfg
+from .common import append_markdown, dns_cache, now_iso, resolve_hosts, save_json, site_hosts, cfg
 
 
 def check_dns(hostname: str) -> Dict[str, Any]:
 	try:
-		# Get IPv4
-		ipv4 = socket.gethostbyname(hostname)
-		
-		# Get all addresses
-		addr_info = socket.getaddrinfo(hostname, None)
-		ips = list(set([info[4][0] for info in addr_info]))
+		# All addresses from one (cached) lookup; the first IPv4 one stands for the host
+		ips = dns_cache.addresses(hostname, cfg.REQUEST_TIMEOUT_SECONDS)
+		ipv4 = next((ip for ip in ips if ":" not in ip), None)
+		if ipv4 is None:
+			raise socket.gaierror(f"No IPv4 address for {hostname}")
 		
 		# Check reverse DNS (PTR)
 		try:
@@ -41,12 +41,19 @@ def check_dns(hostname: str) -> Dict[str, Any]:
 
 def run() -> Dict[str, Any]:
 	host = urlparse(cfg.SITE_URL).hostname or ""
+	hosts = site_hosts() or [host]
 	
-	dns_info = check_dns(host)
+	# Forward lookups of every allowed host at once, then their reverse lookups in parallel
+	resolve_hosts(hosts)
+	with ThreadPoolExecutor(max_workers=min(len(hosts), cfg.DNS_WORKERS)) as pool:
+		infos = dict(zip(hosts, pool.map(check_dns, hosts)))
+	dns_info = infos.pop(host, None) or check_dns(host)
 	
 	result: Dict[str, Any] = {
 		"host": host,
 		**dns_info,
+		"other_hosts": infos,
+		"resolver_cache": dns_cache.stats(),
 		"timestamp": now_iso(),
 	}
 	
@@ -54,6 +61,9 @@ def run() -> Dict[str, Any]:
 	status_line = f"- DNS: host={host} ipv4={result['ipv4']} ok={result['ok']}"
 	if result["error"]:
 		status_line += f" error={result['error']}"
+	failing = [name for name, info in infos.items() if not info["ok"]]
+	if failing:
+		status_line += f" unresolved_hosts={','.join(failing)}"
 	append_markdown("summary", status_line)
 	
 	return result
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class FetchCache:
+	"""Run-scoped LRU cache of responses, bounded by total body bytes.
+
+	Concurrent lookups of the same key wait for the first fetch instead of
+	downloading the URL again.
+	"""
+
+	def __init__(self, max_bytes: int) -> None:
+		self.max_bytes = max_bytes
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+		self._inflight: Dict[Hashable, threading.Event] = {}
+		self._lock = threading.Lock()
+
+	def get(self, key: Hashable, wait: bool = False) -> Optional[Any]:
+		# wait=True: if the key is being fetched right now, wait for that fetch instead of missing
+		while True:
+			with self._lock:
+				entry = self._entries.get(key)
+				if entry is not None:
+					self._entries.move_to_end(key)
+					return entry[0]
+				waiter = self._inflight.get(key)
+			if not wait or waiter is None:
+				return None
+			waiter.wait()
+			wait = False
+
+	def put(self, key: Hashable, value: Any, size: int) -> None:
+		with self._lock:
+			self._store(key, value, size)
+
+	def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any], sizeof: Callable[[Any], int], refresh: bool = False) -> Any:
+		# refresh=True ignores a stored entry, but still shares a fetch that is already in flight
+		while True:
+			with self._lock:
+				entry = self._entries.get(key)
+				if entry is not None and not refresh:
+					self._entries.move_to_end(key)
+					self.hits += 1
+					return entry[0]
+				waiter = self._inflight.get(key)
+				if waiter is None:
+					waiter = self._inflight[key] = threading.Event()
+					self.misses += 1
+					break
+			# If the first fetch failed or was too big to keep, the next pass fetches it again
+			waiter.wait()
+			refresh = False
+		try:
+			value = fetch()
+			with self._lock:
+				self._store(key, value, sizeof(value))
+			return value
+		finally:
+			with self._lock:
+				event = self._inflight.pop(key, None)
+			if event is not None:
+				event.set()
+
+	def stats(self) -> Dict[str, int]:
+		with self._lock:
+			return {"entries": len(self._entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+	def _store(self, key: Hashable, value: Any, size: int) -> None:
+		old = self._entries.pop(key, None)
+		if old is not None:
+			self.size -= old[1]
+		if size > self.max_bytes:
+			return
+		self._entries[key] = (value, size)
+		self.size += size
+		while self.size > self.max_bytes and self._entries:
+			_, (_, evicted) = self._entries.popitem(last=False)
+			self.size -= evicted
+
+
+class RedirectCache:
+	"""Run-scoped map of resolved redirect hops: url -> (status, absolute target)."""
+
+	def __init__(self) -> None:
+		self.hits = 0
+		self._hops: Dict[str, Tuple[int, str]] = {}
+		self._lock = threading.Lock()
+
+	def get(self, url: str) -> Optional[Tuple[int, str]]:
+		with self._lock:
+			hop = self._hops.get(url)
+			if hop is not None:
+				self.hits += 1
+			return hop
+
+	def put(self, url: str, status: int, target: str) -> None:
+		with self._lock:
+			self._hops[url] = (status, target)
+
+	def stats(self) -> Dict[str, int]:
+		with self._lock:
+			return {"redirects": len(self._hops), "redirect_hits": self.hits}
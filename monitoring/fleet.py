@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import time
+import urllib.parse
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .common import append_markdown, cfg, now_iso, report_sink, resolve_hosts, save_json
+from .ssl_expiry import certificate_cache_path, check_certificates
+
+# A site profile is an entry of sites.json ("name", "url", as used by website_monitor.py) plus optional
+# "allowed_hosts" and "monitoring": {CONFIG_KEY: value} overrides for that site only.
+
+
+def load_profiles(path: str = "sites.json") -> List[Dict[str, Any]]:
+	with open(path, "r", encoding="utf-8") as f:
+		config = json.load(f)
+	return [site for site in config.get("sites", []) if site.get("url")]
+
+
+def site_slug(profile: Dict[str, Any]) -> str:
+	name = profile.get("name") or urllib.parse.urlsplit(profile["url"]).hostname or "site"
+	return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "site"
+
+
+def _site_config(profile: Dict[str, Any], base: Dict[str, Any]) -> Dict[str, Any]:
+	url = profile["url"]
+	host = urllib.parse.urlsplit(url).hostname or ""
+	bare = host[4:] if host.startswith("www.") else host
+	values = dict(base)
+	values.update({
+		"SITE_URL": url if urllib.parse.urlsplit(url).path else url + "/",
+		"ALLOWED_HOSTS": profile.get("allowed_hosts") or [bare, "www." + bare],
+		"REPORT_DIR": str(Path(base["REPORT_DIR"]) / "sites" / site_slug(profile)),
+	})
+	values.update({k: v for k, v in profile.get("monitoring", {}).items() if k.isupper() and k in base})
+	return values
+
+
+def _config_snapshot() -> Dict[str, Any]:
+	# Passed to the workers explicitly, so overrides made in this process apply under "spawn" too
+	return {k: getattr(cfg, k) for k in dir(cfg) if k.isupper()}
+
+
+def run_site(profile: Dict[str, Any], base: Dict[str, Any]) -> Dict[str, Any]:
+	# The whole suite for one site, with its own config and report directory. Usually in a worker
+	# process; with a single worker it runs in the caller's, so the caller's config is restored after.
+	from .run_all import run_single
+
+	site_config = _site_config(profile, base)
+	previous = _config_snapshot()
+	for k, v in site_config.items():
+		setattr(cfg, k, v)
+	started = time.perf_counter()
+	try:
+		aggregate = run_single()
+	except Exception as e:
+		return {"name": profile.get("name"), "url": profile["url"], "ok": False, "error": f"{type(e).__name__}: {e}"}
+	finally:
+		for k, v in previous.items():
+			setattr(cfg, k, v)
+	summary = site_summary(aggregate)
+	summary.update({
+		"name": profile.get("name"),
+		"report_dir": site_config["REPORT_DIR"],
+		"wall_ms": round((time.perf_counter() - started) * 1000.0, 1),
+	})
+	return summary
+
+
+def site_summary(aggregate: Dict[str, Any]) -> Dict[str, Any]:
+	# The per-site numbers worth comparing across the fleet; details stay in the site's own reports
+	uptime = aggregate.get("uptime", {})
+	modules = aggregate.get("modules", {})
+	failed = sorted(name for name, m in modules.items() if m.get("status") != "ok")
+	return {
+		"url": aggregate.get("site"),
+		"ok": bool(uptime.get("ok")) and not failed,
+		"status": uptime.get("status"),
+		"ttfb_ms": uptime.get("ttfb_ms"),
+		"ssl_days_left": aggregate.get("ssl", {}).get("days_left"),
+		"broken_links": aggregate.get("links", {}).get("broken_count"),
+		"seo_issues": aggregate.get("seo", {}).get("global_issues_count"),
+		"missing_security_headers": len(aggregate.get("security", {}).get("missing", [])),
+		"image_issues": len(aggregate.get("images", {}).get("issues", [])),
+		"pages_fetched": aggregate.get("crawl", {}).get("pages_fetched"),
+		"failed_modules": failed,
+	}
+
+
+def run_fleet(profiles: List[Dict[str, Any]], processes: Optional[int] = None) -> Dict[str, Any]:
+	"""Run the suite for every site profile, one site per worker process, and merge a fleet report."""
+	base = _config_snapshot()
+	workers = max(1, min(len(profiles), processes or cfg.FLEET_PROCESSES or os.cpu_count() or 1))
+	started = time.perf_counter()
+	# All sites' hosts resolve concurrently here; forked workers start with the answers
+	hosts: List[str] = []
+	tls_hosts: List[str] = []
+	for profile in profiles:
+		site_hosts = [urllib.parse.urlsplit(profile["url"]).hostname or ""] + list(_site_config(profile, base)["ALLOWED_HOSTS"])
+		hosts.extend(site_hosts)
+		if profile["url"].startswith("https:"):
+			tls_hosts.extend(site_hosts)
+	resolve_hosts(hosts)
+	# Same for the certificates: one concurrent batch, cached for the day in a file every worker reads
+	base["CERT_CACHE_FILE"] = str(certificate_cache_path())
+	check_certificates(tls_hosts)
+	if workers == 1:
+		sites = [run_site(profile, base) for profile in profiles]
+	else:
+		with ProcessPoolExecutor(max_workers=workers) as pool:
+			sites = list(pool.map(run_site, profiles, [base] * len(profiles)))
+
+	fleet: Dict[str, Any] = {
+		"sites": sites,
+		"sites_total": len(sites),
+		"sites_ok": sum(1 for s in sites if s.get("ok")),
+		"processes": workers,
+		"wall_ms": round((time.perf_counter() - started) * 1000.0, 1),
+		"timestamp": now_iso(),
+	}
+	with report_sink():
+		save_json("fleet", fleet)
+		append_markdown("fleet", f"\n## Fleet report ({fleet['timestamp']}): {fleet['sites_ok']}/{fleet['sites_total']} sites OK\n")
+		for s in sites:
+			if "error" in s:
+				append_markdown("fleet", f"- {s['name']} ({s['url']}): ERROR {s['error']}")
+				continue
+			failed = f" failed_modules={','.join(s['failed_modules'])}" if s["failed_modules"] else ""
+			append_markdown(
+				"fleet",
+				f"- {s['name']} ({s['url']}): {'OK' if s['ok'] else 'PROBLEM'} status={s['status']} ttfb={s['ttfb_ms']}ms "
+				f"ssl_days={s['ssl_days_left']} broken={s['broken_links']} seo_issues={s['seo_issues']} "
+				f"missing_headers={s['missing_security_headers']} wall={s['wall_ms'] / 1000.0:.1f}s{failed}"
+			)
+	return fleet
@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import dataclasses
+import html
+import re
+import urllib.parse
+from typing import Any, Dict, List, Optional
+
+# One pass over the raw bytes. Comments and raw-text elements (script/style/title) are matched
+# whole so tags inside them are not mistaken for markup; "\Z" lets an element cut by a chunk
+# boundary match too, so the scanner can wait for the rest instead of misparsing it.
+_TOKEN_RE = re.compile(
+	rb"""
+	<!--.*?(?P<comment_end>-->|\Z)
+	| <(?P<raw>script|style|title)\b(?P<raw_attrs>(?:[^>"']|"[^"]*"|'[^']*')*)>(?P<raw_text>.*?)(?P<raw_end></(?P=raw)\s*>|\Z)
+	| <(?P<close>/?)(?P<name>[a-zA-Z][\w:-]*)(?P<attrs>(?:[^>"']|"[^"]*"|'[^']*')*)>
+	""",
+	re.S | re.I | re.X,
+)
+# End of a raw-text element still open at a chunk boundary, searched for in the new bytes only
+_RAW_END_RE = {name: re.compile(rb"</" + name + rb"\s*>", re.I) for name in (b"script", b"style", b"title")}
+_COMMENT = b"!--"
+_ATTR_RE = re.compile(rb"""([^\s=/>"']+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+)))?""")
+_URL_ATTR_RE = re.compile(rb"(?:href|src|srcset)\s*=|url\(", re.I)
+_CSS_BG_RE = re.compile(rb"""background-image:\s*url\(["']?([^"')]+)["']?\)""", re.I)
+
+OG_TAGS = ("title", "description", "image", "url", "type")
+
+
+@dataclasses.dataclass
+class ScanResult:
+	links: List[str] = dataclasses.field(default_factory=list)  # every href/src, absolute
+	images: List[str] = dataclasses.field(default_factory=list)  # <img> src/srcset + CSS background images
+	srcset: List[str] = dataclasses.field(default_factory=list)  # candidates from srcset attributes
+	title: Optional[str] = None
+	description: Optional[str] = None
+	og: Dict[str, str] = dataclasses.field(default_factory=dict)
+	json_ld: List[str] = dataclasses.field(default_factory=list)
+	stopped_early: bool = False
+
+	def meta_tags(self) -> Dict[str, Any]:
+		metas: Dict[str, Any] = {}
+		if self.title:
+			metas["title"] = self.title
+		if self.description:
+			metas["description"] = self.description
+		if self.og:
+			metas["og"] = dict(self.og)
+		if self.json_ld:
+			metas["schema_ld_count"] = len(self.json_ld)
+		return metas
+
+
+def _text(value: bytes) -> str:
+	text = value.decode("utf-8", errors="ignore")
+	return html.unescape(text) if "&" in text else text
+
+
+def _attrs(raw: bytes) -> Dict[str, str]:
+	attrs: Dict[str, str] = {}
+	for m in _ATTR_RE.finditer(raw):
+		name = m.group(1).lower().decode("ascii", errors="ignore")
+		if name not in attrs:
+			value = m.group(2) if m.group(2) is not None else m.group(3) if m.group(3) is not None else m.group(4) or b""
+			attrs[name] = _text(value).strip()
+	return attrs
+
+
+def parse_srcset(value: str) -> List[str]:
+	urls: List[str] = []
+	for candidate in value.split(","):
+		parts = candidate.split()
+		if parts:
+			urls.append(parts[0])
+	return urls
+
+
+class HtmlScanner:
+	"""Incremental single-pass extractor: feed() raw byte chunks, then close().
+
+	With stop_after_head=True scanning ends at </head> (or <body>), enough for meta tags.
+	URLs are resolved in close(), which can be given the document's final URL when it
+	is only known after the body was streamed (e.g. after redirects).
+	"""
+
+	def __init__(self, base_url: str, *, stop_after_head: bool = False) -> None:
+		self.stop_after_head = stop_after_head
+		self.result = ScanResult()
+		self.done = False
+		self._buf = bytearray()
+		# Comment or raw-text element cut by a chunk boundary: [name, raw attrs, text start, resume offset]
+		self._open: Optional[List[Any]] = None
+		self._document_url = base_url
+		self._base_href: Optional[str] = None
+		self._resolved = False
+
+	def _set_base(self, base_url: str) -> None:
+		self.base_url = base_url
+		parts = urllib.parse.urlsplit(base_url)
+		self._origin = f"{parts.scheme}://{parts.netloc}"
+
+	def _join(self, url: str) -> str:
+		# urljoin dominates the scan cost; skip it for the common absolute and root-relative forms
+		if url.startswith(("http://", "https://")) and "/." not in url:
+			return url
+		if url.startswith("/") and not url.startswith("//") and "/." not in url:
+			return self._origin + url
+		return urllib.parse.urljoin(self.base_url, url)
+
+	def feed(self, chunk: bytes) -> bool:
+		# Returns False once the scanner has everything it needs
+		if not self.done:
+			self._buf += chunk
+			self._scan(final=False)
+		return not self.done
+
+	def close(self, document_url: Optional[str] = None) -> ScanResult:
+		if not self.done:
+			self._scan(final=True)
+			self.done = True
+		self._buf = bytearray()
+		self._open = None
+		if not self._resolved:
+			self._resolve(document_url or self._document_url)
+		return self.result
+
+	def _resolve(self, document_url: str) -> None:
+		# <base href> applies to the whole document, so joining at the end is exact
+		self._set_base(urllib.parse.urljoin(document_url, self._base_href) if self._base_href else document_url)
+		result = self.result
+		join = self._join
+		result.links = [join(url) for url in result.links]
+		result.images = [join(url) for url in result.images]
+		result.srcset = [join(url) for url in result.srcset]
+		self._resolved = True
+
+	def _scan(self, final: bool) -> None:
+		buf = self._buf
+		pos = 0
+		while True:
+			if self._open is not None:
+				pos = self._close_open(final)
+				if pos < 0:
+					return  # still open: wait for more data
+				if self.done:
+					self.result.stopped_early = True
+					return
+			# Without more data, anything from the last "<" on may be a partial tag
+			end = len(buf) if final else buf.rfind(b"<", pos)
+			if end < 0:
+				end = len(buf)
+			for m in _TOKEN_RE.finditer(buf, pos, end):
+				comment_end, raw, raw_end, name = m.group("comment_end", "raw", "raw_end", "name")
+				if not final and comment_end == b"":
+					self._open = [_COMMENT, b"", m.start() + 4, m.start() + 4]
+					break
+				if not final and raw and not raw_end:
+					self._open = [raw.lower(), m.group("raw_attrs"), m.start("raw_text"), m.start("raw_text")]
+					break
+				if name:
+					self._tag(name.lower(), m.group("close") == b"/", m.group("attrs"))
+				elif raw:
+					self._raw_element(raw.lower(), m.group("raw_attrs"), m.group("raw_text"))
+				if self.done:
+					self.result.stopped_early = True
+					return
+			else:
+				del buf[:end]
+				return
+
+	def _close_open(self, final: bool) -> int:
+		# Looks for the end of the open comment/element from where the last search stopped; returns the
+		# offset just past it, or -1 after keeping only the element's own bytes for the next chunk
+		buf = self._buf
+		name, raw_attrs, start, resume = self._open
+		if name == _COMMENT:
+			index = buf.find(b"-->", resume)
+			text_end, after = (index, index + 3) if index >= 0 else (-1, -1)
+			resume = max(start, len(buf) - 2)  # "-->" may be split across chunks
+		else:
+			m = _RAW_END_RE[name].search(buf, resume)
+			text_end, after = (m.start(), m.end()) if m else (-1, -1)
+			# A partial end tag starts at the last "<" and runs to the end of the buffer
+			last = buf.rfind(b"<", start)
+			resume = last if last >= 0 else len(buf)
+		if text_end < 0:
+			if not final:
+				del buf[:start]
+				self._open = [name, raw_attrs, 0, resume - start]
+				return -1
+			text_end = after = len(buf)  # unterminated at the end of the document
+		self._open = None
+		if name != _COMMENT:
+			self._raw_element(name, raw_attrs, bytes(buf[start:text_end]))
+		return after
+
+	def _raw_element(self, name: bytes, raw_attrs: bytes, text: bytes) -> None:
+		if name == b"title":
+			if self.result.title is None:
+				self.result.title = _text(text).strip()
+			return
+		if name == b"style":
+			for url in _CSS_BG_RE.findall(text):
+				self.result.images.append(_text(url))
+			return
+		attrs = _attrs(raw_attrs)
+		if attrs.get("src"):
+			self.result.links.append(attrs["src"])
+		if attrs.get("type", "").lower() == "application/ld+json":
+			self.result.json_ld.append(_text(text))
+
+	def _tag(self, name: bytes, closing: bool, raw_attrs: bytes) -> None:
+		if closing:
+			if name == b"head" and self.stop_after_head:
+				self.done = True
+			return
+		if name == b"body" and self.stop_after_head:
+			self.done = True
+			return
+		if name == b"meta":
+			self._meta(_attrs(raw_attrs))
+			return
+		if not _URL_ATTR_RE.search(raw_attrs):
+			return
+		attrs = _attrs(raw_attrs)
+		if name == b"base" and attrs.get("href") and self._base_href is None:
+			self._base_href = attrs["href"]
+		# URLs are kept as written and resolved in close()
+		result = self.result
+		for key in ("href", "src"):
+			if attrs.get(key):
+				url = attrs[key]
+				result.links.append(url)
+				if key == "src" and name == b"img":
+					result.images.append(url)
+		if attrs.get("srcset") and name in (b"img", b"source"):
+			for url in parse_srcset(attrs["srcset"]):
+				result.srcset.append(url)
+				result.images.append(url)
+		style = attrs.get("style")
+		if style and "url(" in style:
+			for url in _CSS_BG_RE.findall(style.encode("utf-8")):
+				result.images.append(_text(url))
+
+	def _meta(self, attrs: Dict[str, str]) -> None:
+		content = attrs.get("content")
+		if not content:
+			return
+		if attrs.get("name", "").lower() == "description" and self.result.description is None:
+			self.result.description = content
+		prop = attrs.get("property", "").lower()
+		if prop.startswith("og:") and prop[3:] in OG_TAGS:
+			self.result.og.setdefault(prop[3:], content)
+
+
+def scan_html(body: bytes, base_url: str, *, stop_after_head: bool = False) -> ScanResult:
+	scanner = HtmlScanner(base_url, stop_after_head=stop_after_head)
+	scanner.feed(body)
+	return scanner.close()
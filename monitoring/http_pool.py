@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import http.client
+import socket
+import ssl as ssl_module
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .tls_certs import CertificateStore
+
+PoolKey = Tuple[str, str, int]  # (scheme, host, port)
+Resolver = Callable[[str, int, Optional[float]], List[Tuple]]  # (host, port, timeout) -> getaddrinfo() list
+
+
+def _getaddrinfo(host: str, port: int, timeout: Optional[float]) -> List[Tuple]:
+	return socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+
+
+class _PooledHTTPConnection(http.client.HTTPConnection):
+	# Connects step by step so DNS and TCP connect can be timed separately
+	phase_timings: Optional[Dict[str, float]] = None
+	resolver: Resolver = staticmethod(_getaddrinfo)  # type: ignore[assignment]
+
+	def connect(self) -> None:
+		start = time.perf_counter()
+		infos = self.resolver(self.host, self.port, self.timeout)
+		resolved = time.perf_counter()
+		self.sock = _connect_any(infos, self.timeout)
+		connected = time.perf_counter()
+		self.phase_timings = {
+			"dns_ms": (resolved - start) * 1000.0,
+			"connect_ms": (connected - resolved) * 1000.0,
+			"tls_ms": 0.0,
+		}
+
+	def take_phase_timings(self) -> Optional[Dict[str, float]]:
+		# Timings of the connect done for the last request; None when the connection was reused
+		timings, self.phase_timings = self.phase_timings, None
+		return timings
+
+
+def _connect_any(infos: List[Tuple], timeout: Optional[float]) -> socket.socket:
+	error: Optional[OSError] = None
+	for family, socktype, proto, _, address in infos:
+		sock = socket.socket(family, socktype, proto)
+		try:
+			sock.settimeout(timeout)
+			sock.connect(address)
+			sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+			return sock
+		except OSError as e:
+			sock.close()
+			error = e
+	raise error or OSError("getaddrinfo returned no addresses")
+
+
+class _PooledHTTPSConnection(http.client.HTTPSConnection, _PooledHTTPConnection):
+	# HTTPSConnection that resumes a previously negotiated TLS session when one is known for the host
+	def __init__(self, host: str, port: int, *, timeout: float, context: ssl_module.SSLContext, pool: "ConnectionPool", key: PoolKey) -> None:
+		super().__init__(host, port, timeout=timeout, context=context)
+		self._pool = pool
+		self._key = key
+
+	def connect(self) -> None:
+		_PooledHTTPConnection.connect(self)
+		session = self._pool.tls_session(self._key)
+		start = time.perf_counter()
+		try:
+			self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host, session=session)
+		except ssl_module.SSLError:
+			if session is None:
+				raise
+			# Server rejected the cached session; fall back to a full handshake on a new socket
+			self.sock.close()
+			self._pool.forget_tls_session(self._key)
+			_PooledHTTPConnection.connect(self)
+			start = time.perf_counter()
+			self.sock = self._context.wrap_socket(self.sock, server_hostname=self.host)
+		self.phase_timings["tls_ms"] = (time.perf_counter() - start) * 1000.0
+		self._pool.certificates.capture(self.host, self.port, self.sock)
+
+
+class ConnectionPool:
+	"""Keep-alive connections per (scheme, host, port), with TLS session reuse and idle eviction."""
+
+	def __init__(self, max_per_host: int = 6, idle_timeout: float = 30.0, context: Optional[ssl_module.SSLContext] = None, resolver: Optional[Resolver] = None) -> None:
+		self.max_per_host = max(1, max_per_host)
+		self.idle_timeout = idle_timeout
+		self.context = context or ssl_module.create_default_context()
+		self.resolver = resolver or _getaddrinfo
+		self.certificates = CertificateStore()  # peer certificates of the handshakes, for the SSL checks
+		self._idle: Dict[PoolKey, List[Tuple[http.client.HTTPConnection, float]]] = {}
+		self._open: Dict[PoolKey, int] = {}
+		self._sessions: Dict[PoolKey, ssl_module.SSLSession] = {}
+		self._cond = threading.Condition()
+
+	def acquire(self, key: PoolKey, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+		# Returns (connection, reused). Blocks while the host is at its connection cap.
+		with self._cond:
+			while True:
+				self._evict_idle(key)
+				idle = self._idle.get(key)
+				if idle:
+					conn, _ = idle.pop()
+					conn.timeout = timeout
+					if conn.sock is not None:
+						conn.sock.settimeout(timeout)
+					return conn, True
+				if self._open.get(key, 0) < self.max_per_host:
+					self._open[key] = self._open.get(key, 0) + 1
+					break
+				self._cond.wait()
+		return self._new_connection(key, timeout), False
+
+	def release(self, key: PoolKey, conn: http.client.HTTPConnection, reusable: bool = True) -> None:
+		if not reusable or conn.sock is None:
+			self.discard(key, conn)
+			return
+		session = getattr(conn.sock, "session", None)
+		with self._cond:
+			if session is not None:
+				self._sessions[key] = session
+			self._idle.setdefault(key, []).append((conn, time.monotonic()))
+			self._cond.notify()
+
+	def discard(self, key: PoolKey, conn: http.client.HTTPConnection) -> None:
+		conn.close()
+		with self._cond:
+			self._open[key] = max(0, self._open.get(key, 0) - 1)
+			self._cond.notify()
+
+	def tls_session(self, key: PoolKey) -> Optional[ssl_module.SSLSession]:
+		with self._cond:
+			return self._sessions.get(key)
+
+	def forget_tls_session(self, key: PoolKey) -> None:
+		with self._cond:
+			self._sessions.pop(key, None)
+
+	def close_all(self) -> None:
+		with self._cond:
+			for key, idle in self._idle.items():
+				for conn, _ in idle:
+					conn.close()
+				self._open[key] = max(0, self._open.get(key, 0) - len(idle))
+			self._idle.clear()
+			self._cond.notify_all()
+
+	def _evict_idle(self, key: PoolKey) -> None:
+		idle = self._idle.get(key)
+		if not idle:
+			return
+		cutoff = time.monotonic() - self.idle_timeout
+		keep = [(c, t) for c, t in idle if t >= cutoff]
+		for conn, t in idle:
+			if t < cutoff:
+				conn.close()
+		self._open[key] = max(0, self._open.get(key, 0) - (len(idle) - len(keep)))
+		self._idle[key] = keep
+
+	def _new_connection(self, key: PoolKey, timeout: float) -> http.client.HTTPConnection:
+		scheme, host, port = key
+		if scheme == "https":
+			conn: _PooledHTTPConnection = _PooledHTTPSConnection(host, port, timeout=timeout, context=self.context, pool=self, key=key)
+		else:
+			conn = _PooledHTTPConnection(host, port, timeout=timeout)
+		conn.resolver = self.resolver  # type: ignore[assignment]
+		return conn
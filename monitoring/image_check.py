@@ -1,55 +1,110 @@
 from __future__ import annotations
 
-import re
+import struct
 from typing import Dict, Any, List, Tuple, Optional
-from urllib.parse import urlparse, urljoin
 
-from .common import append_markdown, http_request, now_iso, save_json, cfg
+from .common import HttpResponse, append_markdown, fetch_validated, http_request, now_iso, save_json, validator_store, cfg
+from .html_scan import scan_html
 
 
 def extract_images(html: bytes, base_url: str) -> List[str]:
-	text = html.decode("utf-8", errors="ignore")
-	urls: List[str] = []
+	# <img> src/srcset and inline CSS background images, from the single-pass scanner
+	return scan_html(html, base_url).images
+
+
+def sniff_image(data: bytes) -> Optional[Dict[str, Any]]:
+	# Format and dimensions from the first bytes of an image file (None if unrecognised)
+	try:
+		if data.startswith(b"\x89PNG\r\n\x1a\n") and data[12:16] == b"IHDR":
+			width, height = struct.unpack(">II", data[16:24])
+			return {"format": "png", "width": width, "height": height}
+		if data[:6] in (b"GIF87a", b"GIF89a"):
+			width, height = struct.unpack("<HH", data[6:10])
+			return {"format": "gif", "width": width, "height": height}
+		if data.startswith(b"\xff\xd8"):
+			return {"format": "jpeg", **_jpeg_size(data)}
+		if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+			return {"format": "webp", **_webp_size(data)}
+		if data[4:8] == b"ftyp" and data[8:12] in (b"avif", b"avis"):
+			pos = data.find(b"ispe")
+			if pos >= 0 and len(data) >= pos + 16:
+				width, height = struct.unpack(">II", data[pos + 8:pos + 16])
+				return {"format": "avif", "width": width, "height": height}
+			return {"format": "avif", "width": None, "height": None}
+		if data[:2] == b"BM" and len(data) >= 26:
+			width, height = struct.unpack("<ii", data[18:26])
+			return {"format": "bmp", "width": width, "height": abs(height)}
+		if data.lstrip()[:5] in (b"<?xml", b"<svg ") or b"<svg" in data[:256]:
+			return {"format": "svg", "width": None, "height": None}
+	except struct.error:
+		pass  # truncated header
+	return None
+
+
+def _jpeg_size(data: bytes) -> Dict[str, Any]:
+	# Walk the segment markers up to the first SOFn frame header
+	pos = 2
+	while pos + 9 < len(data):
+		if data[pos] != 0xFF:
+			break
+		marker = data[pos + 1]
+		if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+			pos += 2
+			continue
+		length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+		if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+			height, width = struct.unpack(">HH", data[pos + 5:pos + 9])
+			return {"width": width, "height": height}
+		pos += 2 + length
+	return {"width": None, "height": None}
+
+
+def _webp_size(data: bytes) -> Dict[str, Any]:
+	chunk = data[12:16]
+	if chunk == b"VP8 " and len(data) >= 30:
+		width, height = struct.unpack("<HH", data[26:30])
+		return {"width": width & 0x3FFF, "height": height & 0x3FFF}
+	if chunk == b"VP8L" and len(data) >= 25:
+		bits = int.from_bytes(data[21:25], "little")
+		return {"width": (bits & 0x3FFF) + 1, "height": ((bits >> 14) & 0x3FFF) + 1}
+	if chunk == b"VP8X" and len(data) >= 30:
+		return {"width": int.from_bytes(data[24:27], "little") + 1, "height": int.from_bytes(data[27:30], "little") + 1}
+	return {"width": None, "height": None}
+
+
+def _image_info(resp: HttpResponse) -> Dict[str, Any]:
+	if resp.status != 200:
+		return {"ok": False, "error": f"HTTP {resp.status}", "info": None}
 	
-	# Extract img src and srcset
-	for pattern in (
-		r'<img[^>]+src=["\']([^"\']+)["\']',
-		r'<img[^>]+srcset=["\']([^"\']+)["\']',
-		r"<img[^>]+src=([^\s>]+)",
-	):
-		for match in re.findall(pattern, text, re.IGNORECASE):
-			urls.append(urljoin(base_url, match))
+	content_type = resp.headers.get("content-type", "")
+	if not content_type.startswith("image/"):
+		return {"ok": False, "error": f"Not an image: {content_type}", "info": None}
 	
-	# Extract background-image from inline CSS
-	for match in re.findall(r'background-image:\s*url\(["\']?([^"\')]+)["\']?\)', text, re.IGNORECASE):
-		urls.append(urljoin(base_url, match))
+	# Check for modern formats
+	modern_formats = ["image/webp", "image/avif"]
+	is_modern = any(fmt in content_type for fmt in modern_formats)
 	
-	return urls
+	# Check for loading="lazy"
+	# This would require parsing the HTML where the image is referenced
+	# For now, just check if it exists
+	
+	sniffed = sniff_image(resp.body) or {}
+	return {"ok": True, "error": None, "info": {
+		"content_type": content_type,
+		"size_bytes": resp.total_size if resp.total_size is not None else len(resp.body),
+		"is_modern_format": is_modern,
+		"format": sniffed.get("format"),
+		"width": sniffed.get("width"),
+		"height": sniffed.get("height"),
+	}}
 
 
-def check_image(url: str) -> Tuple[bool, Optional[str], Optional[Dict[str, str]]]:
+def check_image(url: str) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
 	try:
-		resp = http_request(url, timeout=10)
-		if resp.status != 200:
-			return False, f"HTTP {resp.status}", None
-		
-		content_type = resp.headers.get("content-type", "")
-		if not content_type.startswith("image/"):
-			return False, f"Not an image: {content_type}", None
-		
-		# Check for modern formats
-		modern_formats = ["image/webp", "image/avif"]
-		is_modern = any(fmt in content_type for fmt in modern_formats)
-		
-		# Check for loading="lazy"
-		# This would require parsing the HTML where the image is referenced
-		# For now, just check if it exists
-		
-		return True, None, {
-			"content_type": content_type,
-			"size_bytes": len(resp.body),
-			"is_modern_format": is_modern,
-		}
+		# Only the first IMAGE_PROBE_BYTES are downloaded: enough for the size (Content-Range) and the header.
+		# Unchanged images (304) reuse the result stored from the last check.
+		_, data, _ = fetch_validated(url, _image_info, namespace="image", timeout=10, probe=True, probe_bytes=cfg.IMAGE_PROBE_BYTES)
+		return data["ok"], data["error"], data["info"]
 	except Exception as e:
 		return False, str(e), None
 
@@ -85,6 +140,7 @@ def run() -> Dict[str, Any]:
 					"format": info["content_type"],
 				})
 	
+	validator_store().save()
 	result: Dict[str, Any] = {
 		"total_images_found": len(img_urls),
 		"images_checked": checked,
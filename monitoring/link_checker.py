@@ -1,53 +1,79 @@
 from __future__ import annotations
 
-from collections import deque
-from typing import Dict, Any, List, Set
+from typing import Dict, Any
 
-from .common import append_markdown, extract_links, http_request, is_allowed_url, now_iso, save_json, cfg
+from .common import TimingSummary, append_markdown, now_iso, save_json
+from .crawler import Page, PageVisitor, crawl_site
+from .page_stream import PageStream, TopItems
+
+
+class LinkVisitor(PageVisitor):
+	def __init__(self) -> None:
+		self.scanned = 0
+		self.pages = PageStream("link_pages")  # one record per checked URL
+		self.broken = TopItems()
+		self.redirected = TopItems()
+		self.timings = TimingSummary()
+
+	def visit(self, page: Page) -> None:
+		self.scanned += 1
+		if page.response is not None:
+			self.timings.add(page.url, page.response)
+		if page.error is not None:
+			self.pages.write({"url": page.url, "error": page.error})
+			self.broken.add({"url": page.url, "error": page.error})
+			return
+		resp = page.response
+		record: Dict[str, Any] = {"url": page.url, "status": resp.status, "ttfb_ms": round(resp.ttfb_ms, 2)}
+		if resp.redirect_chain:
+			record["final_url"] = resp.final_url
+		self.pages.write(record)
+		# The status that counts is the one at the end of the redirect chain
+		if resp.status >= 400:
+			item: Dict[str, Any] = {"url": page.url, "status": resp.status}
+			if resp.redirect_chain:
+				item["final_url"] = resp.final_url
+			self.broken.add(item)
+		if resp.redirect_chain:
+			self.redirected.add({
+				"url": page.url,
+				"final_url": resp.final_url,
+				"status": resp.status,
+				"chain": [f"{hop['status']} {hop['location']}" for hop in resp.redirect_chain],
+			})
+
+	def finish(self) -> Dict[str, Any]:
+		broken = self.broken.items
+		result: Dict[str, Any] = {
+			"scanned": self.scanned,
+			"pages_file": self.pages.close(),  # every checked URL, as NDJSON
+			"broken_count": self.broken.count,
+			"broken": broken,  # the first REPORT_TOP_N
+			"redirected_count": self.redirected.count,
+			"redirected": self.redirected.items,
+			"timings": self.timings.summary(),
+			"timestamp": now_iso(),
+		}
+		save_json("link_checker", result)
+		avg = result["timings"]["avg"]
+		append_markdown("summary", f"- Links: scanned={result['scanned']} broken={result['broken_count']} redirected={result['redirected_count']} avg_ttfb={avg['ttfb_ms']}ms avg_dns={avg['dns_ms']}ms avg_tls={avg['tls_ms']}ms")
+		if broken:
+			append_markdown("summary", "  Top broken (max 20):")
+			for item in broken[:20]:
+				if "final_url" in item:
+					append_markdown("summary", f"    - {item['url']} → {item['final_url']} — HTTP {item['status']}")
+				elif "status" in item:
+					append_markdown("summary", f"    - {item['url']} — HTTP {item['status']}")
+				else:
+					append_markdown("summary", f"    - {item['url']} — error: {item.get('error','unknown')}")
+		return result
 
 
 def run() -> Dict[str, Any]:
-	start_url = cfg.SITE_URL
-	queue: deque[str] = deque([start_url])
-	visited: Set[str] = set()
-	broken: List[Dict[str, Any]] = []
-	count = 0
-
-	while queue and count < cfg.MAX_PAGES_CRAWL:
-		url = queue.popleft()
-		if url in visited:
-			continue
-		visited.add(url)
-		count += 1
-		try:
-			resp = http_request(url)
-			if resp.status >= 400:
-				broken.append({"url": url, "status": resp.status})
-				continue
-			for link in extract_links(resp.body, url):
-				if is_allowed_url(link) and link not in visited:
-					queue.append(link)
-		except Exception as e:
-			broken.append({"url": url, "error": str(e)})
-
-	result: Dict[str, Any] = {
-		"scanned": len(visited),
-		"broken_count": len(broken),
-		"broken": broken[:1000],  # cap
-		"timestamp": now_iso(),
-	}
-	save_json("link_checker", result)
-	append_markdown("summary", f"- Links: scanned={result['scanned']} broken={result['broken_count']}")
-	if broken:
-		append_markdown("summary", "  Top broken (max 20):")
-		for item in broken[:20]:
-			if "status" in item:
-				append_markdown("summary", f"    - {item['url']} — HTTP {item['status']}")
-			else:
-				append_markdown("summary", f"    - {item['url']} — error: {item.get('error','unknown')}")
-	return result
+	visitor = LinkVisitor()
+	crawl_site([visitor])
+	return visitor.finish()
 
 
 if __name__ == "__main__":
 	print(run())
-
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+from .common import cfg, ensure_report_dir
+
+
+class PageStream:
+	"""Per-page crawl results, one NDJSON line each, written as pages are visited instead of kept in memory."""
+
+	def __init__(self, name: str) -> None:
+		self.name = name
+		self.records = 0
+		self._file: Optional[TextIO] = None
+		self.path: Optional[Path] = None
+
+	def write(self, record: Dict[str, Any]) -> None:
+		if self._file is None:
+			self.path = ensure_report_dir() / f"{self.name}.ndjson"
+			# Line-buffered: what a crashed or timed-out crawl got through is on disk
+			self._file = open(self.path, "w", encoding="utf-8", buffering=1)
+		self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+		self.records += 1
+
+	def close(self) -> str:
+		# Returns the file name (relative to the report directory) for the module's JSON report
+		if self._file is None:
+			self.path = ensure_report_dir() / f"{self.name}.ndjson"
+			self.path.write_text("", encoding="utf-8")
+		else:
+			self._file.close()
+			self._file = None
+		return self.path.name
+
+
+def iter_pages(path: Path) -> Iterator[Dict[str, Any]]:
+	with open(path, encoding="utf-8") as f:
+		for line in f:
+			yield json.loads(line)
+
+
+class TopItems:
+	"""Count of every item plus the first `limit` of them, and a count per kind (the text before ':')."""
+
+	def __init__(self, limit: Optional[int] = None) -> None:
+		self.limit = limit if limit is not None else cfg.REPORT_TOP_N
+		self.count = 0
+		self.items: List[Dict[str, Any]] = []
+		self.kinds: Counter = Counter()
+
+	def add(self, item: Dict[str, Any], text: Optional[str] = None) -> None:
+		self.count += 1
+		if len(self.items) < self.limit:
+			self.items.append(item)
+		if text is not None:
+			self.kinds[text.split(":", 1)[0]] += 1
+
+	def by_kind(self) -> Dict[str, int]:
+		return dict(self.kinds.most_common())
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+FORMATS = ("pretty", "compact", "ndjson")
+NDJSON_FILE = "results.ndjson"
+
+
+def _replace(path: Path, write: Any) -> None:
+	# Writes through a temporary file, so readers never see a half-written report
+	tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+	try:
+		with open(tmp, "w", encoding="utf-8") as f:
+			write(f)
+		os.replace(tmp, path)
+	finally:
+		if tmp.exists():
+			tmp.unlink()
+
+
+def _append(path: Path, text: str) -> None:
+	# One append-mode write of the whole buffered chunk: the cost follows the new data, not the file's
+	# history, and O_APPEND keeps concurrent writers (fleet workers) from overwriting each other
+	with open(path, "ab") as f:
+		f.write(text.encode("utf-8"))
+
+
+def _ndjson_line(name: str, data: Dict[str, Any]) -> str:
+	return json.dumps({"report": name, **data}, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def write_json(dir_path: Path, name: str, data: Dict[str, Any], fmt: str) -> Path:
+	# pretty: <name>.json indented; compact: <name>.json on one line; ndjson: a line in results.ndjson
+	if fmt not in FORMATS:
+		raise ValueError(f"Unknown report format: {fmt}")
+	if fmt == "ndjson":
+		path = dir_path / NDJSON_FILE
+		_append(path, _ndjson_line(name, data))
+		return path
+	path = dir_path / f"{name}.json"
+	if fmt == "compact":
+		_replace(path, lambda f: json.dump(data, f, ensure_ascii=False, separators=(",", ":")))
+	else:
+		_replace(path, lambda f: json.dump(data, f, indent=2, ensure_ascii=False))
+	return path
+
+
+class ReportSink:
+	"""Markdown sections and JSON results of one run, kept in memory and written once by flush().
+
+	Entries are keyed by report directory, so sites that switch REPORT_DIR mid-run (the fleet) keep
+	their own files.
+	"""
+
+	def __init__(self, fmt: str = "pretty") -> None:
+		if fmt not in FORMATS:
+			raise ValueError(f"Unknown report format: {fmt}")
+		self.fmt = fmt
+		self._lock = threading.Lock()
+		self._markdown: Dict[Tuple[Path, str], List[str]] = {}
+		self._json: Dict[Tuple[Path, str], Dict[str, Any]] = {}
+
+	def add_markdown(self, dir_path: Path, name: str, content: str) -> Path:
+		with self._lock:
+			self._markdown.setdefault((dir_path, name), []).append(content if content.endswith("\n") else content + "\n")
+		return dir_path / f"{name}.md"
+
+	def add_json(self, dir_path: Path, name: str, data: Dict[str, Any]) -> Path:
+		with self._lock:
+			self._json.pop((dir_path, name), None)  # a rewrite moves it to the end, like a later file write
+			self._json[(dir_path, name)] = data
+		return dir_path / (NDJSON_FILE if self.fmt == "ndjson" else f"{name}.json")
+
+	def flush(self) -> int:
+		# Returns the number of files written; the sink is empty afterwards
+		with self._lock:
+			markdown, self._markdown = self._markdown, {}
+			results, self._json = self._json, {}
+		written = 0
+		if self.fmt == "ndjson":
+			lines: Dict[Path, List[str]] = {}
+			for (dir_path, name), data in results.items():
+				lines.setdefault(dir_path, []).append(_ndjson_line(name, data))
+			for dir_path, chunk in lines.items():
+				_append(dir_path / NDJSON_FILE, "".join(chunk))
+				written += 1
+		else:
+			for (dir_path, name), data in results.items():
+				write_json(dir_path, name, data, self.fmt)
+				written += 1
+		for (dir_path, name), parts in markdown.items():
+			_append(dir_path / f"{name}.md", "".join(parts))
+			written += 1
+		return written
@@ -1,48 +1,107 @@
 from __future__ import annotations
 
+import argparse
 import json
+import time
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
-from . import config as cfg
-from .common import append_markdown, ensure_report_dir, now_iso, save_json
+from .common import append_markdown, cfg, circuit_breaker, dns_cache, hedger, ensure_report_dir, now_iso, report_sink, resolve_hosts, run_cache, run_cache_stats, save_json
+from .crawler import crawl_site
+from .fleet import load_profiles, run_fleet
+from .scheduler import Task, run_tasks
 from . import uptime_check, ssl_expiry, sitemap_robots, link_checker, security_headers, seo_crawler, dns_check, image_check
 
 
-def run_all() -> Dict[str, Any]:
+def _crawl(deps: Dict[str, Any]) -> Dict[str, Any]:
+	# A single crawl of the site feeds both the link checker and the SEO crawler
+	visitors = {"links": link_checker.LinkVisitor(), "seo": seo_crawler.SeoVisitor()}
+	# Incremental crawls replay unchanged pages for free, so the whole sitemap is worth seeding
+	limit = cfg.MAX_PAGES_CRAWL * 100 if cfg.INCREMENTAL_CRAWL else cfg.MAX_PAGES_CRAWL
+	entries = sitemap_robots.sitemap_entries(limit)
+	seeds = [entry.loc for entry in entries]
+	lastmod = {entry.loc: entry.lastmod for entry in entries if entry.lastmod}
+	stats = crawl_site(list(visitors.values()), seeds=seeds, lastmod=lastmod)
+	stats["sitemap_seeds"] = len(seeds)
+	return {"stats": stats, "visitors": visitors}
+
+
+def _tasks() -> List[Task]:
+	# Declaration order is also the order of the sections in summary.md
+	return [
+		Task("uptime", lambda deps: uptime_check.run()),
+		# After uptime to reuse the certificate of its connection; without one it does its own handshake
+		Task("ssl", lambda deps: ssl_expiry.run(), after=("uptime",)),
+		Task("robots", lambda deps: sitemap_robots.run()),
+		# After uptime, so the homepage it downloads is shared with the crawl instead of fetched twice, and
+		# after robots for the sitemap seeds; if either fails the crawl still starts from the site root
+		Task("crawl", _crawl, after=("robots", "uptime")),
+		Task("links", lambda deps: deps["crawl"]["visitors"]["links"].finish(), deps=("crawl",)),
+		Task("security", lambda deps: security_headers.run()),
+		Task("seo", lambda deps: deps["crawl"]["visitors"]["seo"].finish(), deps=("crawl",)),
+		Task("dns", lambda deps: dns_check.run()),
+		Task("images", lambda deps: image_check.run()),
+	]
+
+
+def run_all(profiles: Optional[List[Dict[str, Any]]] = None, processes: Optional[int] = None) -> Dict[str, Any]:
+	# Without profiles: the configured SITE_URL. With site profiles (see fleet.py): every site, one per process.
+	if profiles is None:
+		return run_single()
+	return run_fleet(profiles, processes)
+
+
+def run_single() -> Dict[str, Any]:
+	# Reports are buffered for the whole run and written once at the end
+	with report_sink():
+		return _run_single()
+
+
+def _run_single() -> Dict[str, Any]:
 	report_dir = ensure_report_dir()
 	append_markdown("summary", f"\n## Site monitoring report for {cfg.SITE_URL} ({now_iso()})\n")
 
-	uptime = uptime_check.run()
-	ssl_res = ssl_expiry.run()
-	rob = sitemap_robots.run()
-	links = link_checker.run()
-	sec = security_headers.run()
-	seo = seo_crawler.run()
-	dns = dns_check.run()
-	images = image_check.run()
+	# One cache per run: each URL is downloaded once and shared by every module
+	started = time.perf_counter()
+	# Every host the modules will connect to is resolved up front, concurrently
+	resolve_hosts()
+	with run_cache():
+		results, modules = run_tasks(_tasks(), workers=cfg.RUN_ALL_WORKERS, default_timeout=cfg.MODULE_TIMEOUT_SECONDS)
+		cache_stats = run_cache_stats()
+	wall_ms = round((time.perf_counter() - started) * 1000.0, 1)
+	crawl = results.pop("crawl")
 
 	aggregate: Dict[str, Any] = {
 		"site": cfg.SITE_URL,
-		"uptime": uptime,
-		"ssl": ssl_res,
-		"robots": rob,
-		"links": links,
-		"security": sec,
-		"seo": seo,
-		"dns": dns,
-		"images": images,
+		**results,
+		"crawl": crawl.get("stats", crawl),
+		"fetch_cache": cache_stats,
+		"dns_cache": dns_cache.stats(),
+		"circuits": circuit_breaker.stats(),
+		"hedging": hedger.stats(),
+		"modules": modules,
+		"wall_ms": wall_ms,
 		"timestamp": now_iso(),
 	}
 	save_json("aggregate", aggregate)
+	failed = [name for name, m in modules.items() if m["status"] != "ok"]
+	if failed:
+		append_markdown("summary", "- Modules not completed: " + ", ".join(f"{name} ({modules[name]['status']})" for name in failed))
+	if aggregate["circuits"]["open"]:
+		append_markdown("summary", "- Hosts failing fast (circuit open): " + ", ".join(aggregate["circuits"]["open"]))
+	slowest = max(modules, key=lambda name: modules[name]["wall_ms"])
 	append_markdown(
 		"summary",
-		"\nDone. See JSON files for detailed results.\n"
+		f"\nDone in {wall_ms / 1000.0:.1f}s (slowest module: {slowest}, {modules[slowest]['wall_ms'] / 1000.0:.1f}s). See JSON files for detailed results.\n"
 	)
 	return aggregate
 
 
 if __name__ == "__main__":
-	res = run_all()
+	parser = argparse.ArgumentParser(description="Run all monitoring checks")
+	parser.add_argument("--sites", help="sites.json with the site profiles to monitor (default: SITE_URL only)")
+	parser.add_argument("--processes", type=int, help="worker processes for --sites (default: CPU count)")
+	args = parser.parse_args()
+	res = run_all(load_profiles(args.sites) if args.sites else None, args.processes)
 	print(json.dumps(res, indent=2))
 
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import dataclasses
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from .common import append_markdown, capture_markdown
+
+
+@dataclasses.dataclass
+class Task:
+	name: str
+	run: Callable[[Dict[str, Any]], Any]  # called with the results of its dependencies, by name
+	deps: Tuple[str, ...] = ()
+	timeout: Optional[float] = None  # seconds; None = the scheduler's default
+	# Ordering only: starts once these have finished, whatever their outcome, and does not get their results
+	after: Tuple[str, ...] = ()
+
+	@property
+	def upstream(self) -> Tuple[str, ...]:
+		return self.deps + self.after
+
+
+def _check_graph(tasks: Sequence[Task]) -> None:
+	names = [t.name for t in tasks]
+	if len(set(names)) != len(names):
+		raise ValueError("Duplicate task names")
+	known = set(names)
+	for task in tasks:
+		missing = [d for d in task.upstream if d not in known]
+		if missing:
+			raise ValueError(f"Task {task.name} depends on unknown tasks: {', '.join(missing)}")
+	# Kahn's algorithm: anything left over is part of a cycle
+	remaining = {t.name: set(t.upstream) for t in tasks}
+	while remaining:
+		ready = [name for name, deps in remaining.items() if not deps]
+		if not ready:
+			raise ValueError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+		for name in ready:
+			del remaining[name]
+		for deps in remaining.values():
+			deps.difference_update(ready)
+
+
+def _call(task: Task, inputs: Dict[str, Any], lines: List[Tuple[str, str]], started: Dict[str, float]) -> Any:
+	# Markdown is collected per task and written afterwards in declaration order, so concurrent
+	# modules don't interleave their lines in the summary
+	started[task.name] = time.perf_counter()  # the timeout counts from here, not from submission
+	with capture_markdown(lines):
+		return task.run(inputs)
+
+
+def run_tasks(tasks: Sequence[Task], *, workers: int = 4, default_timeout: Optional[float] = None) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+	"""Run tasks concurrently as soon as their dependencies have succeeded.
+
+	Returns (results, report). A task that fails, times out or has a failed dependency gets
+	{"error": ...} as its result. Threads cannot be interrupted, so a timed-out task is
+	abandoned: its result and any markdown it writes later are dropped, and its thread counts
+	against `workers` until it really ends.
+	"""
+	_check_graph(tasks)
+	workers = max(1, workers)
+	by_name = {t.name: t for t in tasks}
+	results: Dict[str, Any] = {}
+	report: Dict[str, Dict[str, Any]] = {}
+	lines: Dict[str, List[Tuple[str, str]]] = {t.name: [] for t in tasks}
+	waiting = [t.name for t in tasks]
+	running: Dict[Future, Tuple[str, Optional[float]]] = {}  # future -> (name, timeout)
+	started: Dict[str, float] = {}
+	abandoned: Set[Future] = set()
+
+	def finish(name: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+		start = started.get(name)
+		entry: Dict[str, Any] = {"status": status, "wall_ms": round((time.perf_counter() - start) * 1000.0, 1) if start is not None else 0.0}
+		if error is not None:
+			entry["error"] = error
+		report[name] = entry
+		results[name] = result if status == "ok" else {"error": error}
+
+	def deadline(name: str, timeout: Optional[float]) -> Optional[float]:
+		# Not started yet: at least a full timeout away
+		return (started.get(name, time.perf_counter()) + timeout) if timeout else None
+
+	pool = ThreadPoolExecutor(max_workers=workers)
+	try:
+		while waiting or running:
+			# Skip anything downstream of a failure, then start whatever is ready
+			for name in list(waiting):
+				failed = [d for d in by_name[name].deps if d in report and report[d]["status"] != "ok"]
+				if failed:
+					waiting.remove(name)
+					finish(name, "skipped", error=f"dependency failed: {', '.join(failed)}")
+			abandoned = {f for f in abandoned if not f.done()}
+			for name in list(waiting):
+				if len(running) + len(abandoned) >= workers:
+					break
+				task = by_name[name]
+				if all(report.get(d, {}).get("status") == "ok" for d in task.deps) and all(d in report for d in task.after):
+					waiting.remove(name)
+					timeout = task.timeout if task.timeout is not None else default_timeout
+					future = pool.submit(_call, task, {d: results[d] for d in task.deps}, lines[name], started)
+					running[future] = (name, timeout)
+			if not running:
+				if waiting and abandoned:
+					# Every thread is held by a timed-out task: wait for one to end, up to a task timeout
+					done, _ = wait(list(abandoned), timeout=default_timeout, return_when=FIRST_COMPLETED)
+					if not done:
+						for name in waiting:
+							finish(name, "skipped", error=f"no free worker: {len(abandoned)} timed-out tasks still running")
+						waiting = []
+				continue
+
+			deadlines = [d for d in (deadline(name, timeout) for name, timeout in running.values()) if d is not None]
+			wait_for = max(0.0, min(deadlines) - time.perf_counter()) if deadlines else None
+			done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+			for future in done:
+				name, _ = running.pop(future)
+				try:
+					finish(name, "ok", result=future.result())
+				except Exception as e:
+					finish(name, "error", error=f"{type(e).__name__}: {e}")
+			now = time.perf_counter()
+			for future, (name, timeout) in list(running.items()):
+				if name in started and timeout and now >= started[name] + timeout:
+					del running[future]
+					abandoned.add(future)
+					lines[name] = []
+					finish(name, "timeout", error=f"timed out after {timeout:.0f}s")
+	finally:
+		pool.shutdown(wait=False)
+
+	for task in tasks:
+		for name, content in lines[task.name]:
+			append_markdown(name, content)
+	return {t.name: results[t.name] for t in tasks}, {t.name: report[t.name] for t in tasks}
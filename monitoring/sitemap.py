@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import dataclasses
+import gzip
+import heapq
+import json
+import os
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+from .common import cfg, http_request
+
+
+@dataclasses.dataclass
+class SitemapEntry:
+	loc: str
+	lastmod: Optional[str] = None
+	priority: Optional[float] = None
+	changefreq: Optional[str] = None
+
+
+def _local(tag: str) -> str:
+	return tag.rsplit("}", 1)[-1]
+
+
+def _child_text(elem: Element, name: str) -> Optional[str]:
+	for child in elem:
+		if _local(child.tag) == name:
+			text = (child.text or "").strip()
+			return text or None
+	return None
+
+
+class SitemapParser:
+	"""Incremental parser for one sitemap or sitemap index file, plain or gzipped.
+
+	feed() raw bytes as they arrive; completed <url> entries and child <sitemap> locations are
+	collected until take() and each element is detached once read, so memory does not grow with
+	the number of URLs in the file.
+	"""
+
+	def __init__(self, max_bytes: Optional[int] = None) -> None:
+		self.max_bytes = max_bytes  # cap on the decompressed size (gzip bombs)
+		self.entries: List[SitemapEntry] = []
+		self.sitemaps: List[str] = []
+		self.is_index = False
+		self.size = 0
+		self._gunzip: Optional[Any] = None
+		self._sniffed = False
+		self._parser = XMLPullParser(events=("start", "end"))
+		self._stack: List[Element] = []
+
+	def feed(self, chunk: bytes) -> None:
+		if not self._sniffed:
+			self._sniffed = True
+			if chunk[:2] == b"\x1f\x8b":
+				self._gunzip = zlib.decompressobj(16 + zlib.MAX_WBITS)
+		if self._gunzip is not None:
+			chunk = self._gunzip.decompress(chunk)
+		self.size += len(chunk)
+		if self.max_bytes is not None and self.size > self.max_bytes:
+			raise ValueError(f"Sitemap larger than {self.max_bytes} bytes uncompressed")
+		self._parser.feed(chunk)
+		self._drain()
+
+	def close(self) -> None:
+		if self._gunzip is not None:
+			self._parser.feed(self._gunzip.flush())
+		self._parser.close()
+		self._drain()
+
+	def take(self) -> Tuple[List[SitemapEntry], List[str]]:
+		entries, sitemaps = self.entries, self.sitemaps
+		self.entries, self.sitemaps = [], []
+		return entries, sitemaps
+
+	def _drain(self) -> None:
+		for event, elem in self._parser.read_events():
+			if event == "start":
+				if not self._stack and _local(elem.tag) == "sitemapindex":
+					self.is_index = True
+				self._stack.append(elem)
+				continue
+			self._stack.pop()
+			name = _local(elem.tag)
+			if name not in ("url", "sitemap") or not self._stack:
+				continue
+			loc = _child_text(elem, "loc")
+			if loc:
+				if name == "sitemap":
+					self.sitemaps.append(loc)
+				else:
+					self.entries.append(_entry(loc, elem))
+			self._stack[-1].remove(elem)
+
+
+def _entry(loc: str, elem: Element) -> SitemapEntry:
+	priority = _child_text(elem, "priority")
+	try:
+		value = float(priority) if priority is not None else None
+	except ValueError:
+		value = None
+	return SitemapEntry(loc=loc, lastmod=_child_text(elem, "lastmod"), priority=value, changefreq=_child_text(elem, "changefreq"))
+
+
+def read_sitemaps(urls: List[str], on_entry: Callable[[SitemapEntry], None], *, max_files: Optional[int] = None, max_urls: Optional[int] = None) -> Dict[str, Any]:
+	"""Stream every sitemap reachable from urls (following sitemap indexes) into on_entry.
+
+	Each file is parsed while it downloads; nothing but the current element is held in memory.
+	Returns statistics, including the HTTP status and any error per file.
+	"""
+	max_files = max_files if max_files is not None else cfg.SITEMAP_MAX_FILES
+	max_urls = max_urls if max_urls is not None else cfg.SITEMAP_MAX_URLS
+	queue = deque(urls)
+	seen: Set[str] = set(urls)
+	files: List[Dict[str, Any]] = []
+	total = 0
+	while queue and len(files) < max_files and total < max_urls:
+		url = queue.popleft()
+		parser = SitemapParser(cfg.SITEMAP_MAX_FILE_BYTES)
+		info: Dict[str, Any] = {"url": url, "status": None, "urls": 0, "index": False}
+		files.append(info)
+
+		failure: List[str] = []
+
+		def emit() -> bool:
+			nonlocal total
+			entries, children = parser.take()
+			for entry in entries:
+				if total >= max_urls:
+					return False
+				on_entry(entry)
+				total += 1
+				info["urls"] += 1
+			for child in children:
+				if child not in seen:
+					seen.add(child)
+					queue.append(child)
+			return True
+
+		def consume(chunk: bytes) -> bool:
+			# Parse errors stop the download; an HTTP error page is not XML either, so the status decides
+			try:
+				parser.feed(chunk)
+			except (ParseError, ValueError, zlib.error) as e:
+				failure.append(f"{type(e).__name__}: {e}")
+				return False
+			return emit()
+
+		try:
+			resp = http_request(url, on_chunk=consume, keep_body=False, max_body_bytes=cfg.SITEMAP_MAX_FILE_BYTES)
+			info["status"] = resp.status
+			if resp.status >= 400:
+				info["error"] = f"HTTP {resp.status}"
+			elif failure:
+				info["error"] = failure[0]
+			elif not resp.truncated:
+				parser.close()
+				emit()
+			elif total < max_urls:
+				info["error"] = f"Truncated at {cfg.SITEMAP_MAX_FILE_BYTES} bytes"
+		except Exception as e:
+			# A bad URL, redirect loop or broken response fails this file only
+			info["error"] = f"{type(e).__name__}: {e}"
+		info["index"] = parser.is_index
+	return {
+		"files": files,
+		"files_read": len(files),
+		"index_files": sum(1 for f in files if f["index"]),
+		"urls": total,
+		"not_read": len(queue),  # over SITEMAP_MAX_FILES or SITEMAP_MAX_URLS
+	}
+
+
+class InventoryWriter:
+	"""Appends sitemap entries to a gzipped NDJSON file as they are parsed."""
+
+	def __init__(self, path: Path) -> None:
+		self.path = path
+		self._tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+		self._file = gzip.open(self._tmp, "wt", encoding="utf-8")
+
+	def __call__(self, entry: SitemapEntry) -> None:
+		self._file.write(json.dumps(dataclasses.asdict(entry), ensure_ascii=False) + "\n")
+
+	def close(self) -> None:
+		self._file.close()
+		os.replace(self._tmp, self.path)
+
+
+def iter_inventory(path: Path) -> Iterator[SitemapEntry]:
+	if not path.exists():
+		return
+	with gzip.open(path, "rt", encoding="utf-8") as f:
+		for line in f:
+			yield SitemapEntry(**json.loads(line))
+
+
+def top_entries(path: Path, limit: int) -> List[SitemapEntry]:
+	# The `limit` entries with the highest <priority> (0.5 when absent, as per the protocol), in file
+	# order among equals; memory stays O(limit) however large the inventory is
+	ranked = ((-(e.priority if e.priority is not None else 0.5), n, e) for n, e in enumerate(iter_inventory(path)))
+	return [entry for _, _, entry in heapq.nsmallest(limit, ranked, key=lambda item: item[:2])]
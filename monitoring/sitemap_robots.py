@@ -1,10 +1,23 @@
 from __future__ import annotations
 
 import re
-from typing import Dict, Any, List
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 from urllib.parse import urljoin
 
-from .common import append_markdown, http_request, now_iso, save_json, cfg
+from .common import append_markdown, ensure_report_dir, http_request, now_iso, save_json, cfg
+from .sitemap import InventoryWriter, SitemapEntry, read_sitemaps, top_entries
+
+INVENTORY_FILE = "sitemap_inventory.jsonl.gz"
+
+
+def inventory_path() -> Path:
+	return ensure_report_dir() / INVENTORY_FILE
+
+
+def sitemap_entries(limit: int, path: Optional[Path] = None) -> List[SitemapEntry]:
+	# Highest-priority pages of the inventory written by run(), for seeding crawlers
+	return top_entries(path or inventory_path(), limit)
 
 
 def run() -> Dict[str, Any]:
@@ -24,26 +37,35 @@ def run() -> Dict[str, Any]:
 	if robots.status >= 400:
 		issues.append(f"robots.txt status {robots.status}")
 
-	# Validate first sitemap (basic status)
-	sitemap_status = None
-	if sitemaps:
-		sm = http_request(sitemaps[0])
-		sitemap_status = sm.status
-		if sm.status >= 400:
-			issues.append(f"sitemap status {sm.status}")
+	# Stream every sitemap (and the sitemaps of indexes) into the inventory, one entry at a time
+	writer = InventoryWriter(inventory_path())
+	try:
+		stats = read_sitemaps(sitemaps, writer)
+	finally:
+		writer.close()
+	sitemap_status = stats["files"][0]["status"] if stats["files"] else None
+	for info in stats["files"]:
+		if info.get("error"):
+			issues.append(f"sitemap {info['url']}: {info['error']}")
+	if stats["not_read"]:
+		issues.append(f"{stats['not_read']} sitemaps not read (SITEMAP_MAX_FILES / SITEMAP_MAX_URLS)")
 
 	result: Dict[str, Any] = {
 		"robots_url": robots_url,
 		"robots_status": robots.status,
 		"sitemaps": sitemaps,
 		"sitemap_status": sitemap_status,
+		"sitemap_files": stats["files"],
+		"index_files": stats["index_files"],
+		"sitemap_urls_total": stats["urls"],
+		"inventory": str(inventory_path()),
 		"issues": issues,
 		"timestamp": now_iso(),
 	}
 	save_json("sitemap_robots", result)
 	append_markdown(
 		"summary",
-		f"- Robots/Sitemap: robots={robots.status} sitemaps={len(sitemaps)} sitemap_status={sitemap_status} issues={len(issues)}"
+		f"- Robots/Sitemap: robots={robots.status} sitemaps={len(sitemaps)} files={stats['files_read']} urls={stats['urls']} sitemap_status={sitemap_status} issues={len(issues)}"
 	)
 	return result
 
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import math
+import struct
+from typing import Dict, Iterable, Optional
+
+_HEADER = struct.Struct("<dQQddd I")
+_BIN = struct.Struct("<iI")
+
+
+class QuantileSketch:
+	"""Log-bucketed quantile sketch: any quantile within `accuracy` relative error, in O(log range) memory.
+
+	Sketches with the same accuracy merge exactly, so per-minute sketches add up to hours, days or
+	several runs without keeping the samples.
+	"""
+
+	def __init__(self, accuracy: float = 0.01) -> None:
+		self.accuracy = accuracy
+		self._gamma = (1.0 + accuracy) / (1.0 - accuracy)
+		self._log_gamma = math.log(self._gamma)
+		self.bins: Dict[int, int] = {}
+		self.zero_count = 0  # values <= 0 (e.g. 0 ms on a cached response)
+		self.count = 0
+		self.sum = 0.0
+		self.min = math.inf
+		self.max = -math.inf
+
+	def add(self, value: float, count: int = 1) -> None:
+		if value <= 0:
+			self.zero_count += count
+		else:
+			index = math.ceil(math.log(value) / self._log_gamma)
+			self.bins[index] = self.bins.get(index, 0) + count
+		self.count += count
+		self.sum += value * count
+		self.min = min(self.min, value)
+		self.max = max(self.max, value)
+
+	def extend(self, values: Iterable[float]) -> None:
+		for value in values:
+			self.add(value)
+
+	def merge(self, other: "QuantileSketch") -> None:
+		if other.accuracy != self.accuracy:
+			raise ValueError("Cannot merge sketches with different accuracy")
+		for index, count in other.bins.items():
+			self.bins[index] = self.bins.get(index, 0) + count
+		self.zero_count += other.zero_count
+		self.count += other.count
+		self.sum += other.sum
+		self.min = min(self.min, other.min)
+		self.max = max(self.max, other.max)
+
+	def quantile(self, q: float) -> Optional[float]:
+		if self.count == 0:
+			return None
+		rank = q * (self.count - 1)
+		seen = self.zero_count
+		if rank < seen:
+			return max(0.0, self.min)
+		for index in sorted(self.bins):
+			seen += self.bins[index]
+			if rank < seen:
+				# Middle of the bucket (gamma^(i-1), gamma^i], which keeps the relative error within accuracy
+				value = 2.0 * self._gamma ** index / (self._gamma + 1.0)
+				return min(max(value, self.min), self.max)
+		return self.max
+
+	@property
+	def mean(self) -> Optional[float]:
+		return self.sum / self.count if self.count else None
+
+	def to_bytes(self) -> bytes:
+		header = _HEADER.pack(self.accuracy, self.count, self.zero_count, self.sum, self.min, self.max, len(self.bins))
+		return header + b"".join(_BIN.pack(i, c) for i, c in sorted(self.bins.items()))
+
+	@classmethod
+	def from_bytes(cls, data: bytes) -> "QuantileSketch":
+		accuracy, count, zero_count, total, low, high, nbins = _HEADER.unpack_from(data)
+		sketch = cls(accuracy)
+		sketch.count, sketch.zero_count, sketch.sum, sketch.min, sketch.max = count, zero_count, total, low, high
+		for n in range(nbins):
+			index, c = _BIN.unpack_from(data, _HEADER.size + n * _BIN.size)
+			sketch.bins[index] = c
+		return sketch
@@ -1,29 +1,91 @@
 from __future__ import annotations
 
-from typing import Dict, Any
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional
+from urllib.parse import urlparse, urlsplit
 
-from .common import append_markdown, check_ssl_expiry, now_iso, save_json, cfg
+from .common import append_markdown, ensure_report_dir, fetch_certificate, http_pool, now_iso, save_json, site_hosts, cfg
+from .tls_certs import CertificateCache
+
+
+def certificate_cache_path() -> Path:
+	path = Path(cfg.CERT_CACHE_FILE)
+	return path if path.is_absolute() else ensure_report_dir() / path
+
+
+def _handshake(host: str) -> Dict[str, Any]:
+	# host may carry a port ("example.com:8443")
+	parsed = urlsplit("//" + host)
+	try:
+		return {**fetch_certificate(parsed.hostname or host, parsed.port or 443), "source": "handshake"}
+	except Exception as e:
+		return {"days_left": None, "chain_days_left": None, "error": str(e), "source": "handshake"}
+
+
+def check_certificates(hosts: Iterable[str], workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+	"""Certificate expiry, issuer, SANs and chain for every host, cheapest source first.
+
+	Today's cached result, then the certificate captured when the HTTP layer connected to the host,
+	and only then a handshake of its own; those run concurrently.
+	"""
+	cache = CertificateCache(certificate_cache_path())
+	results: Dict[str, Dict[str, Any]] = {}
+	missing: List[str] = []
+	for host in dict.fromkeys(h.lower() for h in hosts if h):
+		cached = cache.get(host)
+		parsed = urlsplit("//" + host)
+		captured = http_pool.certificates.get(parsed.hostname or host, parsed.port or 443)
+		if cached is not None:
+			results[host] = {**cached, "source": "cache"}
+		elif captured is not None:
+			results[host] = {**captured, "source": "connection"}
+		else:
+			missing.append(host)
+	if missing:
+		with ThreadPoolExecutor(max_workers=min(len(missing), workers or cfg.CERT_CHECK_WORKERS)) as pool:
+			results.update(zip(missing, pool.map(_handshake, missing)))
+	for host, info in results.items():
+		# Failures are not cached: the next run tries again
+		if info["source"] != "cache" and "error" not in info:
+			cache.put(host, info)
+	cache.save()
+	return results
+
+
+def _warn(info: Dict[str, Any]) -> bool:
+	days = info.get("chain_days_left")
+	return (days is not None and days <= cfg.SSL_EXPIRY_WARN_DAYS) or info.get("error") is not None
 
 
 def run() -> Dict[str, Any]:
 	host = urlparse(cfg.SITE_URL).hostname or ""
-	days_left, error = check_ssl_expiry(host)
+	certs = check_certificates(site_hosts() or [host])
+	info = certs.pop(host.lower(), None) or _handshake(host)
+	error = info.get("error")
 	result: Dict[str, Any] = {
 		"host": host,
-		"days_left": days_left,
+		"days_left": info.get("days_left"),
 		"error": error,
-		"warn": (days_left is not None and days_left <= cfg.SSL_EXPIRY_WARN_DAYS) or error is not None,
+		"warn": _warn(info),
+		"issuer": info.get("issuer"),
+		"sans": info.get("sans", []),
+		"chain": info.get("chain", []),
+		"chain_days_left": info.get("chain_days_left"),
+		"source": info["source"],
+		"other_hosts": certs,
 		"timestamp": now_iso(),
 	}
 	save_json("ssl_expiry", result)
-	status_line = f"- SSL: host={host} days_left={days_left} warn={result['warn']}"
+	status_line = f"- SSL: host={host} days_left={result['days_left']} chain_days_left={result['chain_days_left']} issuer={result['issuer']} warn={result['warn']}"
 	if error:
 		status_line += f" error={error}"
+	warned = [name for name, other in certs.items() if _warn(other)]
+	if warned:
+		status_line += f" other_hosts_warn={','.join(warned)}"
 	append_markdown("summary", status_line)
 	return result
 
 
 if __name__ == "__main__":
 	print(run())
-
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .sketch import QuantileSketch
+
+# Rollup granularities, finest first, in seconds (UTC-aligned)
+BUCKETS: Dict[str, int] = {"minute": 60, "hour": 3600, "day": 86400}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+	series TEXT NOT NULL,
+	ts REAL NOT NULL,
+	ok INTEGER NOT NULL,
+	status INTEGER,
+	latency_ms REAL,
+	ttfb_ms REAL
+);
+CREATE INDEX IF NOT EXISTS samples_series_ts ON samples (series, ts);
+CREATE TABLE IF NOT EXISTS rollups (
+	series TEXT NOT NULL,
+	bucket TEXT NOT NULL,
+	start INTEGER NOT NULL,
+	count INTEGER NOT NULL,
+	ok_count INTEGER NOT NULL,
+	latency BLOB,
+	ttfb BLOB,
+	PRIMARY KEY (series, bucket, start)
+) WITHOUT ROWID;
+"""
+
+Sample = Dict[str, Any]  # {"ts", "ok", "status", "latency_ms", "ttfb_ms"}; ts defaults to now
+
+
+class _Rollup:
+	def __init__(self) -> None:
+		self.count = 0
+		self.ok_count = 0
+		self.latency = QuantileSketch()
+		self.ttfb = QuantileSketch()
+
+	def add(self, sample: Sample) -> None:
+		self.count += 1
+		self.ok_count += 1 if sample.get("ok") else 0
+		if sample.get("latency_ms") is not None:
+			self.latency.add(sample["latency_ms"])
+		if sample.get("ttfb_ms") is not None:
+			self.ttfb.add(sample["ttfb_ms"])
+
+	def merge_row(self, count: int, ok_count: int, latency: Optional[bytes], ttfb: Optional[bytes]) -> None:
+		self.count += count
+		self.ok_count += ok_count
+		if latency:
+			self.latency.merge(QuantileSketch.from_bytes(latency))
+		if ttfb:
+			self.ttfb.merge(QuantileSketch.from_bytes(ttfb))
+
+
+class TimeSeriesStore:
+	"""Append-only SQLite store of check samples, rolled up into minute/hour/day buckets on write.
+
+	Range queries are answered from the coarsest rollups that fit inside the range, plus raw samples
+	for the partial minutes at its edges.
+	"""
+
+	def __init__(self, path: Union[str, Path]) -> None:
+		self.path = Path(path)
+		self.path.parent.mkdir(parents=True, exist_ok=True)
+		self._lock = threading.Lock()
+		self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+		self._db.execute("PRAGMA journal_mode=WAL")
+		self._db.executescript(_SCHEMA)
+
+	def close(self) -> None:
+		with self._lock:
+			self._db.close()
+
+	def __enter__(self) -> "TimeSeriesStore":
+		return self
+
+	def __exit__(self, *exc: Any) -> None:
+		self.close()
+
+	def record(self, series: str, **sample: Any) -> None:
+		self.record_many([(series, sample)])
+
+	def record_many(self, samples: Iterable[Tuple[str, Sample]]) -> None:
+		now = time.time()
+		rows: List[Tuple[Any, ...]] = []
+		rollups: Dict[Tuple[str, str, int], _Rollup] = {}
+		for series, sample in samples:
+			ts = sample.get("ts") or now
+			rows.append((series, ts, 1 if sample.get("ok") else 0, sample.get("status"), sample.get("latency_ms"), sample.get("ttfb_ms")))
+			for bucket, size in BUCKETS.items():
+				key = (series, bucket, int(ts // size * size))
+				rollups.setdefault(key, _Rollup()).add(sample)
+		if not rows:
+			return
+		with self._lock, self._db:
+			self._db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?)", rows)
+			# One read-modify-write per touched bucket, in the same transaction as the samples
+			for (series, bucket, start), rollup in rollups.items():
+				row = self._db.execute(
+					"SELECT count, ok_count, latency, ttfb FROM rollups WHERE series = ? AND bucket = ? AND start = ?", (series, bucket, start)
+				).fetchone()
+				if row is not None:
+					rollup.merge_row(*row)
+				self._db.execute(
+					"INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?)",
+					(series, bucket, start, rollup.count, rollup.ok_count, _blob(rollup.latency), _blob(rollup.ttfb)),
+				)
+
+	def series(self) -> List[str]:
+		with self._lock:
+			return [row[0] for row in self._db.execute("SELECT DISTINCT series FROM rollups WHERE bucket = 'day' ORDER BY series")]
+
+	def summary(self, series: str, start: float, end: float, quantiles: Sequence[float] = (0.5, 0.9, 0.99)) -> Dict[str, Any]:
+		"""Samples, uptime % and latency/TTFB quantiles for series in [start, end)."""
+		total = self._aggregate(series, start, end)
+		return {
+			"series": series,
+			"start": start,
+			"end": end,
+			"samples": total.count,
+			"uptime_pct": round(100.0 * total.ok_count / total.count, 3) if total.count else None,
+			"latency_ms": _quantiles(total.latency, quantiles),
+			"ttfb_ms": _quantiles(total.ttfb, quantiles),
+		}
+
+	def uptime(self, series: str, start: float, end: float) -> Optional[float]:
+		return self.summary(series, start, end, quantiles=())["uptime_pct"]
+
+	def latency_percentiles(self, series: str, start: float, end: float, quantiles: Sequence[float] = (0.5, 0.9, 0.99), field: str = "latency_ms") -> Dict[str, Optional[float]]:
+		return self.summary(series, start, end, quantiles)[field]
+
+	def prune_samples(self, older_than: float) -> int:
+		# Raw samples are only needed for partial minutes; rollups keep the history compact
+		with self._lock, self._db:
+			return self._db.execute("DELETE FROM samples WHERE ts < ?", (older_than,)).rowcount
+
+	def _aggregate(self, series: str, start: float, end: float) -> _Rollup:
+		total = _Rollup()
+		with self._lock:
+			for bucket, lo, hi in _cover(start, end):
+				if bucket is None:
+					for ok, latency, ttfb in self._db.execute(
+						"SELECT ok, latency_ms, ttfb_ms FROM samples WHERE series = ? AND ts >= ? AND ts < ?", (series, lo, hi)
+					):
+						total.add({"ok": ok, "latency_ms": latency, "ttfb_ms": ttfb})
+				else:
+					for row in self._db.execute(
+						"SELECT count, ok_count, latency, ttfb FROM rollups WHERE series = ? AND bucket = ? AND start >= ? AND start < ?",
+						(series, bucket, lo, hi),
+					):
+						total.merge_row(*row)
+		return total
+
+
+def _cover(start: float, end: float) -> List[Tuple[Optional[str], float, float]]:
+	# Splits [start, end) into at most 7 ranges: raw samples for the partial minutes at the edges,
+	# then minutes, hours and days towards the middle. bucket None = raw samples.
+	ranges: List[Tuple[Optional[str], float, float]] = []
+	lo, hi = start, end
+	tail: List[Tuple[Optional[str], float, float]] = []
+	previous: Optional[str] = None
+	for bucket, size in BUCKETS.items():
+		inner_lo = -(-lo // size) * size
+		inner_hi = hi // size * size
+		if inner_lo >= inner_hi:
+			break
+		if lo < inner_lo:
+			ranges.append((previous, lo, inner_lo))
+		if inner_hi < hi:
+			tail.append((previous, inner_hi, hi))
+		lo, hi, previous = inner_lo, inner_hi, bucket
+	ranges.append((previous, lo, hi))
+	return [r for r in ranges + tail[::-1] if r[1] < r[2]]
+
+
+def _quantiles(sketch: QuantileSketch, quantiles: Sequence[float]) -> Dict[str, Optional[float]]:
+	result: Dict[str, Optional[float]] = {"avg": _round(sketch.mean)}
+	for q in quantiles:
+		result[f"p{q * 100:g}"] = _round(sketch.quantile(q))
+	return result
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+	return round(value, 2) if value is not None else None
+
+
+def _blob(sketch: QuantileSketch) -> Optional[bytes]:
+	return sketch.to_bytes() if sketch.count else None
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import json
+import os
+import ssl as ssl_module
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+SslObject = Union[ssl_module.SSLSocket, ssl_module.SSLObject]
+
+
+def _name(rdns: Any) -> Dict[str, str]:
+	# getpeercert() names are tuples of RDNs, each a tuple of (key, value) pairs
+	return {key: value for rdn in rdns or () for key, value in rdn}
+
+
+def _not_after(cert: Dict[str, Any]) -> Optional[float]:
+	value = cert.get("notAfter")
+	return ssl_module.cert_time_to_seconds(value) if value else None
+
+
+def _days_left(expires: Optional[float], now: float) -> Optional[int]:
+	return int((expires - now) // 86400) if expires is not None else None
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+	return datetime.fromtimestamp(ts, timezone.utc).replace(tzinfo=None).isoformat() + "Z" if ts is not None else None
+
+
+def _from_iso(value: Optional[str]) -> Optional[float]:
+	return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp() if value else None
+
+
+def with_days_left(info: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+	"""Copy of a stored result with days_left (its own, the chain's) computed from not_after for now."""
+	now = time.time() if now is None else now
+	fresh = dict(info)
+	if "not_after" in info:
+		fresh["days_left"] = _days_left(_from_iso(info["not_after"]), now)
+	if info.get("chain"):
+		fresh["chain"] = [{**c, "days_left": _days_left(_from_iso(c.get("not_after")), now)} for c in info["chain"]]
+		days = [c["days_left"] for c in fresh["chain"] if c["days_left"] is not None]
+		fresh["chain_days_left"] = min(days) if days else fresh.get("days_left")
+	return fresh
+
+
+def _summary(cert: Dict[str, Any], now: float) -> Dict[str, Any]:
+	subject, issuer = _name(cert.get("subject")), _name(cert.get("issuer"))
+	expires = _not_after(cert)
+	return {
+		"subject": subject.get("commonName") or subject.get("organizationName"),
+		"issuer": issuer.get("organizationName") or issuer.get("commonName"),
+		"not_after": _iso(expires),
+		"days_left": _days_left(expires, now),
+	}
+
+
+def _verified_chain(sslobj: SslObject) -> List[Dict[str, Any]]:
+	# Public from Python 3.13; the same method exists on the internal object since 3.10
+	get_chain = getattr(sslobj, "get_verified_chain", None) or getattr(getattr(sslobj, "_sslobj", None), "get_verified_chain", None)
+	if get_chain is None:
+		return []
+	try:
+		return [cert.get_info() for cert in get_chain()]
+	except (AttributeError, ValueError, ssl_module.SSLError):
+		return []
+
+
+def certificate_info(sslobj: SslObject) -> Optional[Dict[str, Any]]:
+	"""Expiry, issuer and SANs of the peer certificate of a completed handshake, plus its verified chain."""
+	cert = sslobj.getpeercert()
+	if not cert:
+		return None  # unverified connection: nothing parsed
+	now = time.time()
+	info = _summary(cert, now)
+	info["sans"] = [value for kind, value in cert.get("subjectAltName", ()) if kind == "DNS"]
+	info["serial"] = cert.get("serialNumber")
+	chain = [_summary(c, now) for c in _verified_chain(sslobj)] or [dict(info)]
+	for item in chain:
+		item.pop("sans", None)
+		item.pop("serial", None)
+	info["chain"] = chain
+	days = [c["days_left"] for c in chain if c["days_left"] is not None]
+	info["chain_days_left"] = min(days) if days else info["days_left"]
+	info["captured_at"] = now
+	return info
+
+
+class CertificateStore:
+	"""Certificates seen on the handshakes of the process's connections, by host:port.
+
+	Entries older than `max_age` seconds are replaced by the next handshake and not returned meanwhile,
+	so a long-lived process notices a renewed certificate; days_left is computed when an entry is read.
+	"""
+
+	def __init__(self, max_age: float = 3600.0) -> None:
+		self.max_age = max_age
+		self._lock = threading.Lock()
+		self._certs: Dict[str, Dict[str, Any]] = {}
+
+	def _fresh(self, key: str) -> Optional[Dict[str, Any]]:
+		info = self._certs.get(key)
+		return info if info is not None and time.time() - info["captured_at"] < self.max_age else None
+
+	def capture(self, host: str, port: int, sslobj: Optional[SslObject]) -> None:
+		key = f"{host.lower()}:{port}"
+		with self._lock:
+			if sslobj is None or self._fresh(key) is not None:
+				return
+		try:
+			info = certificate_info(sslobj)
+		except (ValueError, ssl_module.SSLError):
+			return
+		if info is not None:
+			with self._lock:
+				self._certs[key] = info
+
+	def get(self, host: str, port: int = 443) -> Optional[Dict[str, Any]]:
+		with self._lock:
+			info = self._fresh(f"{host.lower()}:{port}")
+		return with_days_left(info) if info is not None else None
+
+
+class CertificateCache:
+	"""Certificate check results kept for the rest of the (UTC) day."""
+
+	def __init__(self, path: Path) -> None:
+		self.path = path
+		self._lock = threading.Lock()
+		self._today = datetime.now(timezone.utc).date().isoformat()
+		self._hosts: Dict[str, Dict[str, Any]] = {}
+		self._dirty = False
+		if path.exists():
+			try:
+				data = json.loads(path.read_text(encoding="utf-8"))
+				if data.get("date") == self._today:
+					self._hosts = data.get("hosts", {})
+			except (OSError, ValueError, AttributeError):
+				pass  # unreadable cache: check again
+
+	def get(self, host: str) -> Optional[Dict[str, Any]]:
+		with self._lock:
+			info = self._hosts.get(host.lower())
+		return with_days_left(info) if info is not None else None
+
+	def put(self, host: str, info: Dict[str, Any]) -> None:
+		with self._lock:
+			self._hosts[host.lower()] = info
+			self._dirty = True
+
+	def save(self) -> None:
+		with self._lock:
+			if not self._dirty:
+				return
+			tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+			tmp.write_text(json.dumps({"date": self._today, "hosts": self._hosts}, ensure_ascii=False), encoding="utf-8")
+			os.replace(tmp, self.path)
+			self._dirty = False
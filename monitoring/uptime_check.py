@@ -1,25 +1,58 @@
 from __future__ import annotations
 
+import time
 from typing import Dict, Any
 
-from .common import HttpResponse, append_markdown, http_request, now_iso, save_json, cfg
+from .common import HttpResponse, append_markdown, http_request, now_iso, round_timings, save_json, timeseries_store, cfg
+
+DAY = 86400
 
 
 def run() -> Dict[str, Any]:
-	resp: HttpResponse = http_request(cfg.SITE_URL)
+	# Always measure a real request; the response then seeds the run cache for later modules
+	try:
+		resp: HttpResponse = http_request(cfg.SITE_URL, fresh=True)
+	except Exception:
+		store = timeseries_store()
+		if store is not None:
+			store.record(cfg.SITE_URL, ok=False)  # downtime counts against uptime %
+		raise
+	store = timeseries_store()
 	result: Dict[str, Any] = {
 		"url": cfg.SITE_URL,
 		"status": resp.status,
 		"elapsed_ms": round(resp.elapsed_ms, 2),
+		"ttfb_ms": round(resp.ttfb_ms, 2),
+		"timings": round_timings(resp),
+		"connection_reused": resp.connection_reused,
 		"ok": 200 <= resp.status < 400,
-		"warning": resp.elapsed_ms >= cfg.TTFB_WARNING_MS,
+		"warning": resp.ttfb_ms >= cfg.TTFB_WARNING_MS,
 		"timestamp": now_iso(),
 	}
+	if store is not None:
+		store.record(cfg.SITE_URL, ok=result["ok"], status=resp.status, latency_ms=resp.elapsed_ms, ttfb_ms=resp.ttfb_ms)
+		now = time.time()
+		day = store.summary(cfg.SITE_URL, now - DAY, now + 1)
+		result["history"] = {
+			"uptime_24h_pct": day["uptime_pct"],
+			"uptime_7d_pct": store.uptime(cfg.SITE_URL, now - 7 * DAY, now + 1),
+			"ttfb_24h_ms": day["ttfb_ms"],
+			"samples_24h": day["samples"],
+		}
 	save_json("uptime", result)
 	append_markdown(
 		"summary",
 		f"- Uptime: status={result['status']} elapsed={result['elapsed_ms']}ms ok={result['ok']} warning={result['warning']}"
+		f" (dns={result['timings'].get('dns_ms')}ms connect={result['timings'].get('connect_ms')}ms tls={result['timings'].get('tls_ms')}ms"
+		f" ttfb={result['ttfb_ms']}ms download={result['timings'].get('download_ms')}ms)"
 	)
+	if "history" in result:
+		history = result["history"]
+		append_markdown(
+			"summary",
+			f"  History: uptime 24h={history['uptime_24h_pct']}% 7d={history['uptime_7d_pct']}%"
+			f" ttfb 24h p50={history['ttfb_24h_ms']['p50']}ms p90={history['ttfb_24h_ms']['p90']}ms ({history['samples_24h']} samples)"
+		)
 	return result
 
 
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def digest_of(data: Any) -> str:
+	return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _key(namespace: str, url: str) -> str:
+	# URLs hold no spaces, so the namespace prefix cannot run into the URL
+	return f"{namespace} {url}"
+
+
+class ValidatorStore:
+	"""Per-URL ETag/Last-Modified plus the data extracted from the last full response, kept across runs.
+
+	Entries are keyed by (namespace, url): modules extracting different data from the same URL
+	(the crawler and the image check, say) each keep their own.
+	"""
+
+	def __init__(self, path: Path, max_entries: int = 50_000) -> None:
+		self.path = path
+		self.max_entries = max_entries
+		self._lock = threading.Lock()
+		self._entries: Dict[str, Dict[str, Any]] = {}
+		self._dirty = False
+		if path.exists():
+			try:
+				# Keys without a namespace predate them and may hold another module's data
+				self._entries = {k: v for k, v in json.loads(path.read_text(encoding="utf-8")).items() if " " in k}
+			except (OSError, ValueError):
+				self._entries = {}  # unreadable store: start over rather than fail the run
+
+	def get(self, namespace: str, url: str) -> Optional[Dict[str, Any]]:
+		with self._lock:
+			return self._entries.get(_key(namespace, url))
+
+	def headers_for(self, namespace: str, url: str) -> Dict[str, str]:
+		entry = self.get(namespace, url)
+		headers: Dict[str, str] = {}
+		if entry is None:
+			return headers
+		if entry.get("etag"):
+			headers["If-None-Match"] = entry["etag"]
+		if entry.get("last_modified"):
+			headers["If-Modified-Since"] = entry["last_modified"]
+		return headers
+
+	def record(self, namespace: str, url: str, headers: Dict[str, str], data: Any) -> bool:
+		# Only responses with validators are worth keeping; returns True when the extracted data changed
+		etag = headers.get("etag")
+		last_modified = headers.get("last-modified")
+		if not etag and not last_modified:
+			return True
+		digest = digest_of(data)
+		with self._lock:
+			key = _key(namespace, url)
+			previous = self._entries.get(key)
+			self._entries[key] = {
+				"etag": etag,
+				"last_modified": last_modified,
+				"digest": digest,
+				"data": data,
+				"seen": time.time(),
+			}
+			self._dirty = True
+		return previous is None or previous.get("digest") != digest
+
+	def touch(self, namespace: str, url: str) -> None:
+		with self._lock:
+			entry = self._entries.get(_key(namespace, url))
+			if entry is not None:
+				entry["seen"] = time.time()
+				self._dirty = True
+
+	def save(self) -> None:
+		with self._lock:
+			if not self._dirty:
+				return
+			if len(self._entries) > self.max_entries:
+				keep = sorted(self._entries.items(), key=lambda item: item[1].get("seen", 0), reverse=True)[: self.max_entries]
+				self._entries = dict(keep)
+			# Per-process name: fleet workers sharing a reports directory must not overwrite each other's file
+			tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+			tmp.write_text(json.dumps(self._entries, ensure_ascii=False), encoding="utf-8")
+			os.replace(tmp, self.path)
+			self._dirty = False
@@ -39,8 +39,12 @@ def test_check_site_structure():
         assert "status" in result
         assert "healthy" in result
 
-def test_report_generation():
+def test_report_generation(tmp_path, monkeypatch):
     """Testează generarea raportului."""
+    from monitoring import common
+
+    # Istoricul implicit e în directorul de rapoarte al suitei `monitoring`
+    monkeypatch.setattr(common.cfg, "REPORT_DIR", str(tmp_path))
     monitor = WebsiteMonitor()
     monitor.results = [
         {
@@ -52,13 +56,263 @@ def test_report_generation():
         }
     ]
     
-    report = monitor.generate_report("test_report.json")
+    # Nimic nu se scrie în directorul curent
+    cwd = tmp_path / "cwd"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    report = monitor.generate_report(str(tmp_path / "test_report.json"))
     assert "summary" in report
     assert "results" in report
     assert report["summary"]["total_sites"] == 1
     assert report["summary"]["healthy_sites"] == 1
-    
-    # Cleanup
-    if os.path.exists("test_report.json"):
-        os.remove("test_report.json")
+    assert report["history"]["https://example.com"]["samples_24h"] == 1
+    assert (tmp_path / "history.sqlite").exists()
+    assert os.listdir(cwd) == []
+
+
+def test_check_all_sites_keeps_order_and_limits(monkeypatch):
+    """Testează că verificarea paralelă păstrează ordinea și limita per host."""
+    import threading
+    import time
+
+    monitor = WebsiteMonitor(max_workers=8, per_host_limit=1)
+    monitor.sites = [
+        {"name": f"Site {i}", "url": f"https://host{i % 2}.example/{i}"}
+        for i in range(6)
+    ]
+    active = {}
+    peak = {}
+    lock = threading.Lock()
+
+    def fake_check(site):
+        host = site["url"].split("/")[2]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        time.sleep(0.01 * (6 - int(site["url"].rsplit("/", 1)[1])))
+        with lock:
+            active[host] -= 1
+        return {"name": site["name"], "url": site["url"], "status": "online",
+                "healthy": True, "response_time": 1, "error": None}
+
+    monkeypatch.setattr(monitor, "check_site", fake_check)
+    results = monitor.check_all_sites()
+    assert [r["name"] for r in results] == [s["name"] for s in monitor.sites]
+    assert max(peak.values()) == 1
+
+
+def test_check_all_sites_does_not_block_workers_on_busy_host(monkeypatch):
+    """Testează că site-urile care așteaptă un host ocupat nu țin thread-uri, deci alt host nu stă după ele."""
+    import threading
+
+    monitor = WebsiteMonitor(max_workers=2, per_host_limit=1)
+    monitor.sites = [{"name": f"Lent {i}", "url": f"https://slow.example/{i}"} for i in range(3)]
+    monitor.sites.append({"name": "Rapid", "url": "https://fast.example/"})
+    fast_done = threading.Event()
+    waited = []
+
+    def fake_check(site):
+        if "fast" in site["url"]:
+            fast_done.set()
+        elif site["url"].endswith("/0"):
+            # Cu semafoare, al doilea thread ar sta blocat pe slow.example și Rapid ar aștepta aici
+            waited.append(fast_done.wait(2))
+        return {"name": site["name"], "url": site["url"], "status": "online",
+                "healthy": True, "response_time": 1, "error": None}
+
+    monkeypatch.setattr(monitor, "check_site", fake_check)
+    results = monitor.check_all_sites()
+    assert waited == [True]
+    assert [r["name"] for r in results] == [s["name"] for s in monitor.sites]
+
+
+def test_report_generation_records_history(tmp_path):
+    """Testează că raportul adaugă rezultatele în istoricul SQLite."""
+    from monitoring.timeseries import TimeSeriesStore
+
+    history_db = str(tmp_path / "history.sqlite")
+    monitor = WebsiteMonitor(history_db=history_db)
+    for response_time, healthy in ((100, True), (300, True), (None, False)):
+        monitor.results = [{
+            "name": "Test Site", "url": "https://example.com", "status": "online",
+            "healthy": healthy, "response_time": response_time, "ttfb": response_time and response_time / 2,
+        }]
+        report = monitor.generate_report(str(tmp_path / "report.json"))
+    history = report["history"]["https://example.com"]
+    assert history["samples_24h"] == 3
+    assert history["uptime_24h_pct"] == round(200 / 3, 3)
+    assert 99 <= history["response_time_24h"]["p50"] <= 101
+    with TimeSeriesStore(history_db) as store:
+        assert store.series() == ["https://example.com"]
+
+
+def test_multi_sample_probing_and_sketch_merge(tmp_path):
+    """Testează modul cu mai multe cereri per site și combinarea schițelor între rulări."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    connections = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        def get_request(self):
+            sock, addr = super().get_request()
+            connections.append(addr)
+            return sock, addr
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        monitor = WebsiteMonitor(history_db=str(tmp_path / "history.sqlite"))
+        monitor.sketch_file = str(tmp_path / "sketches.json")
+        site = {"name": "Local", "url": url, "samples": 5, "sample_interval": 0, "connection": "warm"}
+        for _ in range(2):
+            monitor.results = [monitor.check_site(site)]
+            report = monitor.generate_report(str(tmp_path / "report.json"))
+        cold = monitor.check_site({**site, "connection": "cold"})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    result = monitor.results[0]
+    assert result["healthy"]
+    latency = result["latency"]
+    assert latency["samples"] == 5 and latency["failed_probes"] == 0
+    assert latency["min"] <= latency["p50"] <= latency["p90"] <= latency["p99"] <= latency["max"]
+    assert latency["jitter"] >= 0
+    assert report["latency_all_runs"][url]["samples"] == 10
+    # warm: one connection per run (warm-up included); cold: one per probe
+    assert len(connections) == 2 + 5
+    assert cold["latency"]["samples"] == 5
+
+
+def test_daemon_checks_each_site_at_its_interval(tmp_path):
+    """Testează modul daemon: intervale per site, conexiuni păstrate și rapoarte scrise periodic."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from monitoring.timeseries import TimeSeriesStore
+
+    connections = []
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        def get_request(self):
+            sock, addr = super().get_request()
+            connections.append(addr)
+            return sock, addr
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    history_db = str(tmp_path / "history.sqlite")
+    try:
+        monitor = WebsiteMonitor(history_db=history_db, per_host_limit=1)
+        monitor.sketch_file = None
+        monitor.sites = [
+            {"name": "Critic", "url": base + "/critical", "interval": 0.2},
+            {"name": "Rar", "url": base + "/rare", "interval": 60, "jitter": 0.1},
+        ]
+        checks = monitor.run_daemon(flush_interval=0.3, max_checks=6, output_file=str(tmp_path / "report.json"),
+                                    markdown_file=str(tmp_path / "report.md"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert checks == 6
+    with open(tmp_path / "report.json", encoding="utf-8") as f:
+        report = json.load(f)
+    assert [r["name"] for r in report["results"]] == ["Critic", "Rar"]
+    # Each check reaches the history once, however many times the report was flushed
+    with TimeSeriesStore(history_db) as store:
+        assert store.summary(base + "/critical", 0, 2e9)["samples"] == 5
+        assert store.summary(base + "/rare", 0, 2e9)["samples"] == 1
+    assert len(connections) == 1  # one warm connection per host, kept between checks
+
+
+def test_daemon_reports_checks_that_raise(tmp_path, monkeypatch):
+    """Testează că o verificare care aruncă o excepție apare în raport ca eșuată, în loc să dispară."""
+    monitor = WebsiteMonitor(history_db=str(tmp_path / "history.sqlite"))
+    monitor.sketch_file = None
+    monitor.sites = [{"name": "Stricat", "url": "https://broken.example/", "interval": 0.05}]
+
+    def boom(site, session=None):
+        raise RuntimeError("config invalid")
+
+    monkeypatch.setattr(monitor, "check_site", boom)
+    checks = monitor.run_daemon(flush_interval=10, max_checks=2, output_file=str(tmp_path / "report.json"),
+                                markdown_file=str(tmp_path / "report.md"))
+    assert checks == 2
+    with open(tmp_path / "report.json", encoding="utf-8") as f:
+        result = json.load(f)["results"][0]
+    assert result["status"] == "error" and not result["healthy"]
+    assert result["error"] == "RuntimeError: config invalid"
+
+
+def test_circuit_breaker_skips_dead_host_until_probe_succeeds(tmp_path):
+    """Testează că un host căzut e sărit după câteva erori și revine după o cerere de probă reușită."""
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, *args):
+            pass
+
+    # Un port liber pe care nu ascultă nimeni
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    port = server.server_address[1]
+    server.server_close()
+
+    monitor = WebsiteMonitor(history_db=str(tmp_path / "history.sqlite"))
+    monitor.circuits.failure_threshold = 3
+    monitor.circuits.reset_timeout = 0.2
+    site = {"name": "Dead", "url": f"http://127.0.0.1:{port}/", "timeout": 2, "samples": 5, "sample_interval": 0}
+
+    first = monitor.check_site(site)
+    assert first["status"] == "circuit_open" and not first["healthy"]
+    assert monitor.circuits.state(f"127.0.0.1:{port}") == "open"
+    started = time.perf_counter()
+    second = monitor.check_site(site)
+    assert second["status"] == "circuit_open"
+    assert time.perf_counter() - started < 0.1
 
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        time.sleep(0.25)
+        recovered = monitor.check_site(site)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert recovered["healthy"] and recovered["latency"]["samples"] == 5
+    assert monitor.circuits.state(f"127.0.0.1:{port}") == "closed"
+    assert monitor.circuits.stats()["trips"] == 1
@@ -0,0 +1,934 @@
+"""
+Teste pentru pachetul monitoring (fără rețea externă, cu un server HTTP local)
+"""
+
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring import common
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    pages = {}
+
+    def do_GET(self):
+        status, headers, body = self.pages.get(self.path, (404, {}, b"not found"))
+        headers = dict(headers)
+        if headers.get("ETag") and self.headers.get("If-None-Match") == headers["ETag"]:
+            status, body = 304, b""
+        elif status == 200 and (self.headers.get("Range") or "").startswith("bytes=0-"):
+            last = min(int(self.headers["Range"][len("bytes=0-"):]), len(body) - 1)
+            headers["Content-Range"] = f"bytes 0-{last}/{len(body)}"
+            status, body = 206, body[:last + 1]
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        if status != 304:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    """Pornește un server HTTP local cu keep-alive."""
+    _Handler.pages = {}
+    connections = []
+
+    class Server(ThreadingHTTPServer):
+        def get_request(self):
+            sock, addr = super().get_request()
+            connections.append(addr)
+            return sock, addr
+
+    srv = Server(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    srv.base_url = f"http://127.0.0.1:{srv.server_address[1]}"
+    srv.pages = _Handler.pages
+    srv.connections = connections
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    common.http_pool.close_all()
+
+
+def test_http_request_reuses_keepalive_connection(server):
+    """Testează că cererile succesive pe același host folosesc aceeași conexiune."""
+    server.pages["/a"] = (200, {"Content-Type": "text/html"}, b"<a href='/b'>b</a>")
+    server.pages["/b"] = (200, {"Content-Type": "text/html"}, b"ok")
+    for path in ("/a", "/b", "/a"):
+        resp = common.http_request(server.base_url + path)
+        assert resp.status == 200
+    assert len(server.connections) == 1
+
+
+def test_run_cache_downloads_each_url_once(server):
+    """Testează că în cadrul unei rulări un URL se descarcă o singură dată."""
+    hits = []
+    server.pages["/page"] = (200, {"Content-Type": "text/html"}, b"hello")
+    original = _Handler.do_GET
+
+    def counting_get(self):
+        hits.append(self.path)
+        original(self)
+
+    _Handler.do_GET = counting_get
+    try:
+        with common.run_cache() as cache:
+            first = common.http_request(server.base_url + "/page")
+            second = common.http_request(server.base_url + "/page")
+            common.http_request(server.base_url + "/page", fresh=True)
+            assert first is second
+            assert cache.stats()["hits"] == 1
+        common.http_request(server.base_url + "/page")
+    finally:
+        _Handler.do_GET = original
+    assert hits == ["/page"] * 3
+
+
+@pytest.fixture
+def site(server, monkeypatch, tmp_path):
+    """Configurează monitorizarea pe serverul local, cu rapoartele în tmp."""
+    monkeypatch.setattr(common.cfg, "SITE_URL", server.base_url + "/")
+    monkeypatch.setattr(common.cfg, "ALLOWED_HOSTS", ["127.0.0.1"])
+    monkeypatch.setattr(common.cfg, "REPORT_DIR", str(tmp_path))
+    hits = []
+    original = _Handler.do_GET
+
+    def counting_get(self):
+        hits.append(self.path)
+        original(self)
+
+    monkeypatch.setattr(_Handler, "do_GET", counting_get)
+    server.hits = hits
+    return server
+
+
+def _page_urls(result):
+    """URL-urile din fișierul NDJSON cu rezultatele per pagină ale unui crawler."""
+    from monitoring.page_stream import iter_pages
+
+    return [r["url"] for r in iter_pages(common.ensure_report_dir() / result["pages_file"])]
+
+
+def test_seo_crawler_fetches_each_page_once(site):
+    """Testează că SEO crawler-ul descarcă fiecare pagină o singură dată."""
+    from monitoring import seo_crawler
+
+    html = b"<html><head><title>Home</title></head><body><a href='/p1'>1</a><a href='/p2'>2</a><a href='/p1'>1</a></body></html>"
+    site.pages["/"] = (200, {"Content-Type": "text/html"}, html)
+    site.pages["/p1"] = (200, {"Content-Type": "text/html"}, b"<title>P1</title><a href='/'>home</a>")
+    site.pages["/p2"] = (200, {"Content-Type": "text/html"}, b"<title>P2</title>")
+    result = seo_crawler.run()
+    assert sorted(site.hits) == ["/", "/en/", "/p1", "/p2"]
+    assert result["total_pages_scanned"] == 4
+    assert _page_urls(result) == [site.base_url + p for p in ("/", "/p1", "/p2")]
+
+
+def test_shared_crawl_feeds_all_visitors_once(site):
+    """Testează că link checker-ul și SEO crawler-ul împart același crawl."""
+    from monitoring import link_checker, seo_crawler
+    from monitoring.crawler import Crawler
+
+    site.pages["/"] = (200, {"Content-Type": "text/html"}, b"<a href='/a'>a</a><a href='/a'>a</a><a href='/missing'>x</a>")
+    site.pages["/a"] = (200, {"Content-Type": "text/html"}, b"<a href='/deep'>deep</a>")
+    site.pages["/deep"] = (200, {"Content-Type": "text/html"}, b"<title>deep</title>")
+    links = link_checker.LinkVisitor()
+    seo = seo_crawler.SeoVisitor()
+    stats = Crawler([links, seo], max_depth=1, workers=3).crawl()
+    assert stats["pages_fetched"] == 4
+    assert sorted(site.hits) == ["/", "/a", "/en/", "/missing"]
+    assert {b["url"] for b in links.finish()["broken"]} == {site.base_url + "/en/", site.base_url + "/missing"}
+    assert seo.finish()["pages_with_seo_data"] == 2
+
+
+def test_run_all_against_local_site(site):
+    """Testează o rulare completă run_all pe serverul local."""
+    from monitoring import run_all
+
+    site.pages["/"] = (200, {"Content-Type": "text/html"}, b"<title>Home</title><a href='/a'>a</a><img src=\"/i.png\">")
+    site.pages["/a"] = (200, {"Content-Type": "text/html"}, b"<title>A</title>")
+    site.pages["/i.png"] = (200, {"Content-Type": "image/png"}, b"\x89PNG\r\n\x1a\n")
+    site.pages["/robots.txt"] = (200, {"Content-Type": "text/plain"}, f"Sitemap: {site.base_url}/sitemap.xml".encode())
+    site.pages["/sitemap.xml"] = (200, {"Content-Type": "application/xml"}, f"<urlset><url><loc>{site.base_url}/orphan</loc></url></urlset>".encode())
+    site.pages["/orphan"] = (200, {"Content-Type": "text/html"}, b"<title>Orphan</title>")
+    result = run_all.run_all()
+    assert result["uptime"]["ok"]
+    assert result["links"]["scanned"] == result["crawl"]["pages_fetched"]
+    assert result["images"]["images_checked"] == 1
+    assert result["images"]["issues"] == []
+    assert site.hits.count("/") == 1
+    # Crawlers are seeded from the sitemap, so unlinked pages are checked too
+    assert result["crawl"]["sitemap_seeds"] == 1
+    assert "/orphan" in site.hits
+    assert site.hits.count("/sitemap.xml") == 1
+    # Per-page results are streamed to a file the aggregate refers to
+    assert result["seo"]["pages_file"] == "seo_pages.ndjson" and "detailed_results" not in result["seo"]
+    assert set(result["modules"]) == {"uptime", "ssl", "robots", "crawl", "links", "security", "seo", "dns", "images"}
+    assert all(m["wall_ms"] >= 0 for m in result["modules"].values())
+    summary = (common.ensure_report_dir() / "summary.md").read_text(encoding="utf-8")
+    assert summary.index("- Uptime") < summary.index("- Links") < summary.index("- SEO Crawler")
+
+
+def test_scheduler_runs_independent_tasks_concurrently(tmp_path, monkeypatch):
+    """Testează rularea în paralel, dependențele și timeout-ul per modul."""
+    import time
+    from monitoring.scheduler import Task, run_tasks
+
+    monkeypatch.setattr(common.cfg, "REPORT_DIR", str(tmp_path))
+
+    def slow(value, delay=0.3):
+        def run(deps):
+            time.sleep(delay)
+            common.append_markdown("summary", f"- {value}")
+            return value
+        return run
+
+    tasks = [
+        Task("a", slow("a")),
+        Task("b", slow("b")),
+        Task("c", lambda deps: deps["a"] + deps["b"], deps=("a", "b")),
+        Task("hang", slow("hang", delay=2), timeout=0.1),
+        Task("after_hang", lambda deps: "never", deps=("hang",)),
+        Task("boom", lambda deps: 1 / 0),
+        Task("after_boom", lambda deps: sorted(deps), after=("boom",)),
+    ]
+    started = time.perf_counter()
+    results, report = run_tasks(tasks, workers=4)
+    assert time.perf_counter() - started < 0.9
+    assert results["c"] == "ab"
+    assert report["hang"]["status"] == "timeout"
+    assert report["after_hang"]["status"] == "skipped"
+    assert report["boom"]["status"] == "error" and "ZeroDivisionError" in results["boom"]["error"]
+    assert report["after_boom"]["status"] == "ok" and results["after_boom"] == []
+    assert (tmp_path / "summary.md").read_text(encoding="utf-8") == "- a\n- b\n"
+    with pytest.raises(ValueError):
+        run_tasks([Task("x", slow("x"), deps=("y",)), Task("y", slow("y"), deps=("x",))])
+
+
+def test_scheduler_timeout_counts_from_start_and_keeps_hung_threads(tmp_path, monkeypatch):
+    """Testează că timeout-ul pornește la execuție și că un modul abandonat ține ocupat firul lui."""
+    import threading
+    import time
+    from monitoring.scheduler import Task, run_tasks
+
+    monkeypatch.setattr(common.cfg, "REPORT_DIR", str(tmp_path))
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def work(delay):
+        def run(deps):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(delay)
+            with lock:
+                active.pop()
+            return delay
+        return run
+
+    tasks = [
+        Task("hang", work(0.4), timeout=0.1),
+        # Queued behind the hung thread; its own 0.3s only start once it gets one
+        Task("queued", work(0.15), timeout=0.3),
+    ]
+    results, report = run_tasks(tasks, workers=1)
+    assert report["hang"]["status"] == "timeout"
+    assert report["queued"]["status"] == "ok" and results["queued"] == 0.15
+    assert max(peak) == 1
+    # workers=0 (e.g. RUN_ALL_WORKERS = 0) still runs on one thread
+    results, report = run_tasks([Task("a", lambda deps: 1)], workers=0)
+    assert results["a"] == 1
+
+
+SAMPLE_HTML = b"""<html><head><TITLE>Hello &amp; world</TITLE>
+<meta content="Desc" name="description"><meta property="og:title" content="OG">
+<!-- <a href="/commented">x</a> -->
+<script type="application/ld+json">{"x": "<a href='/in-json'>"}</script>
+</head><body><a HREF=rel.html>r</a><a href='/q?a=1&amp;b=2'>q</a>
+<img src="/i.png" srcset="/i-2x.png 2x, /i-3x.png 3x"><div style="background-image: url(/bg.jpg)"></div>
+</body></html>"""
+
+
+def test_html_scanner_single_pass_extraction():
+    """Testează extragerea de link-uri, imagini și meta tag-uri dintr-o singură trecere."""
+    from monitoring.html_scan import scan_html
+
+    result = scan_html(SAMPLE_HTML, "https://ex.com/dir/")
+    assert result.links == ["https://ex.com/dir/rel.html", "https://ex.com/q?a=1&b=2", "https://ex.com/i.png"]
+    assert result.srcset == ["https://ex.com/i-2x.png", "https://ex.com/i-3x.png"]
+    assert "https://ex.com/bg.jpg" in result.images
+    assert result.meta_tags() == {"title": "Hello & world", "description": "Desc", "og": {"title": "OG"}, "schema_ld_count": 1}
+
+
+def test_html_scanner_is_chunk_independent_and_stops_early():
+    """Testează că scanarea incrementală dă același rezultat și se poate opri după </head>."""
+    from monitoring.html_scan import HtmlScanner, scan_html
+
+    expected = scan_html(SAMPLE_HTML, "https://ex.com/")
+    for size in (1, 5, 64):
+        scanner = HtmlScanner("https://ex.com/")
+        for i in range(0, len(SAMPLE_HTML), size):
+            scanner.feed(SAMPLE_HTML[i:i + size])
+        assert scanner.close() == expected
+
+    scanner = HtmlScanner("https://ex.com/", stop_after_head=True)
+    assert scanner.feed(SAMPLE_HTML) is False
+    head_only = scanner.close()
+    assert head_only.stopped_early and head_only.links == []
+    assert head_only.title == "Hello & world"
+
+
+def test_html_scanner_streams_long_open_elements_in_linear_time():
+    """Testează că un script sau comentariu lung, primit în bucăți mici, nu e rescanat de la început."""
+    import time
+    from monitoring.html_scan import HtmlScanner, scan_html
+
+    filler = b"var x = '<b>' + 1;\n" * 20000
+    page = (b"<html><head><script>" + filler + b"</script  ><!-- " + filler + b" <a href='/no'> -->"
+            b"<style>.a{background-image: url(/bg.png)}</style ></head><body><a href='/yes'>y</a></body></html>")
+    started = time.perf_counter()
+    scanner = HtmlScanner("https://ex.com/")
+    for i in range(0, len(page), 256):
+        scanner.feed(page[i:i + 256])
+    result = scanner.close()
+    assert time.perf_counter() - started < 2.0
+    assert result == scan_html(page, "https://ex.com/")
+    assert result.links == ["https://ex.com/yes"] and result.images == ["https://ex.com/bg.png"]
+
+
+def test_conditional_requests_reuse_stored_results(site):
+    """Testează că paginile nemodificate (304) refolosesc rezultatele salvate."""
+    from monitoring import seo_crawler
+    from monitoring.crawler import Crawler
+    from monitoring.page_stream import iter_pages
+
+    site.pages["/"] = (200, {"Content-Type": "text/html", "ETag": '"v1"'}, b"<title>Home</title><a href='/a'>a</a>")
+    site.pages["/a"] = (200, {"Content-Type": "text/html", "ETag": '"v1"'}, b"<title>A page</title>")
+    def crawl():
+        visitor = seo_crawler.SeoVisitor()
+        stats = Crawler([visitor]).crawl()
+        path = common.ensure_report_dir() / visitor.finish()["pages_file"]
+        return stats, [{k: v for k, v in r.items() if k != "timings"} for r in iter_pages(path)]
+
+    first_stats, first = crawl()
+    assert first_stats["pages_not_modified"] == 0
+    common._validator_stores.clear()  # next run reloads validators.json from disk
+    second_stats, second = crawl()
+    assert second_stats["pages_not_modified"] == 2
+    assert second == first
+
+
+def test_image_check_probes_instead_of_downloading(site):
+    """Testează că imaginile sunt verificate cu un GET parțial (Range), nu descărcate integral."""
+    import struct
+    from monitoring import image_check
+
+    png = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", 640, 480, 8, 2, 0, 0, 0)
+    site.pages["/big.png"] = (200, {"Content-Type": "image/png"}, png + b"\x00" * 600_000)
+    ok, error, info = image_check.check_image(site.base_url + "/big.png")
+    assert ok and error is None
+    assert info["size_bytes"] == len(png) + 600_000
+    assert (info["format"], info["width"], info["height"]) == ("png", 640, 480)
+
+
+def test_crawler_and_image_check_keep_separate_validators(site):
+    """Testează că o imagine cu ETag, verificată și de crawler și de image_check, nu amestecă datele salvate."""
+    import struct
+    from monitoring import image_check
+    from monitoring.crawler import Crawler, PageVisitor
+
+    png = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", 64, 48, 8, 2, 0, 0, 0)
+    site.pages["/"] = (200, {"Content-Type": "text/html"}, b"<title>Home</title><img src='/logo.png'>")
+    site.pages["/logo.png"] = (200, {"Content-Type": "image/png", "ETag": '"img1"'}, png)
+    url = site.base_url + "/logo.png"
+
+    for run in range(2):
+        if run:
+            common._validator_stores.clear()  # second run reloads validators.json from disk
+        pages = []
+
+        class Visitor(PageVisitor):
+            def visit(self, page):
+                pages.append(page)
+
+        Crawler([Visitor()]).crawl()
+        image = next(p for p in pages if p.url == url)
+        assert image.error is None and image.not_modified == bool(run)
+        assert image.response.status == 200
+        ok, error, info = image_check.check_image(url)
+        assert ok and error is None
+        assert (info["format"], info["width"], info["height"]) == ("png", 64, 48)
+
+
+def test_crawler_probes_linked_assets_with_head(site):
+    """Testează că fișierele legate (PDF) sunt verificate cu HEAD."""
+    from monitoring import link_checker
+    from monitoring.crawler import Crawler
+
+    methods = []
+    original = _Handler.do_HEAD
+
+    def recording_head(self):
+        methods.append(("HEAD", self.path))
+        original(self)
+
+    _Handler.do_HEAD = recording_head
+    try:
+        site.pages["/"] = (200, {"Content-Type": "text/html"}, b"<a href='/doc.pdf'>pdf</a><a href='/gone.pdf'>pdf</a>")
+        site.pages["/doc.pdf"] = (200, {"Content-Type": "application/pdf"}, b"%PDF" * 1000)
+        visitor = link_checker.LinkVisitor()
+        Crawler([visitor]).crawl()
+    finally:
+        _Handler.do_HEAD = original
+    assert sorted(methods) == [("HEAD", "/doc.pdf"), ("HEAD", "/gone.pdf")]
+    assert [b["url"] for b in visitor.broken.items] == [site.base_url + "/gone.pdf"]
+
+
+def test_bounded_and_streamed_body_reads(server):
+    """Testează limitarea corpului răspunsului și citirea în flux."""
+    import hashlib
+
+    payload = bytes(range(256)) * 4096  # 1 MiB
+    server.pages["/big.bin"] = (200, {"Content-Type": "application/octet-stream"}, payload)
+    url = server.base_url + "/big.bin"
+
+    capped = common.http_request(url, max_body_bytes=100_000)
+    assert capped.truncated and len(capped.body) == 100_000
+    assert capped.total_size == len(payload)
+
+    seen = []
+    streamed = common.http_request(url, on_chunk=lambda chunk: seen.append(len(chunk)), keep_body=False)
+    assert not streamed.truncated and streamed.body == b""
+    assert sum(seen) == len(payload)
+    assert streamed.body_sha256 == hashlib.sha256(payload).hexdigest()
+
+    aborted = common.http_request(url, on_chunk=lambda chunk: False)
+    assert aborted.truncated and len(aborted.body) < len(payload)
+
+    with common.stream_request(url) as (head, chunks):
+        assert head.status == 200 and head.total_size == len(payload)
+        assert b"".join(chunks) == payload
+
+
+def test_response_carries_phase_timings(server):
+    """Testează defalcarea timpilor pe faze (DNS / connect / TLS / TTFB / download)."""
+    server.pages["/t"] = (200, {"Content-Type": "text/plain"}, b"x" * 1000)
+    first = common.http_request(server.base_url + "/t")
+    assert set(first.timings) == {"dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "download_ms"}
+    assert not first.connection_reused
+    assert first.ttfb_ms <= first.elapsed_ms
+    second = common.http_request(server.base_url + "/t")
+    assert second.connection_reused
+    assert second.timings["connect_ms"] == 0.0
+
+
+def test_redirects_are_followed_and_resolved_once_per_run(site):
+    """Testează urmărirea redirect-urilor și rezolvarea lor o singură dată pe rulare."""
+    from monitoring import link_checker, seo_crawler
+    from monitoring.crawler import Crawler
+
+    html = b"<title>Home</title><a href='/old'>old</a><a href='/gone'>gone</a><a href='/loop'>loop</a>"
+    site.pages["/"] = (200, {"Content-Type": "text/html"}, html)
+    site.pages["/old"] = (301, {"Location": "/new/"}, b"moved")
+    site.pages["/new/"] = (200, {"Content-Type": "text/html"}, b"<title>New</title><a href='page'>p</a><a href='/old'>old</a>")
+    site.pages["/new/page"] = (200, {"Content-Type": "text/html"}, b"<title>Page</title>")
+    site.pages["/gone"] = (302, {"Location": "/missing"}, b"")
+    site.pages["/loop"] = (307, {"Location": "/loop"}, b"")
+
+    with common.run_cache():
+        resp = common.http_request(site.base_url + "/old")
+        assert resp.status == 200
+        assert resp.final_url == site.base_url + "/new/"
+        assert resp.redirect_chain == [{"url": site.base_url + "/old", "status": 301, "location": site.base_url + "/new/"}]
+        links, seo = link_checker.LinkVisitor(), seo_crawler.SeoVisitor()
+        Crawler([links, seo]).crawl()
+        assert site.hits.count("/old") == 1
+
+    result = links.finish()
+    broken = {item["url"]: item for item in result["broken"]}
+    assert broken[site.base_url + "/gone"]["status"] == 404
+    assert broken[site.base_url + "/gone"]["final_url"] == site.base_url + "/missing"
+    assert "Redirect loop" in broken[site.base_url + "/loop"]["error"]
+    assert result["redirected_count"] == 2
+    # The relative link on /new/ resolves against the final URL, not against /old
+    assert "/new/page" in site.hits
+    assert _page_urls(seo.finish()) == [site.base_url + p for p in ("/", "/new/", "/new/page")]
+
+
+def test_asyncio_backend_matches_thread_backend(site):
+    """Testează că backend-ul asyncio dă aceleași rezultate ca cel cu thread-uri."""
+    from monitoring import link_checker, seo_crawler
+    from monitoring.async_http import AsyncHttpClient
+    from monitoring.crawler import Crawler
+
+    links = "".join(f"<a href='/p{i}'>{i}</a>" for i in range(30))
+    site.pages["/"] = (200, {"Content-Type": "text/html"}, f"<title>Home</title>{links}<a href='/old'>o</a><a href='/f.pdf'>f</a>".encode())
+    for i in range(30):
+        site.pages[f"/p{i}"] = (200, {"Content-Type": "text/html"}, f"<title>P{i}</title><a href='/'>home</a>".encode())
+    site.pages["/old"] = (301, {"Location": "/p1"}, b"")
+    site.pages["/f.pdf"] = (200, {"Content-Type": "application/pdf"}, b"%PDF" * 1000)
+
+    def crawl(backend):
+        visitors = [link_checker.LinkVisitor(), seo_crawler.SeoVisitor()]
+        stats = Crawler(visitors, backend=backend).crawl()
+        return stats, visitors[0].finish(), _page_urls(visitors[1].finish())
+
+    def strip(result):
+        return {k: v for k, v in result.items() if k not in ("timings", "timestamp")}
+
+    thread_stats, thread_links, thread_seo = crawl("threads")
+    del site.hits[:]
+    site.connections.clear()
+    async_stats, async_links, async_seo = crawl("asyncio")
+    assert async_stats == thread_stats
+    assert strip(async_links) == strip(thread_links)
+    assert async_seo == thread_seo
+    assert async_links["redirected_count"] == 1
+    assert "/f.pdf" in site.hits  # probed, body never downloaded
+    assert len(site.connections) <= common.cfg.ASYNC_MAX_CONNECTIONS_PER_HOST
+
+    with AsyncHttpClient(max_in_flight=4) as client:
+        resp = client.submit(client.request(site.base_url + "/p3")).result()
+        again = client.submit(client.request(site.base_url + "/p3")).result()
+    assert resp.status == 200 and resp.body == b"<title>P3</title><a href='/'>home</a>"
+    assert again.connection_reused and not resp.connection_reused
+    assert resp.total_size == len(resp.body) and not resp.truncated
+
+
+def test_run_all_fleet_shards_sites_across_processes(site):
+    """Testează rularea pentru mai multe site-uri, câte un proces per site."""
+    from monitoring import run_all
+
+    site.pages["/"] = (200, {"Content-Type": "text/html"}, b"<title>Home</title><a href='/a'>a</a>")
+    site.pages["/a"] = (200, {"Content-Type": "text/html"}, b"<title>A</title>")
+    site.pages["/shop/"] = (200, {"Content-Type": "text/html"}, b"<title>Shop</title><a href='/missing'>x</a>")
+    profiles = [
+        {"name": "Main Site", "url": site.base_url, "allowed_hosts": ["127.0.0.1"]},
+        {"name": "Shop", "url": site.base_url + "/shop/", "allowed_hosts": ["127.0.0.1"], "monitoring": {"MAX_PAGES_CRAWL": 2}},
+    ]
+    fleet = run_all.run_all(profiles, processes=2)
+    assert fleet["processes"] == 2
+    assert fleet["sites_total"] == 2
+    main, shop = fleet["sites"]
+    assert main["name"] == "Main Site" and main["status"] == 200
+    assert shop["pages_fetched"] == 2
+    assert shop["broken_links"] >= 1
+    report_dir = common.ensure_report_dir()
+    assert (report_dir / "sites" / "main-site" / "aggregate.json").exists()
+    assert (report_dir / "sites" / "shop" / "aggregate.json").exists()
+    assert "Fleet report" in (report_dir / "fleet.md").read_text(encoding="utf-8")
+
+
+def test_run_fleet_in_process_restores_config(site):
+    """Testează că rularea fără procese separate nu lasă configurația pe ultimul site."""
+    from monitoring import run_all
+
+    site.pages["/"] = (200, {"Content-Type": "text/html"}, b"<title>Home</title>")
+    report_dir = common.ensure_report_dir()
+    max_pages = common.cfg.MAX_PAGES_CRAWL
+    profiles = [{"name": "A", "url": site.base_url, "allowed_hosts": ["127.0.0.1"], "monitoring": {"MAX_PAGES_CRAWL": 1}}]
+    fleet = run_all.run_all(profiles, processes=1)
+    assert fleet["processes"] == 1
+    assert common.cfg.REPORT_DIR == str(report_dir)
+    assert common.cfg.SITE_URL == site.base_url + "/"
+    assert common.cfg.MAX_PAGES_CRAWL == max_pages
+    assert (report_dir / "fleet.json").exists()
+    assert not (report_dir / "sites" / "a" / "fleet.json").exists()
+
+
+def test_timeseries_rollups_answer_range_queries(tmp_path):
+    """Testează agregarea pe minut/oră/zi și interogările de uptime și percentile."""
+    import random
+    from monitoring.sketch import QuantileSketch
+    from monitoring.timeseries import TimeSeriesStore
+
+    rng = random.Random(7)
+    base = 86400 * 20000
+    samples = [(base + i * 37.1, rng.lognormvariate(5, 0.6), i % 20 != 0) for i in range(8000)]
+    with TimeSeriesStore(tmp_path / "h.sqlite") as store:
+        store.record_many(("site", {"ts": ts, "ok": ok, "status": 200 if ok else 500, "latency_ms": v}) for ts, v, ok in samples[:5000])
+        store.record_many(("site", {"ts": ts, "ok": ok, "latency_ms": v}) for ts, v, ok in samples[5000:])
+        lo, hi = base + 1234.5, base + 250000.25
+        inside = sorted(v for ts, v, _ in samples if lo <= ts < hi)
+        summary = store.summary("site", lo, hi)
+        assert summary["samples"] == len(inside)
+        assert summary["uptime_pct"] == round(100.0 * sum(ok for ts, _, ok in samples if lo <= ts < hi) / len(inside), 3)
+        for q, key in ((0.5, "p50"), (0.9, "p90"), (0.99, "p99")):
+            exact = inside[int(q * (len(inside) - 1))]
+            assert abs(summary["latency_ms"][key] - exact) / exact < 0.03
+        assert store.uptime("other", lo, hi) is None
+
+    # Sketches merge exactly and survive serialization
+    a, b = QuantileSketch(), QuantileSketch()
+    a.extend(range(1, 501))
+    b.extend(range(501, 1001))
+    a.merge(QuantileSketch.from_bytes(b.to_bytes()))
+    assert a.count == 1000 and abs(a.quantile(0.5) - 500) < 10
+
+
+def test_incremental_crawl_fetches_only_new_changed_or_stale_pages(site, monkeypatch):
+    """Testează crawl-ul incremental: frontiera salvată, paginile refolosite și cele re-descărcate."""
+    from monitoring import link_checker
+    from monitoring.crawler import Crawler
+
+    monkeypatch.setattr(common.cfg, "INCREMENTAL_CRAWL", True)
+    site.pages["/"] = (200, {"Content-Type": "text/html"}, b"<title>Home</title>" + b"".join(b"<a href='/p%d'>p</a>" % i for i in range(5)))
+    for i in range(5):
+        site.pages[f"/p{i}"] = (200, {"Content-Type": "text/html"}, b"<title>P</title><a href='/missing'>x</a>")
+
+    def crawl(**kwargs):
+        del site.hits[:]
+        visitor = link_checker.LinkVisitor()
+        stats = Crawler([visitor], max_pages=3, **kwargs).crawl()
+        return stats, visitor.finish()
+
+    first, links = crawl()
+    assert first["pages_fetched"] == 3 and first["pages_new"] == 3
+    assert first["queued_not_fetched"] == 4  # /p2../p4 and /missing
+    assert first["urls_discovered"] == first["urls_first_seen"] == 7
+    assert sorted(site.hits) == ["/", "/p0", "/p1"]
+
+    # Known pages are replayed; the budget goes to the saved frontier
+    second, links = crawl()
+    assert second["pages_replayed"] == 3
+    assert sorted(site.hits) == ["/p2", "/p3", "/p4"]
+    assert links["scanned"] == 6
+    assert second["urls_first_seen"] == 0
+
+    # A newer sitemap lastmod forces a refetch of that page only; the 404 is always checked again
+    third, links = crawl(lastmod={site.base_url + "/p1": "2030-01-01"})
+    assert sorted(site.hits) == ["/missing", "/p1"]
+    assert third["pages_changed"] == 0 and third["queued_not_fetched"] == 0
+    assert links["broken_count"] == 1
+
+    # Past the TTL everything is fetched again, with conditional requests where possible
+    monkeypatch.setattr(common.cfg, "CRAWL_TTL_HOURS", 0)
+    site.pages["/p0"] = (200, {"Content-Type": "text/html"}, b"<title>Changed</title>")
+    fourth, _ = crawl()
+    assert fourth["pages_replayed"] == 0
+    assert "/" in site.hits and "/p0" in site.hits
+    assert fourth["pages_changed"] == 1
+
+
+def test_sitemaps_are_streamed_into_an_inventory(site, monkeypatch):
+    """Testează citirea în flux a sitemap-urilor: index, fișier .xml.gz, mai multe sitemap-uri în robots.txt."""
+    import gzip
+    from monitoring import sitemap_robots
+
+    base = site.base_url
+    urls = "".join(
+        f"<url><loc>{base}/p{i}</loc><lastmod>2026-01-0{i % 9 + 1}</lastmod>{'<priority>0.9</priority>' if i == 7 else ''}</url>"
+        for i in range(300)
+    )
+    ns = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+    site.pages["/robots.txt"] = (200, {}, f"Sitemap: {base}/index.xml\nSitemap: {base}/extra.xml\nSitemap: {base}/gone.xml".encode())
+    site.pages["/index.xml"] = (200, {}, f"<sitemapindex {ns}><sitemap><loc>{base}/pages.xml.gz</loc></sitemap><sitemap><loc>{base}/extra.xml</loc></sitemap></sitemapindex>".encode())
+    site.pages["/pages.xml.gz"] = (200, {"Content-Type": "application/gzip"}, gzip.compress(f"<urlset {ns}>{urls}</urlset>".encode()))
+    site.pages["/extra.xml"] = (200, {}, f"<urlset {ns}><url><loc>{base}/a?x=1&amp;y=2</loc></url></urlset>".encode())
+    monkeypatch.setattr(common.cfg, "MAX_BODY_BYTES", 1024)  # the sitemap reader has its own, larger cap
+    result = sitemap_robots.run()
+    assert result["sitemap_status"] == 200
+    assert result["index_files"] == 1
+    assert result["sitemap_urls_total"] == 301
+    assert [f["url"].rsplit("/", 1)[1] for f in result["sitemap_files"]] == ["index.xml", "extra.xml", "gone.xml", "pages.xml.gz"]
+    assert site.hits.count("/extra.xml") == 1
+    assert any("gone.xml" in issue and "404" in issue for issue in result["issues"])
+
+    top = sitemap_robots.sitemap_entries(3)
+    assert [e.loc for e in top] == [f"{base}/p7", f"{base}/a?x=1&y=2", f"{base}/p0"]
+    assert top[0].priority == 0.9 and top[0].lastmod == "2026-01-08"
+
+
+def test_sitemap_errors_fail_only_their_file(site):
+    """Testează că un URL relativ sau o buclă de redirect strică doar sitemap-ul respectiv."""
+    from monitoring.sitemap import read_sitemaps
+
+    base = site.base_url
+    ns = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+    site.pages["/loop.xml"] = (302, {"Location": f"{base}/loop.xml"}, b"")
+    site.pages["/ok.xml"] = (200, {}, f"<urlset {ns}><url><loc>{base}/a</loc></url></urlset>".encode())
+    entries = []
+    result = read_sitemaps(["relative.xml", f"{base}/loop.xml", f"{base}/ok.xml"], entries.append)
+    relative, loop, ok = result["files"]
+    assert relative["error"].startswith("ValueError")
+    assert loop["error"].startswith("RedirectError")
+    assert "error" not in ok and ok["urls"] == 1
+    assert [e.loc for e in entries] == [f"{base}/a"]
+
+
+def test_url_index_is_compact_exact_and_serializable(tmp_path):
+    """Testează indexul de URL-uri pe amprente de 64 biți: creștere, filtrul Bloom și salvarea pe disc."""
+    from monitoring.url_index import UrlIndex
+
+    urls = [f"https://example.com/page/{i}?q={i % 7}" for i in range(50_000)]
+    for bloom in (0, 10):
+        index = UrlIndex(bloom_bits_per_url=bloom)
+        assert all(index.add(url) for url in urls)
+        assert not index.add(urls[123])
+        assert len(index) == len(urls)
+        assert all(url in index for url in urls[::97])
+        assert not any(f"https://example.com/other/{i}" in index for i in range(1000))
+        assert index.nbytes < 40 * len(urls)
+
+        path = tmp_path / f"index-{bloom}.bin"
+        index.save(path)
+        loaded = UrlIndex.load(path)
+        assert len(loaded) == len(urls) and urls[-1] in loaded and "https://example.com/" not in loaded
+        assert loaded.add("https://example.com/") and len(loaded) == len(urls) + 1
+
+    (tmp_path / "broken.bin").write_bytes(b"garbage")
+    assert len(UrlIndex.load(tmp_path / "broken.bin")) == 0
+
+
+def test_dns_cache_shares_lookups_and_expires_them(server, monkeypatch):
+    """Testează cache-ul DNS: TTL, cache negativ, rezolvare concurentă și folosirea lui la conexiuni."""
+    import socket
+    import time
+    from monitoring.dns_cache import DnsCache
+
+    calls = []
+
+    def lookup(host):
+        calls.append(host)
+        time.sleep(0.2)
+        if host == "missing.test":
+            raise socket.gaierror("Name or service not known")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", 0))]
+
+    cache = DnsCache(ttl=0.5, negative_ttl=0.5, workers=8, lookup=lookup)
+    started = time.perf_counter()
+    errors = cache.prefetch(["a.test", "b.test", "c.test", "missing.test", "a.test"])
+    assert time.perf_counter() - started < 0.6  # four lookups of 0.2s, at once
+    assert errors["a.test"] is None and "not known" in errors["missing.test"]
+    assert cache.resolve("A.test", 443)[0][4] == ("127.0.0.1", 443)
+    with pytest.raises(socket.gaierror):
+        cache.resolve("missing.test", 80)
+    assert sorted(calls) == ["a.test", "b.test", "c.test", "missing.test"]
+    with pytest.raises(socket.timeout):
+        cache.resolve("slow.test", 80, timeout=0.01)
+    time.sleep(0.6)
+    cache.resolve("a.test", 80)
+    assert calls.count("a.test") == 2
+
+    # New pooled connections to the same host resolve it only once
+    server.pages["/"] = (200, {}, b"ok")
+    url = f"http://localhost:{server.server_address[1]}/"
+    common.dns_cache.clear()
+    before = common.dns_cache.stats()["misses"]
+    for _ in range(3):
+        assert common.http_request(url).status == 200
+        common.http_pool.close_all()
+    assert len(server.connections) == 3
+    assert common.dns_cache.stats()["misses"] == before + 1
+
+
+def test_rejected_tls_session_falls_back_without_leaking_the_socket(server, monkeypatch):
+    """Testează că, la o sesiune TLS refuzată, socket-ul primei încercări e închis înainte de reconectare."""
+    import ssl
+    from monitoring.http_pool import ConnectionPool
+
+    wrapped = []
+
+    class Context(ssl.SSLContext):
+        def wrap_socket(self, sock, server_hostname=None, session=None):
+            wrapped.append(sock)
+            if session is not None:
+                raise ssl.SSLError("session rejected")
+            return sock
+
+    pool = ConnectionPool(context=Context(ssl.PROTOCOL_TLS_CLIENT))
+    monkeypatch.setattr(pool.certificates, "capture", lambda *args: None)
+    key = ("https", "127.0.0.1", server.server_address[1])
+    pool._sessions[key] = object()
+    conn, _ = pool.acquire(key, 5)
+    conn.connect()
+    assert len(wrapped) == 2
+    assert wrapped[0].fileno() == -1 and wrapped[1].fileno() != -1
+    assert pool.tls_session(key) is None
+    pool.discard(key, conn)
+
+
+def test_certificates_come_from_pooled_handshakes_and_the_day_cache(server, tmp_path, monkeypatch):
+    """Testează verificarea certificatelor: preluate din conexiunile existente, handshake-uri în paralel, cache pe zi."""
+    import shutil
+    import ssl
+    import subprocess
+    import time
+    from monitoring import ssl_expiry, tls_certs
+
+    if shutil.which("openssl") is None:
+        pytest.skip("openssl is needed to create a test certificate")
+    cert, key = tmp_path / "cert.pem", tmp_path / "key.pem"
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "30", "-subj", "/CN=localhost/O=Test CA",
+         "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1", "-keyout", str(key), "-out", str(cert)],
+        check=True, capture_output=True,
+    )
+    server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    server_context.load_cert_chain(cert, key)
+    server.socket = server_context.wrap_socket(server.socket, server_side=True)
+    server.pages["/"] = (200, {}, b"ok")
+    port = server.server_address[1]
+    monkeypatch.setattr(common.http_pool, "context", ssl.create_default_context(cafile=str(cert)))
+    monkeypatch.setattr(common.cfg, "REPORT_DIR", str(tmp_path))
+
+    assert common.http_request(f"https://localhost:{port}/").status == 200
+    # Certificates are per host:port: the one seen on this port says nothing about port 443
+    assert common.http_pool.certificates.get("localhost") is None
+    certs = ssl_expiry.check_certificates([f"localhost:{port}", f"127.0.0.1:{port}", "127.0.0.1:1"])
+    assert certs[f"localhost:{port}"]["source"] == "connection"
+    assert certs[f"127.0.0.1:{port}"]["source"] == "handshake"
+    assert certs["127.0.0.1:1"]["error"]
+    for host in (f"localhost:{port}", f"127.0.0.1:{port}"):
+        info = certs[host]
+        assert info["days_left"] in (29, 30) and info["chain_days_left"] <= info["days_left"]
+        assert info["sans"] == ["localhost"] and info["issuer"] == "Test CA"
+    assert len(server.connections) == 2
+
+    # Same day: answered from the cache, failures are tried again
+    again = ssl_expiry.check_certificates([f"localhost:{port}", f"127.0.0.1:{port}", "127.0.0.1:1"])
+    assert again[f"localhost:{port}"]["source"] == again[f"127.0.0.1:{port}"]["source"] == "cache"
+    assert again["127.0.0.1:1"]["source"] == "handshake"
+    assert len(server.connections) == 2
+
+    # days_left is computed when read, so a long-lived process does not report the capture day's value
+    later = tls_certs.with_days_left(certs[f"localhost:{port}"], now=time.time() + 10 * 86400)
+    assert later["days_left"] == certs[f"localhost:{port}"]["days_left"] - 10
+    assert later["chain_days_left"] == later["days_left"]
+    monkeypatch.setattr(common.http_pool.certificates, "max_age", 0)
+    assert common.http_pool.certificates.get("localhost", port) is None
+
+
+def test_report_sink_buffers_reports_until_the_run_ends(tmp_path, monkeypatch):
+    """Testează bufferul de rapoarte: nimic pe disc până la final, apoi fișiere complete, compact sau NDJSON."""
+    import json
+
+    monkeypatch.setattr(common.cfg, "REPORT_DIR", str(tmp_path))
+    (tmp_path / "summary.md").write_text("previous run\n", encoding="utf-8")
+    inode = (tmp_path / "summary.md").stat().st_ino
+    with common.report_sink():
+        common.save_json("first", {"a": 1})
+        for i in range(50):
+            common.append_markdown("summary", f"- line {i}")
+        with common.report_sink():  # nested runs share the sink
+            common.save_json("second", {"b": [1, 2]})
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["summary.md"]
+    summary = (tmp_path / "summary.md").read_text(encoding="utf-8")
+    assert summary.startswith("previous run\n- line 0\n") and summary.endswith("- line 49\n")
+    assert (tmp_path / "summary.md").stat().st_ino == inode  # appended to, not rewritten
+    assert json.loads((tmp_path / "second.json").read_text(encoding="utf-8")) == {"b": [1, 2]}
+    assert "\n" in (tmp_path / "first.json").read_text(encoding="utf-8")
+
+    with common.report_sink("compact"):
+        common.save_json("first", {"a": 2})
+    assert (tmp_path / "first.json").read_text(encoding="utf-8") == '{"a":2}'
+
+    monkeypatch.setattr(common.cfg, "REPORT_FORMAT", "ndjson")
+    with common.report_sink():
+        common.save_json("first", {"a": 3})
+        common.save_json("second", {"b": 4})
+    common.save_json("third", {"c": 5})  # outside a run: written right away
+    lines = [json.loads(line) for line in (tmp_path / "results.ndjson").read_text(encoding="utf-8").splitlines()]
+    assert lines == [{"report": "first", "a": 3}, {"report": "second", "b": 4}, {"report": "third", "c": 5}]
+    assert not list(tmp_path.glob("*.tmp")) and not list(tmp_path.glob(".*.tmp"))
+
+
+def test_crawlers_stream_page_records_and_keep_bounded_summaries(site, monkeypatch):
+    """Testează scrierea în flux a rezultatelor per pagină și listele limitate la REPORT_TOP_N."""
+    from monitoring import link_checker, seo_crawler
+    from monitoring.crawler import Crawler
+
+    monkeypatch.setattr(common.cfg, "REPORT_TOP_N", 2)
+    site.pages["/"] = (200, {"Content-Type": "text/html"}, b"<title>Home</title>" + b"".join(b"<a href='/p%d'>p</a><a href='/x%d'>x</a>" % (i, i) for i in range(5)))
+    for i in range(5):
+        site.pages[f"/p{i}"] = (200, {"Content-Type": "text/html"}, b"<title>P</title>")
+    links, seo = link_checker.LinkVisitor(), seo_crawler.SeoVisitor()
+    Crawler([links, seo]).crawl()
+    seo_result, links_result = seo.finish(), links.finish()
+
+    assert len(_page_urls(seo_result)) == seo_result["pages_with_seo_data"] == 6
+    assert seo_result["global_issues_count"] == 6 and len(seo_result["issues_by_url"]) == 2
+    assert seo_result["issues_by_type"] == {"Missing meta description": 6}
+    assert seo_result["warnings_by_type"]["Title too short"] == 6
+    assert len(_page_urls(links_result)) == links_result["scanned"] == 12
+    assert links_result["broken_count"] == 6 and len(links_result["broken"]) == 2
+
+
+def test_circuit_breaker_fails_fast_on_dead_host(server, monkeypatch):
+    """Testează că după câteva erori de conexiune un host e sărit până reușește o cerere de probă."""
+    import time
+    from monitoring.circuit import CircuitBreaker, CircuitOpenError
+
+    monkeypatch.setattr(common, "circuit_breaker", CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+    port = server.server_address[1]
+    server.pages["/up"] = (200, {}, b"ok")
+    server.shutdown()
+    server.server_close()
+
+    url = f"http://127.0.0.1:{port}/up"
+    for _ in range(2):
+        with pytest.raises(ConnectionRefusedError):
+            common.http_request(url)
+    with pytest.raises(CircuitOpenError):
+        common.http_request(url)
+    assert common.circuit_breaker.stats() == {"open": [f"127.0.0.1:{port}"], "trips": 1, "rejected": 1}
+
+    revived = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+    threading.Thread(target=revived.serve_forever, daemon=True).start()
+    try:
+        time.sleep(0.25)
+        assert common.http_request(url).status == 200
+    finally:
+        revived.shutdown()
+        revived.server_close()
+    assert common.circuit_breaker.state(f"127.0.0.1:{port}") == "closed"
+
+
+def test_hedged_request_beats_slow_response(server, monkeypatch):
+    """Testează că o cerere mai lentă decât p95 al host-ului primește un duplicat, iar primul răspuns câștigă."""
+    import time
+    from monitoring.circuit import Hedger, LatencyTracker
+
+    monkeypatch.setattr(common.cfg, "HEDGE_REQUESTS", True)
+    monkeypatch.setattr(common, "host_latency", LatencyTracker(min_samples=3))
+    monkeypatch.setattr(common, "hedger", Hedger(workers=4))
+    server.pages["/page"] = (200, {}, b"ok")
+    original = _Handler.do_GET
+    slow = []
+
+    def first_slow(self):
+        if self.path == "/slow" and not slow:
+            slow.append(self.path)
+            time.sleep(1.0)
+        original(self)
+
+    _Handler.do_GET = first_slow
+    try:
+        for _ in range(3):
+            common.http_request(server.base_url + "/page")
+        server.pages["/slow"] = (200, {}, b"ok")
+        started = time.perf_counter()
+        resp = common.http_request(server.base_url + "/slow")
+        elapsed = time.perf_counter() - started
+    finally:
+        _Handler.do_GET = original
+    assert resp.status == 200
+    assert elapsed < 0.5
+    assert common.hedger.stats() == {"hedged": 1, "hedge_wins": 1}
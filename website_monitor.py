@@ -5,19 +5,142 @@ Perfect pentru monitorizarea serviciilor web.
 """
 
 import requests
+import argparse
+import base64
+import heapq
 import json
+import random
 import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from typing import List, Dict, Optional
+from urllib.parse import urlparse
 import os
 import sys
 
+from monitoring.circuit import CircuitBreaker, CircuitOpenError
+from monitoring.common import cfg as monitoring_cfg, ensure_report_dir, timeseries_store
+from monitoring.sketch import QuantileSketch
+from monitoring.timeseries import TimeSeriesStore
+
+DEFAULT_MAX_WORKERS = 10
+DEFAULT_PER_HOST_LIMIT = 2
+DEFAULT_HISTORY_DB = None  # istoricul suitei `monitoring` (TIMESERIES_DB din directorul ei de rapoarte)
+DEFAULT_SKETCH_FILE = "monitor_sketches.json"  # în directorul de rapoarte, dacă nu e cale absolută
+DEFAULT_SAMPLE_INTERVAL = 0.5
+DEFAULT_CHECK_INTERVAL = 300
+DEFAULT_FLUSH_INTERVAL = 60
+DEFAULT_FAILURE_THRESHOLD = 3
+DEFAULT_CIRCUIT_RESET = 60
+DAY_SECONDS = 86400
+
+
+def _median(values: List[float]) -> float:
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def latency_stats(sketch: QuantileSketch, sequence: Optional[List[float]] = None) -> Dict:
+    """Percentilele unei schițe; jitter = media diferențelor dintre cereri consecutive."""
+    stats = {
+        "samples": sketch.count,
+        "min": round(sketch.min, 2),
+        "p50": round(sketch.quantile(0.5), 2),
+        "p90": round(sketch.quantile(0.9), 2),
+        "p99": round(sketch.quantile(0.99), 2),
+        "max": round(sketch.max, 2),
+    }
+    if sequence is not None:
+        diffs = [abs(b - a) for a, b in zip(sequence, sequence[1:])]
+        stats["jitter"] = round(sum(diffs) / len(diffs), 2) if diffs else 0.0
+    return stats
+
+
+def _host(site: Dict) -> str:
+    return urlparse(site.get("url", "")).hostname or ""
+
+
+class _HostQueue:
+    """Trimite verificările în pool doar când hostul lor are un loc liber din `limit`.
+
+    Restul așteaptă în coada hostului și pornesc pe măsură ce se eliberează locuri, așa că
+    thread-urile din pool nu stau niciodată blocate după un host lent.
+    """
+
+    def __init__(self, pool: ThreadPoolExecutor, limit: int):
+        self.pool = pool
+        self.limit = max(1, limit)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._active: Dict[str, int] = {}
+        self._queues: Dict[str, deque] = {}
+        self._pending = 0
+
+    def submit(self, host: str, fn, *args) -> Future:
+        future: Future = Future()
+        with self._lock:
+            self._pending += 1
+            if self._active.get(host, 0) >= self.limit:
+                self._queues.setdefault(host, deque()).append((future, fn, args))
+                return future
+            self._active[host] = self._active.get(host, 0) + 1
+        self._start(host, future, fn, args)
+        return future
+
+    def join(self) -> None:
+        """Așteaptă toate verificările trimise, inclusiv pe cele încă în coadă."""
+        with self._idle:
+            self._idle.wait_for(lambda: self._pending == 0)
+
+    def _start(self, host: str, future: Future, fn, args) -> None:
+        self.pool.submit(fn, *args).add_done_callback(lambda done: self._finished(host, future, done))
+
+    def _finished(self, host: str, future: Future, done: Future) -> None:
+        # Locul eliberat trece direct la următoarea verificare din coada hostului
+        with self._lock:
+            queue = self._queues.get(host)
+            following = queue.popleft() if queue else None
+            if following is None:
+                self._active[host] -= 1
+        if following is not None:
+            self._start(host, *following)
+        if done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(done.result())
+        with self._idle:
+            self._pending -= 1
+            self._idle.notify_all()
+
+
 class WebsiteMonitor:
-    def __init__(self, config_file: str = "sites.json"):
-        """Inițializează monitorul cu lista de site-uri."""
+    def __init__(self, config_file: str = "sites.json", max_workers: Optional[int] = None,
+                 per_host_limit: Optional[int] = None, history_db: Optional[str] = None):
+        """Inițializează monitorul cu lista de site-uri.
+
+        `max_workers` limitează numărul total de verificări simultane, iar
+        `per_host_limit` câte verificări pot lovi același host în paralel.
+        `history_db` este baza SQLite în care se păstrează istoricul verificărilor; implicit
+        cea a suitei `monitoring` (`.reports/history.sqlite`), ca să existe un singur istoric.
+        Dacă lipsesc, se citesc din secțiunea `settings` a fișierului JSON.
+        """
         self.config_file = config_file
+        self.settings: Dict = {}
         self.sites = self.load_config()
         self.results = []
+        self.max_workers = max_workers or self.settings.get("max_workers", DEFAULT_MAX_WORKERS)
+        self.per_host_limit = per_host_limit or self.settings.get("per_host_limit", DEFAULT_PER_HOST_LIMIT)
+        self.history_db = history_db or self.settings.get("history_db", DEFAULT_HISTORY_DB)
+        self.sketch_file = self.settings.get("sketch_file", DEFAULT_SKETCH_FILE)
+        self._stop = threading.Event()
+        # După `failure_threshold` erori de conexiune la rând, un host e sărit (fără cereri) `circuit_reset` secunde
+        self.circuits = CircuitBreaker(
+            failure_threshold=self.settings.get("failure_threshold", DEFAULT_FAILURE_THRESHOLD),
+            reset_timeout=self.settings.get("circuit_reset", DEFAULT_CIRCUIT_RESET),
+        )
         
     def load_config(self) -> List[Dict]:
         """Încarcă configurația site-urilor din JSON."""
@@ -45,14 +168,24 @@ class WebsiteMonitor:
         
         with open(self.config_file, 'r', encoding='utf-8') as f:
             config = json.load(f)
+            self.settings = config.get("settings", {})
             return config.get("sites", [])
     
-    def check_site(self, site: Dict) -> Dict:
-        """Verifică un singur site și returnează rezultatul."""
+    def check_site(self, site: Dict, session: Optional["requests.Session"] = None) -> Dict:
+        """Verifică un singur site și returnează rezultatul.
+
+        Cu `samples` > 1 se trimit mai multe cereri (la `sample_interval` secunde
+        una de alta), iar `response_time` devine mediana lor; distribuția completă
+        (p50/p90/p99, jitter) apare în `latency`, iar schița de percentile în `sketch`.
+        Cu `session`, cererile folosesc conexiunile deja deschise ale acesteia (modul daemon).
+        """
         name = site.get("name", "Unknown")
         url = site.get("url", "")
         expected_status = site.get("expected_status", 200)
         timeout = site.get("timeout", 10)
+        samples = max(1, int(site.get("samples", self.settings.get("samples", 1))))
+        interval = site.get("sample_interval", self.settings.get("sample_interval", DEFAULT_SAMPLE_INTERVAL))
+        connection = site.get("connection", self.settings.get("connection", "cold"))
         
         result = {
             "name": name,
@@ -65,57 +198,254 @@ class WebsiteMonitor:
             "healthy": False
         }
         
+        probes = self.probe_site(url, timeout, samples, interval, connection, session)
+        answered = [p for p in probes if "error" not in p]
+        if not answered:
+            # Toate cererile au eșuat: raportăm ultima eroare
+            result["status"] = probes[-1]["status"]
+            result["error"] = probes[-1]["error"]
+            return result
+        
+        response_time = round(_median([p["response_time"] for p in answered]), 2)
+        status_code = answered[-1]["status_code"]
+        wrong_status = [p["status_code"] for p in answered if p["status_code"] != expected_status]
+        failed = len(probes) - len(answered)
+        
+        result["status_code"] = status_code
+        result["response_time"] = response_time
+        result["ttfb"] = round(_median([p["ttfb"] for p in answered]), 2)
+        result["status"] = "online"
+        if samples > 1:
+            sketch = QuantileSketch()
+            sketch.extend(p["response_time"] for p in answered)
+            result["latency"] = latency_stats(sketch, [p["response_time"] for p in answered])
+            result["latency"].update({"connection": connection, "failed_probes": failed})
+            result["sketch"] = base64.b64encode(sketch.to_bytes()).decode("ascii")
+        result["healthy"] = not wrong_status and not failed and response_time < (timeout * 1000)
+        
+        if not result["healthy"]:
+            if wrong_status:
+                result["error"] = f"Status code {wrong_status[-1]} != {expected_status}"
+            elif failed:
+                result["error"] = f"{failed}/{len(probes)} probes failed: {next(p['error'] for p in probes if 'error' in p)}"
+            else:
+                result["error"] = f"Response time {response_time}ms > {timeout * 1000}ms"
+        
+        return result
+    
+    def probe_site(self, url: str, timeout: float, samples: int = 1, interval: float = 0,
+                   connection: str = "cold", session: Optional["requests.Session"] = None) -> List[Dict]:
+        """Trimite `samples` cereri GET și întoarce timpii (sau eroarea) fiecăreia.
+
+        `cold`: fiecare cerere deschide o conexiune nouă (DNS + TCP + TLS incluse).
+        `warm`: conexiunea e încălzită cu o cerere care nu se numără, apoi refolosită.
+        O `session` primită din afară e folosită ca atare și rămâne deschisă.
+        Cât timp circuitul host-ului e deschis, cererile nu se mai trimit (status `circuit_open`).
+        """
+        probes = []
+        host = urlparse(url).netloc.lower()
+        own_session = session is None and connection == "warm"
+        if own_session:
+            session = requests.Session()
         try:
-            start_time = time.time()
-            response = requests.get(url, timeout=timeout, allow_redirects=True)
-            response_time = round((time.time() - start_time) * 1000, 2)  # în milisecunde
-            
-            result["status_code"] = response.status_code
-            result["response_time"] = response_time
-            result["status"] = "online"
-            result["healthy"] = (
-                response.status_code == expected_status and 
-                response_time < (timeout * 1000)
-            )
-            
-            if not result["healthy"]:
-                if response.status_code != expected_status:
-                    result["error"] = f"Status code {response.status_code} != {expected_status}"
+            if own_session and self.circuits.state(host) == "closed":
+                try:
+                    session.get(url, timeout=timeout, allow_redirects=True)
+                except requests.exceptions.RequestException:
+                    pass  # eroarea reapare și se raportează la cererile măsurate
+            for i in range(samples):
+                if i and interval:
+                    time.sleep(interval)
+                try:
+                    self.circuits.before(host)
+                except CircuitOpenError as e:
+                    # Host-ul a căzut recent: nu mai așteptăm `timeout` secunde la fiecare cerere
+                    probes.append({"status": "circuit_open", "error": str(e)})
+                    break
+                probe = self._probe_once(session, url, timeout)
+                if probe.get("status") in ("timeout", "connection_error"):
+                    self.circuits.failure(host)
                 else:
-                    result["error"] = f"Response time {response_time}ms > {timeout * 1000}ms"
-            
+                    self.circuits.success(host)
+                probes.append(probe)
+        finally:
+            if own_session:
+                session.close()
+        return probes
+    
+    @staticmethod
+    def _probe_once(session: Optional["requests.Session"], url: str, timeout: float) -> Dict:
+        try:
+            start_time = time.perf_counter()
+            if session is not None:
+                response = session.get(url, timeout=timeout, allow_redirects=True)
+            else:
+                response = requests.get(url, timeout=timeout, allow_redirects=True)
+            return {
+                "status_code": response.status_code,
+                "response_time": (time.perf_counter() - start_time) * 1000,  # în milisecunde
+                # requests măsoară `elapsed` până la primirea header-elor, adică TTFB
+                "ttfb": response.elapsed.total_seconds() * 1000,
+            }
         except requests.exceptions.Timeout:
-            result["status"] = "timeout"
-            result["error"] = f"Request timeout after {timeout}s"
+            return {"status": "timeout", "error": f"Request timeout after {timeout}s"}
         except requests.exceptions.ConnectionError:
-            result["status"] = "connection_error"
-            result["error"] = "Connection refused or DNS error"
+            return {"status": "connection_error", "error": "Connection refused or DNS error"}
         except Exception as e:
-            result["status"] = "error"
-            result["error"] = str(e)
-        
-        return result
+            return {"status": "error", "error": str(e)}
     
     def check_all_sites(self) -> List[Dict]:
-        """Verifică toate site-urile din configurație."""
+        """Verifică toate site-urile din configurație, în paralel.
+
+        Rezultatele păstrează ordinea din `sites.json`, indiferent de ordinea
+        în care se termină verificările.
+        """
         print(f"\n🔍 Verificare {len(self.sites)} site-uri...\n")
         self.results = []
         
-        for site in self.sites:
-            print(f"  ⏳ Verificare: {site['name']} ({site['url']})")
-            result = self.check_site(site)
-            self.results.append(result)
-            
-            if result["healthy"]:
-                print(f"     ✅ Online - {result['response_time']}ms")
-            else:
-                status_icon = "⚠️" if result["status"] == "online" else "❌"
-                print(f"     {status_icon} {result['status']} - {result.get('error', 'N/A')}")
+        workers = max(1, min(self.max_workers, len(self.sites)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            hosts = _HostQueue(pool, self.per_host_limit)
+            futures = [hosts.submit(_host(site), self.check_site, site) for site in self.sites]
+            for site, future in zip(self.sites, futures):
+                print(f"  ⏳ Verificare: {site['name']} ({site['url']})")
+                result = future.result()
+                self.results.append(result)
+                
+                if result["healthy"]:
+                    print(f"     ✅ Online - {result['response_time']}ms")
+                    if "latency" in result:
+                        lat = result["latency"]
+                        print(f"        p50 {lat['p50']}ms · p90 {lat['p90']}ms · p99 {lat['p99']}ms · jitter {lat['jitter']}ms ({lat['samples']} cereri)")
+                else:
+                    status_icon = "⚠️" if result["status"] == "online" else "❌"
+                    print(f"     {status_icon} {result['status']} - {result.get('error', 'N/A')}")
         
         return self.results
     
-    def generate_report(self, output_file: str = "monitor_report.json") -> Dict:
-        """Generează un raport JSON cu toate rezultatele."""
+    def run_daemon(self, flush_interval: Optional[float] = None, max_checks: Optional[int] = None,
+                   output_file: str = "monitor_report.json", markdown_file: str = "monitor_report.md") -> int:
+        """Verifică site-urile continuu, fiecare la intervalul lui, până la `stop()` (sau Ctrl+C).
+
+        Fiecare site are `interval` (secunde, default 300) și `jitter` (secunde, default 0):
+        verificarea pornește la un moment aleator din [programat, programat + jitter), ca să nu
+        lovească toate site-urile deodată. Programarea e un heap cu momentul următoarei verificări,
+        iar ritmul se păstrează de la momentul programat, nu de la terminarea verificării.
+        Conexiunile rămân deschise între verificări (o sesiune per host), iar rapoartele,
+        istoricul și schițele se actualizează la fiecare `flush_interval` secunde și la oprire.
+        Întoarce numărul de verificări pornite.
+        """
+        flush_interval = flush_interval or self.settings.get("flush_interval", DEFAULT_FLUSH_INTERVAL)
+        if not self.sites:
+            return 0
+        self._stop.clear()
+        sessions: Dict[str, requests.Session] = {}
+        latest: Dict[int, Dict] = {}  # ultimul rezultat al fiecărui site, după poziția din sites.json
+        fresh: List[Dict] = []  # verificările care nu au ajuns încă în raport
+        running = set()
+        lock = threading.Lock()
+        
+        def session_for(site: Dict) -> requests.Session:
+            with lock:
+                if _host(site) not in sessions:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host_limit)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    sessions[_host(site)] = session
+                return sessions[_host(site)]
+        
+        def check(index: int) -> None:
+            site = self.sites[index]
+            cold = site.get("connection", self.settings.get("connection")) == "cold"
+            try:
+                try:
+                    result = self.check_site(site, session=None if cold else session_for(site))
+                except Exception as e:
+                    # Rezultatul viitorului nu e citit de nimeni: eroarea se afișează și se raportează aici
+                    print(f"  ⚠️ {site.get('name', 'Unknown')}: verificarea a eșuat: {type(e).__name__}: {e}")
+                    result = {
+                        "name": site.get("name", "Unknown"),
+                        "url": site.get("url", ""),
+                        "timestamp": datetime.now().isoformat(),
+                        "status": "error",
+                        "status_code": None,
+                        "response_time": None,
+                        "error": f"{type(e).__name__}: {e}",
+                        "healthy": False,
+                    }
+                with lock:
+                    latest[index] = result
+                    fresh.append(result)
+                icon = "✅" if result["healthy"] else "❌"
+                print(f"  {icon} {result['name']}: {result['status']} {result.get('response_time')}ms")
+            finally:
+                with lock:
+                    running.discard(index)
+        
+        def flush() -> None:
+            with lock:
+                new = list(fresh)
+                fresh.clear()
+                self.results = [latest[i] for i in sorted(latest)]
+            if self.results:
+                self.generate_report(output_file, new_results=new)
+                self.generate_markdown_report(markdown_file)
+        
+        print(f"\n🔁 Mod daemon: {len(self.sites)} site-uri, raport la fiecare {flush_interval}s (Ctrl+C pentru oprire)\n")
+        now = time.monotonic()
+        # (momentul verificării, index, momentul programat fără jitter)
+        heap = [(now + random.uniform(0, self._jitter(site)), i, now) for i, site in enumerate(self.sites)]
+        heapq.heapify(heap)
+        next_flush = now + flush_interval
+        checks = 0
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(self.sites))))
+        hosts = _HostQueue(pool, self.per_host_limit)
+        try:
+            while not self._stop.is_set() and (max_checks is None or checks < max_checks):
+                now = time.monotonic()
+                if now >= next_flush:
+                    flush()
+                    next_flush = now + flush_interval
+                    continue
+                due, index, scheduled = heap[0]
+                if due > now:
+                    self._stop.wait(min(due, next_flush) - now)
+                    continue
+                site = self.sites[index]
+                scheduled = max(scheduled + self._interval(site), now)
+                heapq.heapreplace(heap, (scheduled + random.uniform(0, self._jitter(site)), index, scheduled))
+                with lock:
+                    if index in running:
+                        continue  # verificarea anterioară încă rulează: o sărim pe aceasta
+                    running.add(index)
+                hosts.submit(_host(site), check, index)
+                checks += 1
+        finally:
+            hosts.join()
+            pool.shutdown(wait=True)
+            flush()
+            for session in sessions.values():
+                session.close()
+        return checks
+    
+    def stop(self) -> None:
+        """Oprește `run_daemon` (din alt thread)."""
+        self._stop.set()
+    
+    def _interval(self, site: Dict) -> float:
+        return max(0.1, float(site.get("interval", self.settings.get("interval", DEFAULT_CHECK_INTERVAL))))
+    
+    def _jitter(self, site: Dict) -> float:
+        return max(0.0, float(site.get("jitter", self.settings.get("jitter", 0))))
+    
+    def generate_report(self, output_file: str = "monitor_report.json", new_results: Optional[List[Dict]] = None) -> Dict:
+        """Generează un raport JSON cu toate rezultatele.
+
+        `new_results` sunt verificările care nu au ajuns încă în istoric și în schițe
+        (implicit toate din `self.results`); în modul daemon, cele de după ultimul raport.
+        """
+        new_results = self.results if new_results is None else new_results
         healthy_count = sum(1 for r in self.results if r["healthy"])
         total_count = len(self.results)
         
@@ -129,6 +459,10 @@ class WebsiteMonitor:
             },
             "results": self.results
         }
+        if self.history_db or monitoring_cfg.TIMESERIES_DB:
+            report["history"] = self.record_history(new_results)
+        if self.sketch_file and any("sketch" in r for r in self.results):
+            report["latency_all_runs"] = self.merge_sketches(new_results)
         
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(report, f, indent=2, ensure_ascii=False)
@@ -136,9 +470,87 @@ class WebsiteMonitor:
         print(f"\n📊 Raport generat: {output_file}")
         print(f"   ✅ Site-uri sănătoase: {healthy_count}/{total_count}")
         print(f"   📈 Uptime: {report['summary']['uptime_percentage']}%")
+        for url, history in report.get("history", {}).items():
+            print(f"   🕒 {url}: uptime 24h {history['uptime_24h_pct']}%, 7 zile {history['uptime_7d_pct']}%, "
+                  f"p90 24h {history['response_time_24h']['p90']}ms")
         
         return report
     
+    def merge_sketches(self, new_results: Optional[List[Dict]] = None) -> Dict:
+        """Adaugă schițele de latență din rularea curentă la cele din rulările anterioare.
+
+        Se păstrează doar schițele (câțiva KB per site), nu cererile individuale.
+        """
+        new_results = self.results if new_results is None else new_results
+        sketch_file = self._sketch_path()
+        stored = {}
+        if os.path.exists(sketch_file):
+            try:
+                with open(sketch_file, 'r', encoding='utf-8') as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = {}
+        
+        for r in new_results:
+            if "sketch" not in r:
+                continue
+            sketch = QuantileSketch.from_bytes(base64.b64decode(r["sketch"]))
+            if r["url"] in stored:
+                sketch.merge(QuantileSketch.from_bytes(base64.b64decode(stored[r["url"]])))
+            stored[r["url"]] = base64.b64encode(sketch.to_bytes()).decode("ascii")
+        merged = {
+            r["url"]: latency_stats(QuantileSketch.from_bytes(base64.b64decode(stored[r["url"]])))
+            for r in self.results if "sketch" in r and r["url"] in stored
+        }
+        
+        tmp_file = f"{sketch_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(stored, f)
+        os.replace(tmp_file, sketch_file)
+        return merged
+    
+    def _sketch_path(self) -> str:
+        if os.path.isabs(self.sketch_file):
+            return self.sketch_file
+        return str(ensure_report_dir() / self.sketch_file)
+    
+    def record_history(self, new_results: Optional[List[Dict]] = None) -> Dict:
+        """Adaugă rezultatele în istoricul SQLite și întoarce uptime-ul și percentilele pe 24h / 7 zile."""
+        new_results = self.results if new_results is None else new_results
+        samples = []
+        for r in new_results:
+            try:
+                ts = datetime.fromisoformat(r["timestamp"]).timestamp()
+            except (KeyError, TypeError, ValueError):
+                ts = time.time()
+            samples.append((r["url"], {
+                "ts": ts,
+                "ok": r["healthy"],
+                "status": r.get("status_code"),
+                "latency_ms": r.get("response_time"),
+                "ttfb_ms": r.get("ttfb"),
+            }))
+        
+        history = {}
+        now = time.time()
+        # Fără `history_db`, istoricul e cel deschis (și ținut deschis) de suita `monitoring`
+        store = TimeSeriesStore(self.history_db) if self.history_db else timeseries_store()
+        try:
+            store.record_many(samples)
+            for url in dict.fromkeys(r["url"] for r in self.results):
+                day = store.summary(url, now - DAY_SECONDS, now + 1)
+                history[url] = {
+                    "uptime_24h_pct": day["uptime_pct"],
+                    "uptime_7d_pct": store.uptime(url, now - 7 * DAY_SECONDS, now + 1),
+                    "response_time_24h": day["latency_ms"],
+                    "ttfb_24h": day["ttfb_ms"],
+                    "samples_24h": day["samples"],
+                }
+        finally:
+            if self.history_db:
+                store.close()
+        return history
+    
     def generate_markdown_report(self, output_file: str = "monitor_report.md") -> str:
         """Generează un raport Markdown frumos formatat."""
         healthy_count = sum(1 for r in self.results if r["healthy"])
@@ -174,6 +586,11 @@ class WebsiteMonitor:
 - **Response Time:** {result.get('response_time', 'N/A')}ms
 """
             
+            if result.get('latency'):
+                lat = result['latency']
+                md_content += (f"- **Latency:** p50 {lat['p50']}ms · p90 {lat['p90']}ms · p99 {lat['p99']}ms · "
+                               f"jitter {lat['jitter']}ms ({lat['samples']} cereri, conexiune {lat['connection']})\n")
+            
             if result.get('error'):
                 md_content += f"- **Error:** `{result['error']}`\n"
             
@@ -187,11 +604,23 @@ class WebsiteMonitor:
 
 def main():
     """Funcție principală."""
+    parser = argparse.ArgumentParser(description="Website Monitor & Health Checker")
+    parser.add_argument("--daemon", action="store_true",
+                        help="rulează continuu, fiecare site la `interval`-ul lui din sites.json")
+    args = parser.parse_args()
+    
     monitor = WebsiteMonitor()
     
     print("🌐 Website Monitor & Health Checker")
     print("=" * 50)
     
+    if args.daemon:
+        try:
+            monitor.run_daemon()
+        except KeyboardInterrupt:
+            print("\n👋 Oprit.")
+        return
+    
     # Verifică toate site-urile
     monitor.check_all_sites()
     